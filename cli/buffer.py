@@ -0,0 +1,243 @@
+import marshal
+import mmap
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+from collections import deque
+from typing import IO, Any, Deque, Iterator, List, Optional, Tuple, Union
+
+from cli.upsolver.entities import Column, ResultPage
+from cli.utils import get_logger
+
+"""
+Buffering of result pages within a memory budget, for consumers that need to see more than one
+page before producing output (e.g. a table whose column widths depend on all rows).
+
+Pages are held in memory until their estimated size exceeds the budget, at which point all
+buffered pages are spilled to a temporary file. Spilled pages are read back lazily (through a
+memory mapping of the file), one page at a time. Buffers filled concurrently (e.g. one per
+statement executed in parallel) can share a single budget (see MemoryBudget).
+
+PageStream is the consume-once counterpart, for pages produced by one thread while another
+consumes them.
+"""
+
+DEFAULT_MEMORY_BUDGET = 256 * 2 ** 20
+
+
+def estimate_row_size(rows: List[Any], sample_size: int = 100) -> int:
+    """
+    Estimate the memory held by a single row (the row list and its values) from a sample of rows.
+    """
+    sample = rows[:sample_size]
+    if len(sample) == 0:
+        return 0
+    total = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r) for r in sample)
+    return max(1, total // len(sample))
+
+
+def estimate_page_size(page: ResultPage) -> int:
+    return estimate_row_size(page.data) * len(page.data)
+
+
+# spilled records are [codec (1 byte)][length (4 bytes)][encoded page]. marshal is compact and
+# much faster than pickle, but only handles builtin types (which is what parsed json is made of)
+_CODEC_MARSHAL = 0
+_CODEC_PICKLE = 1
+_header = struct.Struct('<BI')
+_json_types = (str, int, float, bool, type(None), list, dict)
+
+
+def _encode(page: ResultPage) -> Tuple[int, bytes]:
+    record = (
+        [tuple(c) for c in page.columns] if page.columns is not None else None,
+        page.data,
+        page.next_path,
+        page.size_bytes,
+    )
+    # marshal raises on most other types, but (silently) writes objects such as arrays as bytes,
+    # so only use it for values that look like parsed json (checking the first row only)
+    first_row = page.data[0] if len(page.data) > 0 and page.columns is not None else []
+    if all(isinstance(v, _json_types) for v in first_row):
+        try:
+            return _CODEC_MARSHAL, marshal.dumps(record)
+        except ValueError:
+            pass
+    return _CODEC_PICKLE, pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(codec: int, data: bytes) -> ResultPage:
+    columns, rows, next_path, size_bytes = \
+        marshal.loads(data) if codec == _CODEC_MARSHAL else pickle.loads(data)
+    return ResultPage(
+        columns=[Column(*c) for c in columns] if columns is not None else None,
+        data=rows,
+        next_path=next_path,
+        size_bytes=size_bytes,
+    )
+
+
+class MemoryBudget(object):
+    """
+    Bytes of pages held in memory, accounted for across all the buffers sharing the budget.
+    """
+
+    def __init__(self, total_bytes: int) -> None:
+        self.total_bytes = total_bytes
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        """
+        :return: False (reserving nothing) if the budget doesn't have room for size bytes.
+        """
+        with self.lock:
+            if self.used_bytes + size > self.total_bytes:
+                return False
+            self.used_bytes += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self.lock:
+            self.used_bytes -= size
+
+
+class PageBuffer(object):
+    """
+    An append-only sequence of pages that can be iterated (in order) any number of times.
+    """
+
+    def __init__(self, memory_budget: Union[int, MemoryBudget] = DEFAULT_MEMORY_BUDGET) -> None:
+        """
+        :param memory_budget: in bytes, or a budget shared with other buffers.
+        """
+        self.budget = memory_budget if isinstance(memory_budget, MemoryBudget) \
+            else MemoryBudget(memory_budget)
+        self.pages: List[ResultPage] = []  # pages currently held in memory (appended after the spilled ones)
+        self.buffered_bytes = 0
+        self.spill_file: Optional[IO[bytes]] = None
+        self.spilled_pages = 0
+        self.spilled_bytes = 0
+        self.log = get_logger('PageBuffer')
+
+    def __len__(self) -> int:
+        return self.spilled_pages + len(self.pages)
+
+    def append(self, page: ResultPage) -> None:
+        self.pages.append(page)
+        size = estimate_page_size(page)
+        if self.budget.reserve(size):
+            self.buffered_bytes += size
+        else:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix='upsolver-buffer-')
+
+        for page in self.pages:
+            codec, data = _encode(page)
+            self.spill_file.write(_header.pack(codec, len(data)))
+            self.spill_file.write(data)
+            self.spilled_bytes += _header.size + len(data)
+        self.spill_file.flush()
+
+        self.log.debug(f'spilled {len(self.pages)} pages ({self.buffered_bytes} bytes in memory, '
+                       f'{self.spilled_bytes} bytes on disk in total)')
+        self.spilled_pages += len(self.pages)
+        self.budget.release(self.buffered_bytes)
+        self.pages, self.buffered_bytes = [], 0
+
+    def __iter__(self) -> Iterator[ResultPage]:
+        if self.spill_file is not None and self.spilled_bytes > 0:
+            with mmap.mmap(self.spill_file.fileno(), self.spilled_bytes, access=mmap.ACCESS_READ) as mm:
+                offset = 0
+                while offset < self.spilled_bytes:
+                    codec, length = _header.unpack_from(mm, offset)
+                    offset += _header.size
+                    yield _decode(codec, mm[offset:offset + length])
+                    offset += length
+
+        yield from list(self.pages)
+
+    def close(self) -> None:
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+        self.budget.release(self.buffered_bytes)
+        self.pages, self.buffered_bytes = [], 0
+
+
+class PageStream(object):
+    """
+    Pages appended by a producer thread, iterated (once) by a consumer as they arrive. Pages that
+    weren't consumed yet are held in memory within the budget, and spilled beyond it (see PageBuffer).
+    """
+
+    def __init__(self, memory_budget: MemoryBudget) -> None:
+        self.budget = memory_budget
+        # pages not consumed yet, in order: a page held in memory (with its size), or pages spilled
+        # consecutively
+        self.pending: Deque[Union[Tuple[ResultPage, int], PageBuffer]] = deque()
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.cond = threading.Condition()
+
+    def append(self, page: ResultPage) -> None:
+        size = estimate_page_size(page)
+        with self.cond:
+            if self.budget.reserve(size):
+                self.pending.append((page, size))
+            else:
+                spilled = self.pending[-1] if len(self.pending) > 0 else None
+                if not isinstance(spilled, PageBuffer):
+                    spilled = PageBuffer(MemoryBudget(0))
+                    self.pending.append(spilled)
+                spilled.append(page)
+            self.cond.notify_all()
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        """
+        Called by the producer once all pages were appended, or with the error it failed on (which is
+        raised to the consumer after the pages appended before it).
+        """
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def __iter__(self) -> Iterator[ResultPage]:
+        while True:
+            with self.cond:
+                while len(self.pending) == 0 and not self.done:
+                    self.cond.wait()
+                if len(self.pending) == 0:
+                    break
+                item = self.pending.popleft()
+
+            if isinstance(item, PageBuffer):
+                try:
+                    yield from item
+                finally:
+                    item.close()
+            else:
+                page, size = item
+                self.budget.release(size)
+                yield page
+
+        if self.error is not None:
+            raise self.error
+
+    def close(self) -> None:
+        """
+        Release the pages that weren't consumed (once the producer is done).
+        """
+        with self.cond:
+            for item in self.pending:
+                if isinstance(item, PageBuffer):
+                    item.close()
+                else:
+                    self.budget.release(item[1])
+            self.pending.clear()
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from cli import errors
+
+"""
+Checkpoints of exports: after every page of results written to the output file, the path of the next
+page and the size of the output are recorded, so that an interrupted export can continue from the last
+page that was written (instead of executing the query again).
+"""
+
+
+def query_digest(query: str, settings: str = '') -> str:
+    """
+    :param settings: of the export that shape its output (e.g. the output format), so that an export
+    isn't resumed with different ones.
+    """
+    return hashlib.sha256(f'{settings}\n{query}'.encode('utf-8')).hexdigest()
+
+
+class Checkpoint(NamedTuple):
+    query_digest: str  # of the query exported (and its settings), so a checkpoint isn't used for another
+    next_path: Optional[str]  # of the page following the last one written; None once all pages were
+    offset: int  # size (in bytes) of the output once the last page was written
+    pages: int  # number of pages written
+
+
+class CheckpointFile(object):
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def load(self) -> Optional[Checkpoint]:
+        if not self.path.exists():
+            return None
+        try:
+            return Checkpoint(**json.loads(self.path.read_text()))
+        except (ValueError, TypeError) as ex:
+            raise errors.ConfigErr(f'Invalid checkpoint file {self.path}: {ex}')
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint._asdict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)  # so that the checkpoint is never left half written
+
+    def resume_point(self, query: str, output_path: Path, settings: str = '') -> Checkpoint:
+        """
+        :param settings: see query_digest.
+        :return: the checkpoint to resume exporting query from, once verified against the output.
+        """
+        checkpoint = self.load()
+        if checkpoint is None:
+            raise errors.ConfigErr(f'No checkpoint to resume from at {self.path}')
+        if checkpoint.query_digest != query_digest(query, settings):
+            raise errors.ConfigErr(f'The checkpoint at {self.path} was recorded for a different query (or '
+                                   f'different output options)')
+        if not output_path.exists() or output_path.stat().st_size < checkpoint.offset:
+            raise errors.ConfigErr(f'The output file {output_path} is missing results recorded in the '
+                                   f'checkpoint at {self.path}')
+        return checkpoint
@@ -0,0 +1,170 @@
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Set
+
+import click
+
+from cli.commands.context import CliContext
+from cli.errors import ConfigErr
+from cli.upsolver.query import RestQueryApi
+from cli.utils import convert_time_str, convert_to_seconds, get_logger
+
+
+class BatchQuery(NamedTuple):
+    id: Any
+    sql: Optional[str]
+    timeout_sec: float
+    error: Optional[str] = None  # set for records that could not be parsed
+
+
+def read_queries(lines: Iterator[str], default_timeout_sec: float) -> Iterator[BatchQuery]:
+    """
+    Parse NDJSON records of the form {"id": ..., "sql": "...", "timeout": ...}, where timeout is
+    optional and is either a number of seconds or a string such as "1.5m". Records without an id
+    are identified by their line number. Invalid records are returned along with an error.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip() == '':
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as ex:
+            yield BatchQuery(line_number, None, default_timeout_sec, f'invalid json: {ex}')
+            continue
+        if type(record) is not dict:
+            yield BatchQuery(line_number, None, default_timeout_sec, 'expected a json object')
+            continue
+
+        query_id = record.get('id', line_number)
+        sql = record.get('sql')
+        if type(sql) is not str or sql.strip() == '':
+            yield BatchQuery(query_id, None, default_timeout_sec, 'missing sql')
+            continue
+
+        timeout = record.get('timeout')
+        try:
+            timeout_sec = default_timeout_sec if timeout is None else (
+                float(timeout) if type(timeout) in (int, float) else convert_to_seconds(str(timeout))
+            )
+        except Exception:
+            yield BatchQuery(query_id, None, default_timeout_sec, f'invalid timeout: {timeout}')
+            continue
+
+        yield BatchQuery(query_id, sql.strip(), timeout_sec)
+
+
+def run_query(api: RestQueryApi, query: BatchQuery,
+              cancelled: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    :param cancelled: see RestQueryApi.results.
+    :return: the outcome of the query: its id and status, timings, and either its results (as rows
+    of the same form execute prints them) or an error.
+    """
+    if query.error is not None or query.sql is None:
+        return {'id': query.id, 'status': 'failed', 'error': query.error}
+
+    start = time.time()
+    time_to_first_page: Optional[float] = None
+    rows: List[Any] = []
+    try:
+        for page in api.execute_pages(query.sql, query.timeout_sec, cancelled):
+            if time_to_first_page is None:
+                time_to_first_page = time.time() - start
+            rows.extend(page.to_execution_result())
+    except Exception as ex:
+        return {
+            'id': query.id,
+            'status': 'failed',
+            'error': str(ex) or ex.__class__.__name__,
+            'total_time_sec': round(time.time() - start, 3),
+        }
+
+    return {
+        'id': query.id,
+        'status': 'success',
+        'time_to_first_page_sec': round(time_to_first_page or 0.0, 3),
+        'total_time_sec': round(time.time() - start, 3),
+        'rows': len(rows),
+        'result': rows,
+    }
+
+
+def run_batch(api: RestQueryApi, queries: Iterator[BatchQuery], concurrency: int) -> Iterator[Dict[str, Any]]:
+    """
+    Run queries on `concurrency` threads, reading further queries only as threads become available
+    (so the input may be arbitrarily long). Outcomes are returned in order of completion. Queries still
+    running when the outcomes stop being consumed (e.g. when interrupted) are cancelled.
+    """
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight: Set['Future[Dict[str, Any]]'] = set()
+
+        def completed() -> Iterator[Dict[str, Any]]:
+            nonlocal in_flight
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for f in done:
+                yield f.result()
+
+        try:
+            for query in queries:
+                while len(in_flight) >= concurrency:
+                    yield from completed()
+                future: 'Future[Dict[str, Any]]' = pool.submit(run_query, api, query, cancelled)
+                in_flight.add(future)
+
+            while len(in_flight) > 0:
+                yield from completed()
+        finally:
+            if len(in_flight) > 0:
+                cancelled.set()
+                for f in in_flight:
+                    f.cancel()
+
+
+@click.command(help='Execute many queries read as NDJSON records of the form '
+                    '{"id": ..., "sql": "...", "timeout": "30s"} (one per line), and write their '
+                    'outcomes as NDJSON: id, status, timings and results (or error).')
+@click.pass_obj
+@click.option('-f', '--file_path', default='-',
+              help='File to read the queries from. Default is stdin.')
+@click.option('-t', '--token', default=None,
+              help='Token to use.')
+@click.option('-u', '--api-url', default=None,
+              help='URL of Upsolver\'s API. If not provided, we will try to get it automatically from the '
+                   'authentication API.')
+@click.option('--concurrency', type=click.IntRange(min=1), default=8,
+              help='Number of queries to execute at the same time. Default is 8.')
+@click.option('--timeout', 'timeout_sec', default='30s', callback=convert_time_str,
+              help='Timeout setting for pending responses of queries that do not set a timeout. '
+                   'Default is 30s.')
+def batch(
+        ctx: CliContext,
+        file_path: str,
+        token: Optional[str],
+        api_url: Optional[str],
+        concurrency: int,
+        timeout_sec: float) -> None:
+    logger = get_logger('batch')
+    upsolver_api = ctx.build_query_api(token, api_url, pool_size=concurrency)
+
+    try:
+        f: IO[str] = sys.stdin if file_path == '-' else open(file_path)
+    except OSError as ex:
+        raise ConfigErr(f'Failed to read {file_path}: {ex}')
+
+    succeeded = failed = 0
+    try:
+        for outcome in run_batch(upsolver_api, read_queries(f, timeout_sec), concurrency):
+            if outcome['status'] == 'success':
+                succeeded += 1
+            else:
+                failed += 1
+            ctx.write(json.dumps(outcome), fmt=str)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    logger.debug(f'batch done: {succeeded} queries succeeded, {failed} failed')
@@ -21,12 +21,16 @@ from cli.utils import parse_url
 @click.option('-o', '--output-format', default=None,
               help='The format that the results will be returned in. '
                    'Supported formats: Json, Csv, Tsv, Plain. Default is Json.')
+@click.option('--max-rps', type=click.FloatRange(min=0, min_open=True), default=None,
+              help='Max number of requests per second to issue to the API (e.g. to share its rate '
+                   'limit between concurrent workloads). Unlimited by default.')
 @click.option('-f', '--force', is_flag=True, default=False,
               help='Overwrite profile if already exists.')
 def configure(ctx: CliContext,
               token: Optional[str],
               api_url: Optional[str],
               output_format: Optional[str],
+              max_rps: Optional[float],
               force: bool) -> None:
     profile = ctx.confman.conf.active_profile
 
@@ -40,6 +44,7 @@ def configure(ctx: CliContext,
             token=token,
             base_url=base_url,
             output=output,
+            max_rps=max_rps,
         ),
         force
     )
@@ -5,9 +5,13 @@ from typing import Any, Optional
 
 from click import echo
 
-from cli.config import Config, ConfigurationManager, LogLvl
+from cli.buffer import DEFAULT_MEMORY_BUDGET
+from cli.config import Config, ConfigurationManager, LogLvl, Profile
+from cli.errors import ApiUnavailable, ConfigErr
 from cli.formatters import Formatter
-from cli.utils import ensure_exists, get_logger
+from cli.upsolver.api_utils import build_query_api, get_base_url
+from cli.upsolver.query import RestQueryApi
+from cli.utils import ensure_exists, get_logger, parse_url
 
 
 def init_logging(conf: Config) -> None:
@@ -57,10 +61,43 @@ class CliContext(object):
     components.
     """
 
-    def __init__(self, confman: ConfigurationManager):
+    def __init__(self, confman: ConfigurationManager, memory_budget: Optional[int] = None):
+        """
+        :param memory_budget: bytes of result data that may be held in memory by commands that
+        need to buffer results (beyond that, results are spilled to disk).
+        """
         self.confman = confman
+        self.memory_budget = memory_budget or DEFAULT_MEMORY_BUDGET
         init_logging(self.confman.conf)
 
+    def build_query_api(self, token: Optional[str] = None, api_url: Optional[str] = None,
+                        pool_size: Optional[int] = None, profile: Optional[Profile] = None) -> RestQueryApi:
+        """
+        :param token: if not provided, the profile's token is used.
+        :param api_url: if not provided, the profile's base url is used (or, if missing, it is
+        retrieved from the authentication API).
+        :param pool_size: see Requester.
+        :param profile: profile to take the token / base url (and max requests per second) from; by
+        default, the active profile.
+        """
+        profile = profile or self.confman.conf.active_profile
+        log = get_logger('CliContext')
+        auth_api_url = self.confman.auth_api_url
+        log.debug(f"Authentication API URL: {auth_api_url}")
+
+        token = token or profile.token
+        if token is None:
+            raise ConfigErr("Please provide a token." if profile.name == self.confman.conf.active_profile.name
+                            else f"Profile '{profile.name}' has no token.")
+        log.debug(f"Token: {token}")
+
+        base_url = parse_url(api_url) or profile.base_url or get_base_url(auth_api_url, token)
+        if base_url is None:
+            raise ApiUnavailable(auth_api_url)
+        log.debug(f"API URL: {base_url}")
+
+        return build_query_api(token, base_url, pool_size=pool_size, max_rps=profile.max_rps)
+
     def write(self, x: Any, fmt: Optional[Formatter] = None) -> None:
         echo(
             message=fmt(x) if fmt is not None else self.confman.get_formatter()(x),
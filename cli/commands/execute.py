@@ -1,20 +1,46 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, List, Optional
 
 import click
 
+from cli.buffer import MemoryBudget, PageStream
+from cli.checkpoint import Checkpoint, CheckpointFile, query_digest
 from cli.commands.context import CliContext
-from cli.errors import ApiUnavailable, ConfigErr
-from cli.formatters import Formatter, get_output_format
-from cli.upsolver.api_utils import get_base_url
-from cli.upsolver.auth_filler import TokenAuthFiller
-from cli.upsolver.poller import SimpleResponsePoller
+from cli.commands.output import write_page, write_plain
+from cli.detach import submit_detached
+from cli.errors import CliErr, ConfigErr
+from cli.fanout import ProfileOutcome, run_on_profiles
+from cli.follow import Follower, WatermarkStore
+from cli.format_pool import FormatPool, format_results
+from cli.formatters import Formatter, OutputFmt, get_output_format
+from cli.journal import RunJournal
+from cli.pipeline import (
+    Limit,
+    PageStage,
+    Predicate,
+    Projection,
+    apply_stages,
+    close_pages,
+    parse_predicate,
+)
+from cli.sharding import SubQuery, parse_range, parse_sweep, shard_queries, sweep_queries
+from cli.sinks import CountingSink, IfExists, SqliteSink
+from cli.sorting import ExternalSort, GroupBy, parse_aggregates, parse_sort_keys
+from cli.stats import ResultStats
+from cli.upsolver.columns import decode_page
+from cli.upsolver.entities import ResultPage
+from cli.upsolver.lexer import Statement, split_statements
 from cli.upsolver.query import RestQueryApi
-from cli.upsolver.requester import Requester
-from cli.utils import convert_time_str, get_logger
+from cli.upsolver.script import run_parallel, run_statements
+from cli.utils import convert_size_str, convert_time_str, get_logger, sigterm_as_interrupt
+from cli.watch import ChangeTracker, watch
 
 
-@click.command(help='Execute a single SQL query. '
+@click.command(help='Execute a single SQL query, or a script of queries separated by ; (using --script). '
                     'Use -f <file_path> or -c <sql_command>.', no_args_is_help=True)
 @click.pass_obj
 @click.option('-f', '--file_path', default=None,
@@ -31,6 +57,115 @@ from cli.utils import convert_time_str, get_logger
                    'Supported formats: Json, Csv, Tsv, Plain. Default is Json.')
 @click.option('--timeout', 'timeout_sec', default='30s', callback=convert_time_str,
               help='Timeout setting for pending responses. Default is 30s.')
+@click.option('--into-sqlite', 'sqlite_path', default=None,
+              help='Load the results into a table of the SQLite database at this path '
+                   '(created if missing) instead of printing them. Requires --table.')
+@click.option('--table', default=None,
+              help='Name of the table to load results into when using --into-sqlite.')
+@click.option('--if-exists', type=click.Choice([e.value for e in IfExists], case_sensitive=False),
+              default=IfExists.APPEND.value,
+              help='What to do if the --table already exists: append rows to it, or replace it. '
+                   'Default is append.')
+@click.option('--stats', is_flag=True, default=False,
+              help='Instead of printing the results, print a summary of every column: count, nulls, '
+                   'min, max, mean, approximate number of distinct values and approximate quantiles.')
+@click.option('--columns', default=None,
+              help='Comma separated list of columns to keep (nested fields can be selected using dots, '
+                   'e.g. a,b.c).')
+@click.option('--where', default=None,
+              help='Keep only rows matching this predicate, e.g. "status = \'Running\' and delay > 10". '
+                   'Supported operators: =, !=, <, <=, >, >=, is null, is not null.')
+@click.option('--sort-by', default=None,
+              help='Sort the results by these comma separated columns; append :desc to a column to sort '
+                   'it in descending order, e.g. a,b:desc.')
+@click.option('--group-by', default=None,
+              help='Group the results by these comma separated columns and output one row per group '
+                   'with the aggregates given by --agg.')
+@click.option('--agg', default='count',
+              help='Comma separated aggregates to compute per group when using --group-by: count, or '
+                   'one of count, sum, avg, min, max followed by :<column>, e.g. count,sum:price. '
+                   'Default is count.')
+@click.option('--sort-memory', default=None, callback=convert_size_str,
+              help='Amount of memory to use for sorting / grouping before spilling to temporary files, '
+                   'e.g. 512MB. Default is the global --memory-budget.')
+@click.option('--count-only', is_flag=True, default=False,
+              help='Fetch all results without printing them, and print the number of rows, pages and '
+                   'bytes received along with timings.')
+@click.option('--limit', type=click.IntRange(min=1), default=None,
+              help='Output at most this many rows; no further results are fetched once the limit '
+                   'is reached.')
+@click.option('--script', is_flag=True, default=False,
+              help='Split the file / command into statements separated by ; and execute them one after '
+                   'the other, stopping at the first statement that fails.')
+@click.option('--independent', is_flag=True, default=False,
+              help='With --script: the statements do not depend on each other, so each statement may be '
+                   'submitted while the results of the previous one are still being received.')
+@click.option('--parallel', 'workers', type=click.IntRange(min=1), default=None,
+              help='Execute the statements of the script (implies --script) on up to this many workers. '
+                   'Statements wait for earlier statements that create, change or use objects they refer '
+                   'to, and for all earlier statements if preceded by a "-- @barrier" comment. Results '
+                   'are written in the order of the statements.')
+@click.option('--format-workers', type=click.IntRange(min=1), default=None,
+              help='Format results (in Json, Csv or Tsv format) using this many processes, for large '
+                   'results where formatting is the bottleneck.')
+@click.option('--shard-by', default=None,
+              help='Split the query into sub-queries by ranges of this column\'s values (given by --range '
+                   'and --shards), executed concurrently. Results are written in order of the ranges.')
+@click.option('--range', 'shard_range', default=None,
+              help='Range of values of the --shard-by column: <start>..<end> (end exclusive), where the '
+                   'bounds are numbers, dates or timestamps, e.g. 2022-01-01..2022-02-01.')
+@click.option('--shards', type=click.IntRange(min=1), default=4,
+              help='Number of sub-queries to split the --range into. Default is 4.')
+@click.option('--sweep', default=None,
+              help='Execute the query once per value, with the value in place of {<name>} in the query: '
+                   '<name>=<value>,<value>,..., e.g. region=us,eu. Results are written in order of the '
+                   'values.')
+@click.option('--concurrency', type=click.IntRange(min=1), default=8,
+              help='Number of sub-queries (of --shard-by or --sweep) to execute at the same time. '
+                   'Default is 8.')
+@click.option('--shard-files', default=None,
+              help='Write the results of every sub-query (of --shard-by or --sweep) to its own file, '
+                   'named by this pattern with {shard} replaced by the sub-query\'s number, '
+                   'e.g. out-{shard}.csv.')
+@click.option('--profiles', default=None,
+              help='Comma separated profiles to execute the query with, concurrently (up to --concurrency '
+                   'at a time). Results are merged in order of the profiles, with a profile column added.')
+@click.option('--all-profiles', is_flag=True, default=False,
+              help='Same as --profiles, with all the profiles in the configuration file.')
+@click.option('--watch', 'watch_interval', default=None, callback=convert_time_str,
+              help='Execute the query again at this interval (e.g. 5s) until interrupted, writing only the '
+                   'rows that were inserted, updated or deleted since the previous execution (with a change '
+                   'column added). Requires --key.')
+@click.option('--key', default=None,
+              help='Comma separated columns identifying a row of the results, for --watch.')
+@click.option('--follow', is_flag=True, default=False,
+              help='Follow a growing table: execute the query again and again (until interrupted), each '
+                   'time writing only the rows whose --watermark column is greater than the highest value '
+                   'seen so far. The watermark is saved in the CLI\'s home directory, so following the same '
+                   'query again resumes where it stopped.')
+@click.option('--watermark', default=None,
+              help='Column of ever increasing values (e.g. a timestamp) to follow the query by, for '
+                   '--follow.')
+@click.option('--poll-interval', 'poll_interval', default='1s', callback=convert_time_str,
+              help='With --follow: time to wait before executing the query again after new rows were '
+                   'received; while there are no new rows the wait doubles, up to --max-poll-interval. '
+                   'Default is 1s.')
+@click.option('--max-poll-interval', 'max_poll_interval', default='1m', callback=convert_time_str,
+              help='With --follow: longest time to wait between executions of the query. Default is 1m.')
+@click.option('--output-file', default=None,
+              help='Write the results to this file instead of the standard output.')
+@click.option('--checkpoint', 'checkpoint_path', default=None,
+              help='Record in this file, after every page of results written to the --output-file, where '
+                   'the results continue and how much output was written, so that an interrupted export '
+                   'can be continued using --resume.')
+@click.option('--resume', is_flag=True, default=False,
+              help='Continue the export recorded in the --checkpoint file from the last page written '
+                   '(output written after it is discarded), as long as the results are still available. '
+                   'With --script: skip the statements that completed in the previous run of the script '
+                   '(runs of every script are journaled in the CLI\'s home directory).')
+@click.option('--detach', is_flag=True, default=False,
+              help='Submit the query without waiting for its results, and print a handle to collect them '
+                   'with later using `upsolver results <handle>`.')
 def execute(
         ctx: CliContext,
         file_path: Optional[str],
@@ -38,43 +173,519 @@ def execute(
         token: Optional[str],
         api_url: Optional[str],
         output_format: Optional[str],
-        timeout_sec: float) -> None:
+        timeout_sec: float,
+        sqlite_path: Optional[str],
+        table: Optional[str],
+        if_exists: str,
+        stats: bool,
+        columns: Optional[str],
+        where: Optional[str],
+        sort_by: Optional[str],
+        group_by: Optional[str],
+        agg: str,
+        sort_memory: Optional[int],
+        count_only: bool,
+        limit: Optional[int],
+        script: bool,
+        independent: bool,
+        workers: Optional[int],
+        format_workers: Optional[int],
+        shard_by: Optional[str],
+        shard_range: Optional[str],
+        shards: int,
+        sweep: Optional[str],
+        concurrency: int,
+        shard_files: Optional[str],
+        profiles: Optional[str],
+        all_profiles: bool,
+        watch_interval: Optional[float],
+        key: Optional[str],
+        follow: bool,
+        watermark: Optional[str],
+        poll_interval: float,
+        max_poll_interval: float,
+        output_file: Optional[str],
+        checkpoint_path: Optional[str],
+        resume: bool,
+        detach: bool) -> None:
     logger = get_logger('execute')
 
     expression = __get_expression(file_path, command)
 
-    output_format = get_output_format(output_format)
-    fmt: Optional[Formatter] = output_format.get_formatter() if output_format else None
-
-    auth_api_url = ctx.confman.auth_api_url
-    logger.debug(f"Authentication API URL: {auth_api_url}")
-
-    token = token or ctx.confman.conf.active_profile.token
-    if token is None:
-        raise ConfigErr("Please provide a token.")
-    logger.debug(f"Token: {token}")
-
-    api_url = api_url or ctx.confman.conf.active_profile.base_url or get_base_url(auth_api_url, token)
-    if api_url is None:
-        raise ApiUnavailable(auth_api_url)
-    logger.debug(f"API URL: {api_url}")
-
-    upsolver_api = RestQueryApi(
-        requester=Requester(
-            base_url=api_url,
-            auth_filler=TokenAuthFiller(token)
-        ),
-        poller_builder=lambda to_sec: SimpleResponsePoller(max_time_sec=to_sec)
-    )
-
-    for res in upsolver_api.execute(expression, timeout_sec):
-        for res_part in res:
-            response_kind = res_part.get("kind")
-            if response_kind == "upsolver_query_response":
-                cli_response = res_part.get("message")
-                ctx.write(cli_response, fmt)
+    if sqlite_path is not None and table is None:
+        raise ConfigErr("Please provide a table name (using --table flag) to load results into.")
+    if len([x for x in [sqlite_path is not None, stats, count_only] if x]) > 1:
+        raise ConfigErr("Only one of --into-sqlite, --stats or --count-only can be used.")
+
+    script = script or workers is not None
+    if independent and not script:
+        raise ConfigErr("--independent can only be used along with --script.")
+    if independent and workers is not None:
+        raise ConfigErr("Only one of --independent or --parallel can be used.")
+
+    if (shard_by is None) != (shard_range is None):
+        raise ConfigErr("--shard-by and --range should be used together.")
+    if shard_by is not None and sweep is not None:
+        raise ConfigErr("Only one of --shard-by or --sweep can be used.")
+    sub_queries: Optional[List[SubQuery]] = None
+    if shard_by is not None and shard_range is not None:
+        sub_queries = shard_queries(expression, shard_by, *parse_range(shard_range), shards)
+    elif sweep is not None:
+        sub_queries = sweep_queries(expression, *parse_sweep(sweep))
+    if sub_queries is not None and script:
+        raise ConfigErr("--shard-by and --sweep can not be used along with --script or --parallel.")
+    if shard_files is not None:
+        if sub_queries is None:
+            raise ConfigErr("--shard-files can only be used along with --shard-by or --sweep.")
+        if '{shard}' not in shard_files:
+            raise ConfigErr("--shard-files should contain {shard}, e.g. out-{shard}.csv.")
+        if sqlite_path is not None or stats or count_only:
+            raise ConfigErr("--shard-files can not be used along with --into-sqlite, --stats or "
+                            "--count-only.")
+
+    profile_names: Optional[List[str]] = None
+    if profiles is not None and all_profiles:
+        raise ConfigErr("Only one of --profiles or --all-profiles can be used.")
+    if profiles is not None:
+        profile_names = [
+            ctx.confman.get_profile(p.strip()).name for p in profiles.split(',') if p.strip() != ''
+        ]
+    elif all_profiles:
+        profile_names = [p.name for p in ctx.confman.conf.profiles]
+        if len(profile_names) == 0:
+            raise ConfigErr(f"No profiles are defined in {ctx.confman.conf_path}.")
+    if profile_names is not None:
+        if token is not None or api_url is not None:
+            raise ConfigErr("--token and --api-url can not be used along with --profiles or --all-profiles "
+                            "(the token and API URL of every profile are used).")
+        if script or sub_queries is not None:
+            raise ConfigErr("--profiles and --all-profiles can not be used along with --script, --parallel, "
+                            "--shard-by or --sweep.")
+
+    if (watch_interval is None) != (key is None):
+        raise ConfigErr("--watch and --key should be used together.")
+    if follow != (watermark is not None):
+        raise ConfigErr("--follow and --watermark should be used together.")
+    if follow and watch_interval is not None:
+        raise ConfigErr("Only one of --watch or --follow can be used.")
+    if follow and limit is not None:
+        raise ConfigErr("--follow can not be used along with --limit (the watermark only advances once all "
+                        "rows of an execution were received).")
+    if watch_interval is not None or follow:
+        if script or sub_queries is not None or profile_names is not None:
+            raise ConfigErr("--watch and --follow can not be used along with --script, --parallel, "
+                            "--shard-by, --sweep or --profiles.")
+        if sqlite_path is not None or stats or count_only:
+            raise ConfigErr("--watch and --follow can not be used along with --into-sqlite, --stats or "
+                            "--count-only.")
+
+    output_fmt = get_output_format(output_format) if output_format else ctx.confman.get_output_fmt()
+
+    if format_workers is not None:
+        if output_fmt == OutputFmt.PLAIN:
+            raise ConfigErr("--format-workers can not be used with Plain output (it's formatted once all "
+                            "results were received).")
+        if sqlite_path is not None or stats or count_only or shard_files is not None or \
+                watch_interval is not None or follow or detach:
+            raise ConfigErr("--format-workers can not be used along with --into-sqlite, --stats, "
+                            "--count-only, --shard-files, --watch, --follow or --detach.")
+
+    if resume and checkpoint_path is None and not script:
+        raise ConfigErr("--resume can only be used along with --checkpoint or --script.")
+    if checkpoint_path is not None:
+        if output_file is None:
+            raise ConfigErr("--checkpoint can only be used along with --output-file.")
+        if script or sub_queries is not None or profile_names is not None or \
+                watch_interval is not None or follow:
+            raise ConfigErr("--checkpoint can not be used along with --script, --parallel, --shard-by, "
+                            "--sweep, --profiles, --watch or --follow.")
+        if sqlite_path is not None or stats or count_only or format_workers is not None:
+            raise ConfigErr("--checkpoint can not be used along with --into-sqlite, --stats, --count-only "
+                            "or --format-workers.")
+        if sort_by is not None or group_by is not None or limit is not None:
+            raise ConfigErr("--checkpoint can not be used along with --sort-by, --group-by or --limit "
+                            "(pages of results are checkpointed as they're written).")
+        if output_fmt == OutputFmt.PLAIN:
+            raise ConfigErr("--checkpoint can not be used with Plain output (it's written once all results "
+                            "were received).")
+
+    if detach:
+        if script or sub_queries is not None or profile_names is not None or watch_interval is not None or \
+                follow or checkpoint_path is not None:
+            raise ConfigErr("--detach can not be used along with --script, --parallel, --shard-by, --sweep, "
+                            "--profiles, --watch, --follow or --checkpoint.")
+        if sqlite_path is not None or stats or count_only or columns is not None or where is not None or \
+                sort_by is not None or group_by is not None or limit is not None:
+            raise ConfigErr("--detach only submits the query; options that process its results can not be "
+                            "used along with it.")
+
+    memory_budget = sort_memory or ctx.memory_budget
+
+    def build_stages() -> List[PageStage]:
+        stages: List[PageStage] = []
+        if where is not None:
+            stages.append(Predicate(parse_predicate(where)))
+        if group_by is not None:
+            group_keys = [k.strip() for k in group_by.split(',') if k.strip() != '']
+            stages.append(GroupBy(group_keys, parse_aggregates(agg), memory_budget))
+        if sort_by is not None:
+            stages.append(ExternalSort(parse_sort_keys(sort_by), memory_budget))
+        if columns is not None:
+            stages.append(Projection([c.strip() for c in columns.split(',') if c.strip() != '']))
+        if limit is not None:
+            stages.append(Limit(limit))
+        return stages
+
+    build_stages()  # fail on invalid options before executing anything
+
+    def write_results(query_pages: Iterator[ResultPage]) -> None:
+        fmt: Optional[Formatter] = output_fmt.get_formatter()  # formatters may hold state (e.g. csv header)
+        pages = apply_stages(query_pages, build_stages())
+        try:
+            if sqlite_path is not None and table is not None:
+                sink = SqliteSink(Path(sqlite_path), table, IfExists(if_exists.lower()))
+                __load_into_sqlite(ctx, pages, fmt, sink)
+            elif count_only:
+                __count(ctx, pages, fmt)
+            elif stats:
+                __summarize(ctx, pages, fmt)
+            elif output_fmt == OutputFmt.PLAIN:
+                write_plain(ctx, pages, fmt)
+            elif format_workers is not None:
+                __write_formatted_in_pool(pages, output_fmt, format_workers)
+            else:
+                for page in pages:
+                    write_page(ctx, page, fmt)
+        finally:
+            # stop fetching further pages right away, e.g. if the output was closed by its reader
+            close_pages(pages)
+
+    click_ctx = click.get_current_context()  # resources are released once the command is done
+    # queries pending when interrupted or terminated are cancelled (see RestQueryApi.results)
+    click_ctx.with_resource(sigterm_as_interrupt())
+    if output_file is not None and checkpoint_path is None:
+        click_ctx.with_resource(redirect_stdout(click_ctx.with_resource(open(output_file, 'w'))))
+
+    if profile_names is not None:
+        logger.debug(f"Executing query with profiles {', '.join(profile_names)}")
+        outcomes = run_on_profiles(
+            profile_names,
+            lambda name: ctx.build_query_api(profile=ctx.confman.get_profile(name)),
+            expression, timeout_sec, concurrency, memory_budget
+        )
+        write_results(__profiles_pages(outcomes))
+        return
+
+    upsolver_api = ctx.build_query_api(token, api_url, pool_size=concurrency if sub_queries else workers)
+
+    if detach:
+        handle = submit_detached(upsolver_api, expression, ctx.confman.CLI_HOME_DIR / 'results')
+        logger.debug(f"Detached query; handle is {handle}")
+        click.echo(handle)
+        return
+
+    if output_file is not None and checkpoint_path is not None:
+        # the options that shape the output (--sort-by and the like can't be used along with --checkpoint)
+        settings = f'format={output_fmt.value}\nwhere={where}\ncolumns={columns}'
+        __export_with_checkpoints(upsolver_api, expression, settings, timeout_sec, output_fmt, build_stages,
+                                  Path(output_file), CheckpointFile(Path(checkpoint_path)), resume)
+        return
+
+    if watch_interval is not None and key is not None:
+        logger.debug(f"Watching query every {watch_interval}s")
+        __watch(ctx, upsolver_api, expression, timeout_sec, watch_interval, key, output_fmt, build_stages)
+        return
+
+    if watermark is not None:
+        store = WatermarkStore(ctx.confman.CLI_HOME_DIR / 'watermarks', expression, watermark)
+        logger.debug(f"Following query by {watermark} (watermark saved in {store.path})")
+        follower = Follower(lambda sql: upsolver_api.execute_pages(sql, timeout_sec), expression, watermark,
+                            store, poll_interval, max_poll_interval)
+        __write_cycles(ctx, (apply_stages(pages, build_stages()) for pages in follower.follow()), output_fmt)
+        return
+
+    if sub_queries is not None:
+        logger.debug(f"Executing {len(sub_queries)} sub-queries")
+        if shard_files is not None:
+            __write_shard_files(ctx, upsolver_api, sub_queries, shard_files, timeout_sec, concurrency,
+                                output_fmt, build_stages)
+        else:
+            write_results(__merged_pages(upsolver_api, sub_queries, timeout_sec, concurrency, memory_budget))
+        return
+
+    if not script:
+        write_results(upsolver_api.execute_pages(expression, timeout_sec))
+        return
+
+    statements = split_statements(expression)
+    journal = RunJournal(ctx.confman.CLI_HOME_DIR / 'journals', expression,
+                         str(upsolver_api.requester.base_url))
+    completed = journal.start(resume)
+    if resume and len(completed) == 0:
+        click.echo(err=True, message='No statements completed in a previous run of the script; executing all '
+                                     'of them')
+    for statement in statements:
+        if statement.number in completed:
+            click.echo(err=True, message=f'Statement #{statement.number} (line {statement.line}) skipped '
+                                         f'(completed in a previous run)')
+    statements = [s for s in statements if s.number not in completed]
+
+    logger.debug(f"Executing script of {len(statements)} statements (journal: {journal.path})")
+    if workers is not None:
+        __execute_parallel(upsolver_api, statements, timeout_sec, workers, memory_budget, write_results,
+                           journal)
+    else:
+        for statement, query_pages in run_statements(upsolver_api, statements, timeout_sec, independent):
+            try:
+                write_results(query_pages)
+            except CliErr:
+                click.echo(err=True, message=f'Statement #{statement.number} (line {statement.line}) failed:')
+                raise
+            journal.complete(statement)
+    journal.finish()
+
+
+def __profiles_pages(outcomes: Iterator[ProfileOutcome]) -> Iterator[ResultPage]:
+    """
+    :return: the pages of all profiles that succeeded, in order. Failures are reported as they're
+    reached, and the first one is raised once all profiles were done.
+    """
+    first_error: Optional[Exception] = None
+    for outcome in outcomes:
+        if outcome.pages is not None:
+            try:
+                yield from outcome.pages
+            finally:
+                outcome.pages.close()
+        else:
+            click.echo(err=True, message=f'Profile {outcome.profile} failed: {outcome.error}')
+            first_error = first_error or outcome.error
+
+    if first_error is not None:
+        raise first_error
+
+
+def __merged_pages(upsolver_api: RestQueryApi, sub_queries: List[SubQuery], timeout_sec: float,
+                   concurrency: int, memory_budget: int) -> Iterator[ResultPage]:
+    """
+    :return: the pages of all sub-queries, in order of the sub-queries. The pages of the first sub-query
+    not consumed yet are streamed as they arrive, while those of the following sub-queries are buffered
+    (within memory_budget, shared by all sub-queries; see PageStream).
+    """
+    def fetch(sub_query: SubQuery, stream: PageStream) -> None:
+        try:
+            for page in upsolver_api.execute_pages(sub_query.sql, timeout_sec, cancelled):
+                stream.append(page)
+        except Exception as ex:
+            stream.finish(ex)
+        else:
+            stream.finish()
+
+    budget = MemoryBudget(memory_budget)
+    cancelled = threading.Event()
+    streams = [PageStream(budget) for _ in sub_queries]
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = [pool.submit(fetch, q, s) for q, s in zip(sub_queries, streams)]
+    try:
+        for sub_query, stream in zip(sub_queries, streams):
+            try:
+                yield from stream
+            except Exception:
+                click.echo(err=True, message=f'Sub-query {sub_query.label} failed:')
+                raise
+    finally:
+        # stop the sub-queries still running if the pages stopped being consumed (e.g. interrupted, or a
+        # sub-query failed); this is a no-op once they're all done
+        cancelled.set()
+        for f in futures:
+            f.cancel()
+        pool.shutdown(wait=True)
+        for stream in streams:
+            stream.close()
+
+
+def __write_shard_files(ctx: CliContext, upsolver_api: RestQueryApi, sub_queries: List[SubQuery],
+                        pattern: str, timeout_sec: float, concurrency: int, output_fmt: OutputFmt,
+                        build_stages: Callable[[], List[PageStage]]) -> None:
+    """
+    The results of the sub-queries are streamed to their files concurrently. Failures are reported once
+    all sub-queries are done, and the first one is raised.
+    """
+    def write(shard: int, sub_query: SubQuery) -> int:
+        fmt = output_fmt.get_formatter()
+        rows = 0
+        pages = apply_stages(upsolver_api.execute_pages(sub_query.sql, timeout_sec, cancelled),
+                             build_stages())
+        with open(pattern.replace('{shard}', str(shard)), 'w') as f:
+            for page in pages:
+                rows += len(page.data) if page.is_grid() else 0
+                for res_part in format_results(page, fmt):
+                    f.write(res_part + '\n')
+        return rows
+
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(write, i + 1, q) for i, q in enumerate(sub_queries)]
+        try:
+            wait(futures)
+        except BaseException:  # e.g. interrupted using Ctrl-C; stop the sub-queries before exiting
+            cancelled.set()
+            for f in futures:
+                f.cancel()
+            raise
+
+    first_error: Optional[BaseException] = None
+    for i, (sub_query, future) in enumerate(zip(sub_queries, futures)):
+        path = pattern.replace('{shard}', str(i + 1))
+        error = future.exception()
+        if error is None:
+            ctx.write(f'Wrote {future.result()} rows of sub-query {sub_query.label} to {path}',
+                      output_fmt.get_formatter())
+        else:
+            click.echo(err=True, message=f'Sub-query {sub_query.label} failed: {error}')
+            first_error = first_error or error
+
+    if first_error is not None:
+        raise first_error
+
+
+def __export_with_checkpoints(upsolver_api: RestQueryApi, expression: str, settings: str, timeout_sec: float,
+                              output_fmt: OutputFmt, build_stages: Callable[[], List[PageStage]],
+                              output_path: Path, checkpoints: CheckpointFile, resume: bool) -> None:
+    """
+    Pages are recorded in the checkpoint once they were written and synced to disk, so that resuming
+    continues right after the last page that was fully written.
+
+    :param settings: see query_digest.
+    """
+    digest = query_digest(expression, settings)
+    if resume:
+        checkpoint = checkpoints.resume_point(expression, output_path, settings)
+        if checkpoint.next_path is None:
+            click.echo(err=True, message=f'The export recorded in {checkpoints.path} is already complete')
+            return
+        click.echo(err=True, message=f'Resuming after page {checkpoint.pages} ({checkpoint.offset} bytes)')
+        os.truncate(output_path, checkpoint.offset)  # drop output of a page that wasn't fully written
+        query_pages = upsolver_api.resume(checkpoint.next_path, timeout_sec)
+        mode, pages_written = 'ab', checkpoint.pages
+    else:
+        query_pages = upsolver_api.execute_pages(expression, timeout_sec)
+        mode, pages_written = 'wb', 0
+
+    fmt = output_fmt.get_formatter(header=pages_written == 0)
+    pages = apply_stages(query_pages, build_stages())
+    try:
+        # binary, so that the position of the file is the size of the output (text files have opaque offsets)
+        with open(output_path, mode) as f:
+            for page in pages:
+                for res_part in format_results(page, fmt):
+                    f.write((res_part + '\n').encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                pages_written += 1
+                checkpoints.save(Checkpoint(digest, page.next_path, f.tell(), pages_written))
+    finally:
+        close_pages(pages)
+
+
+def __watch(ctx: CliContext, upsolver_api: RestQueryApi, expression: str, timeout_sec: float,
+            interval_sec: float, key: str, output_fmt: OutputFmt,
+            build_stages: Callable[[], List[PageStage]]) -> None:
+    """
+    The same session (and its connections) is used for all executions.
+    """
+    tracker = ChangeTracker([k.strip() for k in key.split(',') if k.strip() != ''])
+
+    def execute_query() -> Iterator[ResultPage]:
+        return apply_stages(upsolver_api.execute_pages(expression, timeout_sec), build_stages())
+
+    __write_cycles(ctx, watch(execute_query, tracker, interval_sec), output_fmt)
+
+
+def __write_cycles(ctx: CliContext, cycles: Iterator[Iterator[ResultPage]], output_fmt: OutputFmt) -> None:
+    """
+    Write the pages of repeated executions of a query (until interrupted) as soon as they're received;
+    with Plain output, the pages of every execution are written as a table.
+    """
+    fmt: Optional[Formatter] = output_fmt.get_formatter()  # shared by all executions (e.g. csv header)
+    try:
+        for pages in cycles:
+            try:
+                if output_fmt == OutputFmt.PLAIN:
+                    write_plain(ctx, pages, fmt)
+                else:
+                    for page in pages:
+                        write_page(ctx, page, fmt)
+            finally:
+                close_pages(pages)
+    except KeyboardInterrupt:
+        pass  # repeated executions end when interrupted
+
+
+def __execute_parallel(upsolver_api: RestQueryApi, statements: List[Statement], timeout_sec: float,
+                       workers: int, memory_budget: int,
+                       write_results: Callable[[Iterator[ResultPage]], None], journal: RunJournal) -> None:
+    """
+    Outcomes are reported in order: the results of successful statements are written, failures and
+    skipped statements are reported to stderr, and the first failure is raised once all were reported.
+    """
+    first_error: Optional[Exception] = None
+    for outcome in run_parallel(upsolver_api, statements, timeout_sec, workers, memory_budget):
+        statement = outcome.statement
+        if outcome.pages is not None:
+            try:
+                write_results(iter(outcome.pages))
+            finally:
+                outcome.pages.close()
+            journal.complete(statement)
+        elif outcome.error is not None:
+            click.echo(err=True, message=f'Statement #{statement.number} (line {statement.line}) failed: '
+                                         f'{outcome.error}')
+            first_error = first_error or outcome.error
+        else:
+            click.echo(err=True, message=f'Statement #{statement.number} (line {statement.line}) skipped')
+
+    if first_error is not None:
+        raise first_error
+
+
+def __load_into_sqlite(ctx: CliContext, pages: Iterator[ResultPage], fmt: Optional[Formatter],
+                       sink: SqliteSink) -> None:
+    try:
+        for page in pages:
+            if page.is_grid():
+                sink.write(page)
             else:
-                ctx.write(res_part, fmt)
+                write_page(ctx, page, fmt)
+    finally:
+        sink.close()
+    ctx.write(f'Loaded {sink.rows_written} rows into table {sink.table} ({sink.db_path})', fmt)
+
+
+def __count(ctx: CliContext, pages: Iterator[ResultPage], fmt: Optional[Formatter]) -> None:
+    counter = CountingSink()
+    for page in pages:
+        counter.write(page)
+    ctx.write(counter.summary(), fmt)
+
+
+def __summarize(ctx: CliContext, pages: Iterator[ResultPage], fmt: Optional[Formatter]) -> None:
+    result_stats = ResultStats()
+    for page in pages:
+        if page.is_grid():
+            result_stats.update(decode_page(page))
+        else:
+            write_page(ctx, page, fmt)
+    ctx.write(result_stats.summary(), fmt)
+
+
+def __write_formatted_in_pool(pages: Iterator[ResultPage], output_fmt: OutputFmt, workers: int) -> None:
+    pool = FormatPool(output_fmt, workers)
+    try:
+        for output in pool.format_pages(pages):
+            click.echo(output, nl=False)
+    finally:
+        pool.close()
 
 
 def __get_expression(file_path: Optional[str], command: Optional[str]) -> str:
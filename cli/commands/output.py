@@ -0,0 +1,45 @@
+from typing import Iterator, Optional
+
+from cli.buffer import PageBuffer
+from cli.commands.context import CliContext
+from cli.format_pool import format_results
+from cli.formatters import Formatter, PlainTable
+from cli.upsolver.entities import ResultPage
+
+"""
+Writing of query results, shared by the commands that execute queries.
+"""
+
+
+def write_plain(ctx: CliContext, pages: Iterator[ResultPage], fmt: Optional[Formatter]) -> None:
+    """
+    Column widths of the table depend on all rows, so pages are buffered (within the memory budget)
+    until all of them were received, and then written as a single table.
+    """
+    buffer = PageBuffer(ctx.memory_budget)
+    try:
+        for page in pages:
+            if page.is_grid():
+                buffer.append(page)
+            else:
+                write_page(ctx, page, fmt)
+
+        table: Optional[PlainTable] = None
+        for page in buffer:
+            if table is None:
+                table = PlainTable(page.column_names())
+            table.measure(page.data)
+
+        if table is None:
+            return
+        ctx.write(table.header(), fmt)
+        for page in buffer:
+            if len(page.data) > 0:
+                ctx.write(table.format_rows(page.data), fmt)
+    finally:
+        buffer.close()
+
+
+def write_page(ctx: CliContext, page: ResultPage, fmt: Optional[Formatter]) -> None:
+    for res_part in format_results(page, fmt or ctx.confman.get_formatter()):
+        ctx.write(res_part, str)
@@ -0,0 +1,78 @@
+from typing import Iterator, Optional, Tuple
+
+import click
+
+from cli.commands.context import CliContext
+from cli.commands.output import write_page, write_plain
+from cli.detach import HandleOutcome, collect, collect_all
+from cli.formatters import OutputFmt, get_output_format
+from cli.pipeline import close_pages
+from cli.upsolver.entities import ResultPage
+from cli.utils import convert_time_str
+
+
+@click.command(help='Collect the results of queries executed using `execute --detach`, given their handles. '
+                    'Several handles are waited on at once; their results are written in the order of the '
+                    'handles.')
+@click.pass_obj
+@click.argument('handles', nargs=-1, required=True)
+@click.option('-t', '--token', default=None,
+              help='Token to use.')
+@click.option('-u', '--api-url', default=None,
+              help='URL of Upsolver\'s API. If not provided, we will try to get it automatically from the '
+                   'authentication API.')
+@click.option('-o', '--output-format', default=None,
+              help='The format that the results will be returned in. '
+                   'Supported formats: Json, Csv, Tsv, Plain. Default is Json.')
+@click.option('--timeout', 'timeout_sec', default='30s', callback=convert_time_str,
+              help='Timeout setting for pending responses. Default is 30s.')
+@click.option('--concurrency', type=click.IntRange(min=1), default=8,
+              help='Number of handles to wait on at the same time. Default is 8.')
+def results(
+        ctx: CliContext,
+        handles: Tuple[str, ...],
+        token: Optional[str],
+        api_url: Optional[str],
+        output_format: Optional[str],
+        timeout_sec: float,
+        concurrency: int) -> None:
+    output_fmt = get_output_format(output_format) if output_format else ctx.confman.get_output_fmt()
+    upsolver_api = ctx.build_query_api(token, api_url, pool_size=concurrency)
+    local_dir = ctx.confman.CLI_HOME_DIR / 'results'
+
+    if len(handles) == 1:
+        pages = collect(upsolver_api, handles[0], timeout_sec, local_dir)
+    else:
+        pages = __handles_pages(
+            collect_all(upsolver_api, list(handles), timeout_sec, local_dir, concurrency, ctx.memory_budget)
+        )
+
+    fmt = output_fmt.get_formatter()
+    try:
+        if output_fmt == OutputFmt.PLAIN:
+            write_plain(ctx, pages, fmt)
+        else:
+            for page in pages:
+                write_page(ctx, page, fmt)
+    finally:
+        close_pages(pages)
+
+
+def __handles_pages(outcomes: Iterator[HandleOutcome]) -> Iterator[ResultPage]:
+    """
+    :return: the pages of all handles whose results were collected, in order. Failures are reported as
+    they're reached, and the first one is raised once all handles were done.
+    """
+    first_error: Optional[Exception] = None
+    for outcome in outcomes:
+        if outcome.pages is not None:
+            try:
+                yield from outcome.pages
+            finally:
+                outcome.pages.close()
+        else:
+            click.echo(err=True, message=f'Handle {outcome.handle} failed: {outcome.error}')
+            first_error = first_error or outcome.error
+
+    if first_error is not None:
+        raise first_error
@@ -0,0 +1,235 @@
+import sys
+import time
+from typing import Callable, Iterator, List, Optional
+
+import click
+from requests.exceptions import RequestException
+
+from cli import errors
+from cli.buffer import estimate_page_size
+from cli.commands.context import CliContext
+from cli.commands.output import write_page, write_plain
+from cli.formatters import OutputFmt, get_output_format
+from cli.pipeline import (
+    Limit,
+    PageStage,
+    Predicate,
+    Projection,
+    apply_stages,
+    close_pages,
+    parse_predicate,
+)
+from cli.sorting import ExternalSort, parse_sort_keys
+from cli.upsolver.columns import ColumnStore
+from cli.upsolver.entities import ResultPage
+from cli.upsolver.lexer import is_complete, split_statements
+from cli.upsolver.query import RestQueryApi
+from cli.utils import convert_time_str, get_logger
+
+PROMPT = 'upsolver> '
+CONTINUATION_PROMPT = '       -> '
+
+HELP = '''Enter SQL statements terminated by ;, or one of the following commands:
+  \\show [format]     display the last result again (optionally in another format)
+  \\sort <columns>    display the last result sorted, e.g. \\sort a,b:desc
+  \\where <predicate> display the rows of the last result matching the predicate, e.g. \\where a > 1
+  \\columns <columns> display some of the columns of the last result, e.g. \\columns a,b.c
+  \\limit <n>         display the first n rows of the last result
+  \\format [format]   show or set the output format (json, csv, tsv or plain)
+  \\help              show this message
+  \\quit              exit (or Ctrl-D)'''
+
+
+class LastResult(object):
+    """
+    The result of the last query, kept in columnar form (see ColumnStore) unless its size exceeds
+    the memory budget.
+    """
+
+    def __init__(self, memory_budget: int) -> None:
+        self.memory_budget = memory_budget
+        self.others: List[ResultPage] = []  # pages that aren't grids (e.g. responses to DDL statements)
+        self.store: Optional[ColumnStore] = ColumnStore()
+        self.size_bytes = 0
+
+    def kept(self) -> bool:
+        return self.store is not None
+
+    def append(self, page: ResultPage) -> None:
+        if not page.is_grid():
+            self.others.append(page)
+            return
+        if self.store is None:
+            return
+        self.size_bytes += estimate_page_size(page)
+        if self.size_bytes > self.memory_budget:
+            self.store = None
+        else:
+            self.store.append(page)
+
+    def pages(self) -> Iterator[ResultPage]:
+        yield from self.others
+        if self.store is not None:
+            yield from self.store.pages()
+
+
+class Shell(object):
+    """
+    Executes statements read from the user using a single RestQueryApi (so its connections are
+    reused), and keeps the last result to allow displaying it again without executing the
+    statement again.
+    """
+
+    def __init__(self, ctx: CliContext, api: RestQueryApi, output_fmt: OutputFmt, timeout_sec: float) -> None:
+        self.ctx = ctx
+        self.api = api
+        self.output_fmt = output_fmt
+        self.timeout_sec = timeout_sec
+        self.last: Optional[LastResult] = None
+        self.log = get_logger('Shell')
+
+    def _display(self, pages: Iterator[ResultPage], output_fmt: OutputFmt) -> None:
+        fmt = output_fmt.get_formatter()
+        try:
+            if output_fmt == OutputFmt.PLAIN:
+                write_plain(self.ctx, pages, fmt)
+            else:
+                for page in pages:
+                    write_page(self.ctx, page, fmt)
+        finally:
+            close_pages(pages)
+
+    def execute(self, sql: str) -> None:
+        result = LastResult(self.ctx.memory_budget)
+        rows = 0
+        start = time.time()
+
+        def recorded(pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+            nonlocal rows
+            for page in pages:
+                result.append(page)
+                rows += len(page.data) if page.is_grid() else 0
+                yield page
+
+        self._display(recorded(self.api.execute_pages(sql, self.timeout_sec)), self.output_fmt)
+        self.last = result
+        click.echo(err=True, message=f'({rows} rows, {time.time() - start:.2f}s)' +
+                   ('' if result.kept() else ' result is too large to be kept for \\show, \\sort etc.'))
+
+    def redisplay(self, stages: List[PageStage], output_fmt: Optional[OutputFmt] = None) -> None:
+        if self.last is None:
+            raise errors.InvalidOptionErr('There is no result to display yet')
+        if not self.last.kept():
+            raise errors.InvalidOptionErr('The last result was too large to be kept; increase '
+                                          '--memory-budget or execute the statement again')
+        self._display(apply_stages(self.last.pages(), stages), output_fmt or self.output_fmt)
+
+    def command(self, line: str) -> bool:
+        """
+        Handle a command (e.g. \\sort a).
+
+        :return: False if the shell should exit.
+        """
+        name, _, arg = line.lstrip('\\').partition(' ')
+        name, arg = name.lower(), arg.strip()
+
+        if name in ('q', 'quit', 'exit'):
+            return False
+        elif name in ('h', 'help', '?'):
+            click.echo(HELP)
+        elif name == 'show':
+            self.redisplay([], get_output_format(arg) if arg else None)
+        elif name == 'sort':
+            self.redisplay([ExternalSort(parse_sort_keys(arg), self.ctx.memory_budget)])
+        elif name == 'where':
+            self.redisplay([Predicate(parse_predicate(arg))])
+        elif name == 'columns':
+            self.redisplay([Projection([c.strip() for c in arg.split(',') if c.strip() != ''])])
+        elif name == 'limit':
+            if not arg.isdigit() or int(arg) < 1:
+                raise errors.InvalidOptionErr(f'Invalid limit \'{arg}\'')
+            self.redisplay([Limit(int(arg))])
+        elif name == 'format':
+            if arg:
+                self.output_fmt = get_output_format(arg)
+            click.echo(f'Output format: {self.output_fmt.value}')
+        else:
+            raise errors.InvalidOptionErr(f'Unknown command \\{name} (see \\help)')
+        return True
+
+    def run(self, read_line: Callable[[str], str]) -> None:
+        """
+        :param read_line: reads a line given a prompt; raises EOFError once there is no more input.
+        """
+        text = ''
+        while True:
+            try:
+                line = read_line(CONTINUATION_PROMPT if text else PROMPT)
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                text = ''
+                click.echo()
+                continue
+
+            try:
+                if text == '' and (line.strip().startswith('\\') or line.strip().lower() in ('exit', 'quit')):
+                    if not self.command(line.strip()):
+                        break
+                    continue
+
+                text += line + '\n'
+                if not is_complete(text):
+                    continue
+                statements, text = split_statements(text), ''
+                for statement in statements:
+                    self.execute(statement.sql)
+            except KeyboardInterrupt:
+                click.echo(err=True, message='Cancelled')
+            except (errors.CliErr, RequestException) as ex:
+                click.echo(err=True, message=f'Error: {ex}')
+
+
+def _read_interactive(prompt: str) -> str:
+    return input(prompt)
+
+
+def _read_stdin(prompt: str) -> str:
+    line = sys.stdin.readline()
+    if line == '':
+        raise EOFError()
+    return line.rstrip('\n')
+
+
+@click.command(help='Start an interactive shell for executing SQL statements. The connection to the API is '
+                    'kept open between statements, and the last result is kept for displaying it again '
+                    '(e.g. sorted or filtered) without executing the statement again.')
+@click.pass_obj
+@click.option('-t', '--token', default=None,
+              help='Token to use.')
+@click.option('-u', '--api-url', default=None,
+              help='URL of Upsolver\'s API. If not provided, we will try to get it automatically from the '
+                   'authentication API.')
+@click.option('-o', '--output-format', default=None,
+              help='The format that the results will be returned in. '
+                   'Supported formats: Json, Csv, Tsv, Plain. Default is Json.')
+@click.option('--timeout', 'timeout_sec', default='30s', callback=convert_time_str,
+              help='Timeout setting for pending responses. Default is 30s.')
+def shell(
+        ctx: CliContext,
+        token: Optional[str],
+        api_url: Optional[str],
+        output_format: Optional[str],
+        timeout_sec: float) -> None:
+    output_fmt = get_output_format(output_format) if output_format else ctx.confman.get_output_fmt()
+    upsolver_api = ctx.build_query_api(token, api_url)
+
+    interactive = sys.stdin.isatty()
+    if interactive:
+        try:
+            import readline  # noqa: F401 (line editing and history for input())
+        except ImportError:
+            pass
+        click.echo('Upsolver shell; enter \\help for help.')
+
+    Shell(ctx, upsolver_api, output_fmt, timeout_sec).run(_read_interactive if interactive else _read_stdin)
@@ -24,6 +24,7 @@ class Profile(NamedTuple):
     token: Optional[str] = None
     base_url: Optional[URL] = None
     output: Optional[OutputFmt] = None
+    max_rps: Optional[float] = None  # max number of requests per second to issue to the API
 
     def is_default(self) -> bool:
         return self.name == 'default'
@@ -100,7 +101,7 @@ class ConfigurationManager(object):
 
     CLI_HOME_DIR: Path = get_home_dir()
     CLI_DEFAULT_LOG_PATH: Path = CLI_HOME_DIR / 'cli.log'
-    CLI_DEFAULT_BASE_URL = parse_url('https://api.upsolver.com/')
+    CLI_DEFAULT_BASE_URL = URL('https://api.upsolver.com')
     DEFAULT_OUTPUT_FMT = OutputFmt.JSON
 
     conf_path: Path
@@ -152,12 +153,22 @@ class ConfigurationManager(object):
             except ValueError:
                 raise ConfigErr(f'Invalid output format defined in "{profile_section}": {conf_fmt}')
 
+            conf_max_rps = confparser.get(profile_section, 'max_rps', fallback=None)
+            try:
+                max_rps = float(conf_max_rps) if conf_max_rps else None
+                if max_rps is not None and not max_rps > 0:
+                    raise ValueError()
+            except ValueError:
+                raise ConfigErr(f'Invalid max_rps defined in "{profile_section}": {conf_max_rps} '
+                                f'(should be a positive number)')
+
             profiles.append(
                 Profile(
                     name=section_parts[1] if len(section_parts) > 1 else "default",
                     token=confparser.get(profile_section, 'token', fallback=None),
                     base_url=parse_url(confparser.get(profile_section, 'base_url', fallback=None)),
-                    output=output_fmt
+                    output=output_fmt,
+                    max_rps=max_rps
                 )
             )
 
@@ -186,9 +197,17 @@ class ConfigurationManager(object):
         assert self.auth_api_url.is_absolute()
         self.conf = self._parse_conf_file(self.conf_path, profile, verbose)
 
+    def get_profile(self, name: str) -> Profile:
+        profile = next((p for p in self.conf.profiles if p.name == name), None)
+        if profile is None:
+            raise ConfigErr(f'Profile \'{name}\' is not defined in {self.conf_path}')
+        return profile
+
+    def get_output_fmt(self) -> OutputFmt:
+        return self.conf.active_profile.output or self.DEFAULT_OUTPUT_FMT
+
     def get_formatter(self) -> Formatter:
-        fmt = self.conf.active_profile.output or self.DEFAULT_OUTPUT_FMT
-        return fmt.get_formatter()
+        return self.get_output_fmt().get_formatter()
 
     def update_profile(self, profile: Profile, force: bool = False) -> Config:
         """
@@ -216,6 +235,8 @@ class ConfigurationManager(object):
             confparser.set(section=profile_section_name, option='base_url', value=str(profile.base_url))
         if profile.output:
             confparser.set(section=profile_section_name, option='output', value=profile.output.name)
+        if profile.max_rps:
+            confparser.set(section=profile_section_name, option='max_rps', value=str(profile.max_rps))
 
         with open(self.conf_path, 'w') as conf_file:
             confparser.write(conf_file)
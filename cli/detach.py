@@ -0,0 +1,127 @@
+import json
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+from requests import Response
+
+from cli import errors
+from cli.buffer import DEFAULT_MEMORY_BUDGET, MemoryBudget, PageBuffer
+from cli.upsolver.entities import ResultPage
+from cli.upsolver.poller import read_response
+from cli.upsolver.query import RestQueryApi
+from cli.upsolver.response import UpsolverResponse
+from cli.utils import get_logger
+
+"""
+Detached execution: submitting a query without waiting for its results, and collecting the results
+later (e.g. from another process) using the handle returned on submission.
+
+The handle of a pending query is the path its results are polled at. Queries whose results are ready
+right away have no such path, so their response is kept in a local file until it's collected, and their
+handle refers to that file.
+"""
+
+LOCAL_HANDLE_PREFIX = 'local:'
+
+
+def submit_detached(api: RestQueryApi, query: str, local_dir: Path) -> str:
+    """
+    :param local_dir: directory to keep responses of queries whose results were ready right away in.
+    :return: the handle of the query.
+    """
+    resp = api.submit(query)
+    _, pending_path = read_response(resp)
+    if pending_path is not None:
+        return pending_path
+
+    name = str(uuid.uuid4())
+    local_dir.mkdir(parents=True, exist_ok=True)
+    (local_dir / f'{name}.json').write_text(json.dumps({'status_code': resp.status_code, 'body': resp.text}))
+    return LOCAL_HANDLE_PREFIX + name
+
+
+def _local_response(path: Path) -> UpsolverResponse:
+    try:
+        saved = json.loads(path.read_text())
+    except FileNotFoundError:
+        raise errors.ConfigErr(f'No results of the handle were found at {path} (they may have been '
+                               f'collected already)')
+    resp = Response()
+    resp.status_code = saved['status_code']
+    resp._content = saved['body'].encode('utf-8')
+    resp.encoding = 'utf-8'
+    return UpsolverResponse(resp)
+
+
+def collect(api: RestQueryApi, handle: str, timeout_sec: float, local_dir: Path,
+            cancelled: Optional[threading.Event] = None) -> Iterator[ResultPage]:
+    """
+    :param cancelled: see RestQueryApi.results.
+    :return: the pages of the results of a detached query, waiting up to timeout_sec for them to be
+    ready. Responses kept locally are removed once all of the pages were received. The query is left
+    running if waiting for it times out or is interrupted, so that its results can be collected later.
+    """
+    if not handle.startswith(LOCAL_HANDLE_PREFIX):
+        yield from api.resume(handle, timeout_sec, cancelled, cancel_on_abort=False)
+        return
+
+    name = handle[len(LOCAL_HANDLE_PREFIX):]
+    if re.fullmatch(r'[0-9a-f-]+', name) is None:
+        raise errors.InvalidOptionErr(f'Invalid handle \'{handle}\'')
+    path = local_dir / f'{name}.json'
+    yield from api.results(_local_response(path), timeout_sec, cancelled, cancel_on_abort=False)
+    path.unlink()
+
+
+class HandleOutcome(NamedTuple):
+    handle: str
+    pages: Optional[PageBuffer] = None  # results, if collecting them succeeded (to be closed by the consumer)
+    error: Optional[Exception] = None
+
+
+def collect_all(api: RestQueryApi, handles: List[str], timeout_sec: float, local_dir: Path, concurrency: int,
+                memory_budget: int = DEFAULT_MEMORY_BUDGET) -> Iterator[HandleOutcome]:
+    """
+    Wait on the results of several detached queries at once.
+
+    :param memory_budget: for buffering the results of all handles (see PageBuffer).
+    :return: outcomes in order of the handles. Failing to collect the results of one handle doesn't
+    stop the others, but collecting stops once the outcomes stop being consumed (e.g. when interrupted).
+    """
+    log = get_logger('Collect')
+    budget = MemoryBudget(memory_budget)
+    cancelled = threading.Event()
+
+    def run(handle: str) -> HandleOutcome:
+        buffer = PageBuffer(budget)
+        try:
+            for page in collect(api, handle, timeout_sec, local_dir, cancelled):
+                buffer.append(page)
+        except Exception as ex:
+            log.debug(f'collecting results of {handle} failed: {ex}')
+            buffer.close()
+            return HandleOutcome(handle, error=ex)
+        return HandleOutcome(handle, pages=buffer)
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = [pool.submit(run, h) for h in handles]
+    reported = 0
+    try:
+        for f in futures:
+            outcome = f.result()
+            reported += 1  # from here on, the outcome is the consumer's to close
+            yield outcome
+    finally:
+        if reported < len(futures):
+            cancelled.set()
+            for f in futures[reported:]:
+                f.cancel()
+        pool.shutdown(wait=True)
+        for f in futures[reported:]:
+            pages = None if f.cancelled() else f.result().pages
+            if pages is not None:
+                pages.close()
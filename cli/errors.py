@@ -3,11 +3,12 @@ from abc import ABCMeta, abstractmethod
 from enum import Enum
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from yarl import URL
 
-from cli.upsolver.requester import UpsolverResponse
+if TYPE_CHECKING:  # importing it at runtime would be circular (response depends on errors)
+    from cli.upsolver.response import UpsolverResponse
 
 
 class ExitCode(Enum):
@@ -18,6 +19,8 @@ class ExitCode(Enum):
     ConfigurationErr = -3
     ApiUnavailable = -4
     InvalidOption = -5
+    OutputErr = -6
+    Cancelled = -7
 
     UserHasNoOrgs = -100
     EntityNotFound = -101
@@ -32,6 +35,10 @@ class ExitCode(Enum):
 
 - ConfigErr: errors related to configuration (e.g. failure to read config from disk)
 
+- OutputErr: failure to write results to a local destination (e.g. a file or a database)
+
+- QueryCancelled: the execution of a query was stopped before it completed (e.g. when interrupted)
+
 - RequestErr: sub-divides into two major classes:
   1. NetworkErr: something went wrong at the network layer (e.g. request timeout or invalid host)
 
@@ -129,6 +136,21 @@ class ConfigReadFail(ConfigErr):
                ('' if self.why is None else f': {self.why}')
 
 
+class OutputErr(CliErr):
+    @staticmethod
+    def exit_code() -> ExitCode:
+        return ExitCode.OutputErr
+
+
+class QueryCancelled(CliErr):
+    @staticmethod
+    def exit_code() -> ExitCode:
+        return ExitCode.Cancelled
+
+    def __str__(self) -> str:
+        return 'Query was cancelled'
+
+
 # Request Errors
 class RequestErr(CliErr, metaclass=ABCMeta):
     """
@@ -148,6 +170,21 @@ class NetworkErr(RequestErr):
         return ExitCode.NetworkErr
 
 
+class CircuitOpenErr(NetworkErr):
+    """
+    Requests to the host have been failing, so further requests fail right away for a while (see
+    CircuitBreaker) instead of waiting on a host that is down.
+    """
+
+    def __init__(self, host: str, retry_in_sec: float) -> None:
+        self.host = host
+        self.retry_in_sec = retry_in_sec
+
+    def __str__(self) -> str:
+        return f'Requests to {self.host} are failing; not sending further requests to it for ' \
+               f'{self.retry_in_sec:.0f}s'
+
+
 class ApiErr(RequestErr):
     """
     Invalid usage of API (invalid credentials, bad method call). In other words, we have a valid
@@ -158,7 +195,7 @@ class ApiErr(RequestErr):
     def exit_code() -> ExitCode:
         return ExitCode.ApiErr
 
-    def __init__(self, resp: UpsolverResponse) -> None:
+    def __init__(self, resp: 'UpsolverResponse') -> None:
         self.resp = resp
 
     def detail_message(self) -> Optional[str]:
@@ -202,7 +239,7 @@ class AuthErr(ApiErr):
 
 
 class PendingResultTimeout(ApiErr):
-    def __init__(self, resp: UpsolverResponse):
+    def __init__(self, resp: 'UpsolverResponse'):
         super().__init__(resp)
 
     def __str__(self) -> str:
@@ -214,7 +251,7 @@ class PendingResultTimeout(ApiErr):
 
 
 class PayloadErr(ApiErr):
-    def __init__(self, resp: UpsolverResponse, msg: str):
+    def __init__(self, resp: 'UpsolverResponse', msg: str):
         super().__init__(resp)
         self.msg = msg
 
@@ -227,7 +264,7 @@ class PayloadPathKeyErr(ApiErr):
     describes failure to access some path within (json) dictionary of response's payload.
     """
 
-    def __init__(self, resp: UpsolverResponse, bad_path: str):
+    def __init__(self, resp: 'UpsolverResponse', bad_path: str):
         """
         :param resp: response object
         :param bad_path: e.g. "x.y.z" means we attempted to access field z within y within x
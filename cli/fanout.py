@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from cli.buffer import DEFAULT_MEMORY_BUDGET, MemoryBudget, PageBuffer
+from cli.upsolver.entities import Column, ResultPage
+from cli.upsolver.query import RestQueryApi
+from cli.utils import get_logger
+
+"""
+Execution of a single query against several environments (each configured as a profile) at once.
+"""
+
+PROFILE_COLUMN = 'profile'
+
+
+class ProfileOutcome(NamedTuple):
+    profile: str
+    pages: Optional[PageBuffer] = None  # results, if the query succeeded (to be closed by the consumer)
+    error: Optional[Exception] = None
+
+
+def with_profile(page: ResultPage, profile: str) -> ResultPage:
+    """
+    :return: the page with the name of the profile it came from added as the first column (or, for
+    pages that aren't grids, as a field of the response).
+    """
+    if page.is_grid():
+        return page._replace(
+            columns=[Column(PROFILE_COLUMN)] + (page.columns or []),
+            data=[[profile] + list(row) for row in page.data]
+        )
+    return page._replace(data=[
+        {PROFILE_COLUMN: profile, **r} if type(r) is dict else r for r in page.data
+    ])
+
+
+def run_on_profiles(profiles: List[str], build_api: Callable[[str], RestQueryApi], query: str,
+                    timeout_sec: float, concurrency: int,
+                    memory_budget: int = DEFAULT_MEMORY_BUDGET) -> Iterator[ProfileOutcome]:
+    """
+    :param profiles: names of the profiles to execute the query with.
+    :param build_api: builds the api of a profile (given its name); called from worker threads, so
+    that failing to set up one profile doesn't affect the others.
+    :param memory_budget: for buffering the results of all profiles (see PageBuffer).
+    :return: outcomes in order of the profiles. A failure of one profile doesn't stop the others, but
+    queries still running when the outcomes stop being consumed (e.g. when interrupted) are cancelled.
+    """
+    log = get_logger('FanOut')
+    budget = MemoryBudget(memory_budget)
+    cancelled = threading.Event()
+
+    def run(profile: str) -> ProfileOutcome:
+        buffer = PageBuffer(budget)
+        try:
+            for page in build_api(profile).execute_pages(query, timeout_sec, cancelled):
+                buffer.append(with_profile(page, profile))
+        except Exception as ex:
+            log.debug(f'query failed for profile {profile}: {ex}')
+            buffer.close()
+            return ProfileOutcome(profile, error=ex)
+        return ProfileOutcome(profile, pages=buffer)
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = [pool.submit(run, p) for p in profiles]
+    reported = 0
+    try:
+        for f in futures:
+            outcome = f.result()
+            reported += 1  # from here on, the outcome is the consumer's to close
+            yield outcome
+    finally:
+        if reported < len(futures):
+            cancelled.set()
+            for f in futures[reported:]:
+                f.cancel()
+        pool.shutdown(wait=True)
+        for f in futures[reported:]:
+            pages = None if f.cancelled() else f.result().pages
+            if pages is not None:
+                pages.close()
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from cli import errors
+from cli.pipeline import resolve_path
+from cli.sharding import restrict_query, sql_literal
+from cli.upsolver.columns import ColumnKind, decode_column
+from cli.upsolver.entities import ResultPage
+from cli.utils import get_logger
+
+"""
+Following a growing table: executing a query again and again, each time restricted to the rows whose
+watermark column is past the highest value seen so far.
+"""
+
+# types of (decoded) values that can serve as a watermark, by kind of column
+_watermark_types = {
+    ColumnKind.INTEGER: (int,),
+    ColumnKind.FLOAT: (int, float),
+    ColumnKind.TIMESTAMP: (datetime,),
+    ColumnKind.DATE: (date,),
+    ColumnKind.OTHER: (str,),
+}
+
+
+class WatermarkStore(object):
+    """
+    Persists the watermark of a followed query (as the SQL literal the column is compared with) in a
+    file named after the query and the column, so that following the same query again resumes where
+    it stopped.
+    """
+
+    def __init__(self, directory: Path, query: str, column: str) -> None:
+        digest = hashlib.sha256(f'{column}\n{query}'.encode('utf-8')).hexdigest()[:16]
+        self.path = directory / f'{digest}.json'
+        self.query = query
+        self.column = column
+
+    def load(self) -> Optional[str]:
+        if not self.path.exists():
+            return None
+        try:
+            return json.loads(self.path.read_text())['literal']
+        except (ValueError, KeyError, TypeError) as ex:
+            raise errors.ConfigErr(f'Invalid watermark file {self.path}: {ex}')
+
+    def save(self, literal: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'query': self.query, 'column': self.column, 'literal': literal}))
+        os.replace(tmp_path, self.path)  # so that the file is never left half written
+
+
+class Follower(object):
+    """
+    Executes a query restricted to the rows past the watermark, and advances the watermark to the
+    highest value of the column in the rows received. The watermark is saved once all pages of an
+    execution were consumed, so rows may be received again (but aren't lost) if following is
+    interrupted in the middle of an execution.
+
+    Executions are spaced adaptively: min_interval_sec after an execution that returned rows, and
+    twice the previous interval (up to max_interval_sec) after one that didn't.
+    """
+
+    def __init__(self, execute: Callable[[str], Iterator[ResultPage]], query: str, column: str,
+                 store: WatermarkStore, min_interval_sec: float, max_interval_sec: float) -> None:
+        """
+        :param execute: executes a query, returning its pages.
+        """
+        self.execute = execute
+        self.query = query
+        self.column = column
+        self.store = store
+        self.min_interval_sec = min_interval_sec
+        self.max_interval_sec = max(min_interval_sec, max_interval_sec)
+        self.literal: Optional[str] = store.load()
+        self.rows = 0  # rows received by the last execution
+        self.log = get_logger('Follower')
+
+    def restricted_query(self) -> str:
+        if self.literal is None:
+            return self.query
+        return restrict_query(self.query, f'{self.column} > {self.literal}', 'follow_query')
+
+    def _highest(self, page: ResultPage, highest: Any) -> Any:
+        columns = page.columns or []
+        idx, nested = resolve_path(self.column, columns)
+        if len(nested) > 0:
+            raise errors.InvalidOptionErr(f'Watermark \'{self.column}\' should be a column '
+                                          f'(not a field of a nested value)')
+
+        decoded = decode_column(columns[idx], [row[idx] for row in page.data])
+        types = _watermark_types.get(decoded.kind)
+        if types is None:
+            raise errors.InvalidOptionErr(f'Watermark \'{self.column}\' should be a number, a timestamp, '
+                                          f'a date or a string')
+        present = [v for v in decoded.to_list() if v is not None]
+        values = [v for v in present if type(v) in types]
+        if len(present) > 0 and len(values) == 0:
+            # otherwise the watermark would never advance, and the same rows be received forever
+            raise errors.InvalidOptionErr(f'Watermark \'{self.column}\' has no usable values (e.g. '
+                                          f'{present[0]!r}); it should be a number, a timestamp, a date '
+                                          f'or a string')
+        if highest is not None:
+            values.append(highest)
+        return max(values) if len(values) > 0 else None
+
+    def poll(self) -> Iterator[ResultPage]:
+        """
+        :return: the pages of a single execution.
+        """
+        self.rows = 0
+        highest = None
+        for page in self.execute(self.restricted_query()):
+            if page.is_grid() and len(page.data) > 0:
+                self.rows += len(page.data)
+                highest = self._highest(page, highest)
+            yield page
+
+        if highest is not None:
+            self.literal = sql_literal(highest)
+            self.store.save(self.literal)
+        self.log.debug(f'received {self.rows} rows; watermark is {self.literal}')
+
+    def follow(self, cycles: Optional[int] = None) -> Iterator[Iterator[ResultPage]]:
+        """
+        :param cycles: number of executions; unlimited if None.
+        :return: for every execution, its pages (to be consumed before the next one).
+        """
+        interval_sec = self.min_interval_sec
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            yield self.poll()
+            cycle += 1
+            if self.rows > 0:
+                interval_sec = self.min_interval_sec
+            else:
+                interval_sec = min(interval_sec * 2, self.max_interval_sec)
+            if cycles is None or cycle < cycles:
+                time.sleep(interval_sec)
@@ -0,0 +1,87 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterator, List, Optional
+
+from cli.formatters import Formatter, OutputFmt
+from cli.upsolver.entities import ResultPage
+
+"""
+Formatting of result pages on a pool of processes, so that formatting (which, for large results,
+is where the time goes) isn't limited to a single core.
+
+Pages are split into slices of rows, every slice is formatted by one of the processes, and the
+formatted slices are returned in order. Only a bounded number of pages is in flight at any time,
+so memory use doesn't depend on how far fetching results gets ahead of formatting them.
+"""
+
+SLICE_ROWS = 2000  # rows formatted by a single task
+
+
+def format_results(page: ResultPage, fmt: Formatter) -> Iterator[str]:
+    """
+    :return: formatted results of the page, one string per row (or per message).
+    """
+    for res_part in page.to_execution_result():
+        response_kind = res_part.get("kind")
+        if response_kind == "upsolver_query_response":
+            yield fmt(res_part.get("message"))
+        else:
+            yield fmt(res_part)
+
+
+def _format_slice(output_fmt: str, page: ResultPage, header: bool) -> str:
+    fmt = OutputFmt(output_fmt).get_formatter(header)
+    return ''.join(s + '\n' for s in format_results(page, fmt))
+
+
+def _has_rows(page: ResultPage) -> bool:
+    """
+    Whether a header would be written when formatting the page (messages don't have one).
+    """
+    if page.is_grid():
+        return len(page.data) > 0
+    return any(r.get("kind") != "upsolver_query_response" for r in page.to_execution_result())
+
+
+def _slices(page: ResultPage) -> List[ResultPage]:
+    if not page.is_grid() or len(page.data) <= SLICE_ROWS:
+        return [page]
+    return [page._replace(data=page.data[i:i + SLICE_ROWS]) for i in range(0, len(page.data), SLICE_ROWS)]
+
+
+class FormatPool(object):
+    def __init__(self, output_fmt: OutputFmt, workers: int,
+                 max_pages_in_flight: Optional[int] = None) -> None:
+        """
+        :param max_pages_in_flight: pages sent to the pool whose output wasn't returned yet; by
+        default, twice the number of workers.
+        """
+        self.output_fmt = output_fmt
+        self.max_pages_in_flight = max_pages_in_flight or 2 * workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+    def format_pages(self, pages: Iterator[ResultPage]) -> Iterator[str]:
+        """
+        :return: the output of every page (as written by execute without the pool), in order.
+        """
+        in_flight: Deque[List['Future[str]']] = deque()  # futures of the slices of every page
+        header = True  # only the first formatted rows should be preceded by a header
+
+        def completed() -> str:
+            return ''.join(f.result() for f in in_flight.popleft())
+
+        for page in pages:
+            futures = []
+            for s in _slices(page):
+                futures.append(self.pool.submit(_format_slice, self.output_fmt.value, s, header))
+                header = header and not _has_rows(s)
+            in_flight.append(futures)
+
+            while len(in_flight) >= self.max_pages_in_flight:
+                yield completed()
+
+        while len(in_flight) > 0:
+            yield completed()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
@@ -2,10 +2,12 @@ import csv
 import dataclasses
 import io
 import json
+from array import array
+from datetime import date
 from enum import Enum
 from functools import partial
 from json import JSONEncoder
-from typing import Any, Callable, Optional
+from typing import Any, Callable, List, Optional
 
 from tabulate import tabulate
 
@@ -21,13 +23,17 @@ class OutputFmt(Enum):
     TSV = 'tsv'
     PLAIN = 'plain'
 
-    def get_formatter(self) -> Formatter:
+    def get_formatter(self, header: bool = True) -> Formatter:
+        """
+        :param header: whether the formatter should write a header before the first rows (for
+        formats that have one); disabled when formatting a continuation of previous output.
+        """
         if self == OutputFmt.JSON:
             return fmt_json
         elif self == OutputFmt.CSV:
-            return fmt_csv()
+            return fmt_csv(header=header)
         elif self == OutputFmt.TSV:
-            return fmt_csv(delimiter='\t')
+            return fmt_csv(delimiter='\t', header=header)
         elif self == OutputFmt.PLAIN:
             return fmt_plain
         else:
@@ -47,9 +53,14 @@ def to_dict_maybe(o: Any) -> Optional[dict]:
 
 def fmt_json(x: Any) -> str:
     class DataclassesJSONEncoder(JSONEncoder):
-        def default(self, o: Any) -> dict:
+        def default(self, o: Any) -> Any:
             if dataclasses.is_dataclass(o):
                 return dataclasses.asdict(o)
+            # values of typed columns (see cli.upsolver.columns)
+            if isinstance(o, date):  # also covers datetime
+                return o.isoformat()
+            if isinstance(o, array):
+                return o.tolist()
             return super().default(o)
 
     def dumps(y: Any) -> str:
@@ -79,10 +90,10 @@ def to_dict_or_raise(x: Any, desired_fmt: OutputFmt) -> dict:
     return maybe_dict
 
 
-def fmt_csv(delimiter: str = ',') -> Callable[[Any], str]:
+def fmt_csv(delimiter: str = ',', header: bool = True) -> Callable[[Any], str]:
     to_dict: Callable[[Any], dict] = partial(to_dict_or_raise, desired_fmt=OutputFmt.CSV)
 
-    wroteHeader = False
+    wroteHeader = not header
 
     def fmt_list(xs: list) -> str:
         nonlocal wroteHeader
@@ -130,6 +141,45 @@ def fmt_plain(x: Any) -> str:
     return fmt_any(x, fmt_list)
 
 
+class PlainTable(object):
+    """
+    Formats rows of a grid as one aligned table, similar to fmt_plain, without holding all rows
+    at once: all rows are first passed to measure (to find the width of every column), and then
+    formatted in batches using format_rows.
+    """
+
+    def __init__(self, headers: List[str]) -> None:
+        self.headers = headers
+        self.widths = [len(h) for h in headers]
+        self.numeric = [True for _ in headers]  # numeric columns are aligned to the right
+
+    @staticmethod
+    def _str(v: Any) -> str:
+        if v is None:
+            return ''
+        elif type(v) is float:
+            return format(v, 'g')
+        return str(v)
+
+    def measure(self, rows: List[List[Any]]) -> None:
+        for i, values in enumerate(zip(*rows)):
+            self.widths[i] = max(self.widths[i], max(len(self._str(v)) for v in values))
+            if self.numeric[i]:
+                self.numeric[i] = all(v is None or type(v) in (int, float) for v in values)
+
+    def _line(self, values: List[str]) -> str:
+        return '  '.join(
+            v.rjust(w) if numeric else v.ljust(w)
+            for v, w, numeric in zip(values, self.widths, self.numeric)
+        ).rstrip()
+
+    def header(self) -> str:
+        return self._line(self.headers) + '\n' + '  '.join('-' * w for w in self.widths)
+
+    def format_rows(self, rows: List[List[Any]]) -> str:
+        return '\n'.join(self._line([self._str(v) for v in row]) for row in rows)
+
+
 def get_output_format(output_format: Optional[str]) -> OutputFmt:
     if output_format is not None:
         try:
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Set
+
+from cli import errors
+from cli.upsolver.lexer import Statement
+
+"""
+Journals of script runs: which statements of a script completed, so that a run that failed can be
+resumed from the first statement that didn't complete.
+"""
+
+
+class RunJournal(object):
+    """
+    The journal of a script is kept in a file named after a hash of the script's content and of the API
+    it runs against (so an edited script, or the same script run against another environment, gets a
+    journal of its own), and removed once all of its statements completed.
+    """
+
+    def __init__(self, directory: Path, script: str, api_url: str) -> None:
+        digest = hashlib.sha256(f'{api_url}\n{script}'.encode('utf-8')).hexdigest()[:16]
+        self.path = directory / f'{digest}.json'
+        self.completed: Set[int] = set()  # numbers of the statements that completed
+
+    def load(self) -> Set[int]:
+        if not self.path.exists():
+            return set()
+        try:
+            return set(json.loads(self.path.read_text())['completed'])
+        except (ValueError, KeyError, TypeError) as ex:
+            raise errors.ConfigErr(f'Invalid journal file {self.path}: {ex}')
+
+    def start(self, resume: bool) -> Set[int]:
+        """
+        :param resume: whether to keep the statements that completed in the previous run (otherwise, the
+        journal starts over).
+        :return: numbers of the statements that completed in the previous run.
+        """
+        self.completed = self.load() if resume else set()
+        self._save()
+        return set(self.completed)
+
+    def complete(self, statement: Statement) -> None:
+        self.completed.add(statement.number)
+        self._save()
+
+    def finish(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'completed': sorted(self.completed)}))
+        os.replace(tmp_path, self.path)  # so that the journal is never left half written
@@ -12,11 +12,14 @@ from yarl import URL
 
 import cli as clipkg
 from cli import errors
+from cli.commands.batch import batch
 from cli.commands.configure import configure
 from cli.commands.context import CliContext
 from cli.commands.execute import execute
+from cli.commands.results import results
+from cli.commands.shell import shell
 from cli.config import ConfigurationManager
-from cli.utils import parse_url
+from cli.utils import convert_size_str, parse_url
 
 
 @click.group(context_settings=dict(help_option_names=['-h', '--help']))
@@ -29,11 +32,16 @@ from cli.utils import parse_url
               help='Path of the upsolver configuration file. Default is `~/.upsolver/config`.')
 @click.option('-v', '--verbose', is_flag=True, default=False,
               help='Set verbose output.')
+@click.option('--memory-budget', default=None, callback=convert_size_str,
+              help='Maximum amount of result data to hold in memory (e.g. 512MB) when results need to be '
+                   'buffered (e.g. for sorting or for Plain output); beyond that, results are spilled to '
+                   'temporary files. Default is 256MB.')
 def cli(
         ctx: click.Context,
         profile: Optional[str],
         config: Optional[str],
-        verbose: bool) -> None:
+        verbose: bool,
+        memory_budget: Optional[int]) -> None:
     """
     Upsolver CLI
     """
@@ -46,11 +54,17 @@ def cli(
     auth_api_url_env_var = os.environ.get('AUTH_API_URL')
     auth_api_url = parse_url(auth_api_url_env_var) if auth_api_url_env_var else None
 
-    ctx.obj = CliContext(confman=ConfigurationManager(conf_path, profile, verbose, auth_api_url))
+    ctx.obj = CliContext(
+        confman=ConfigurationManager(conf_path, profile, verbose, auth_api_url),
+        memory_budget=memory_budget
+    )
 
 
 cli.add_command(configure)
 cli.add_command(execute)
+cli.add_command(batch)
+cli.add_command(shell)
+cli.add_command(results)
 
 
 def exit_with(code: errors.ExitCode, msg: str) -> None:
@@ -0,0 +1,268 @@
+import operator
+import re
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from cli import errors
+from cli.upsolver.entities import Column, ResultPage
+
+"""
+Client-side processing of query results. A PageStage takes the stream of result pages (as
+received from the API, see ResultPage) and returns a transformed stream; stages are chained in
+the execute command between fetching the pages and formatting them.
+
+Stages work on the grid of each page (rows are lists of values, ordered like the page's
+columns), before rows are turned into dictionaries and flattened by the formatters. Pages of
+statements that don't return a table are passed through as-is.
+"""
+PageStage = Callable[[Iterator[ResultPage]], Iterator[ResultPage]]
+
+
+def apply_stages(pages: Iterator[ResultPage], stages: List[PageStage]) -> Iterator[ResultPage]:
+    for stage in stages:
+        pages = stage(pages)
+    return pages
+
+
+def close_pages(pages: Iterator[ResultPage]) -> None:
+    """
+    Stop the stream of pages. Stages (and the API's page iterator) are generators, and closing
+    the outermost one finalizes the whole chain immediately, instead of whenever it happens to
+    be garbage collected.
+    """
+    close = getattr(pages, 'close', None)
+    if close is not None:
+        close()
+
+
+def resolve_path(path: str, columns: List[Column]) -> Tuple[int, Tuple[str, ...]]:
+    """
+    Find the column a (dot separated) path refers to. Paths may point into nested values, e.g.
+    'b.c' refers to field c of column b (unless there's a column named 'b.c').
+
+    :return: (index of the column, tuple of keys to look up within the column's value)
+    """
+    names = [c.name for c in columns]
+    parts = path.split('.')
+    for i in range(len(parts), 0, -1):
+        prefix = '.'.join(parts[:i])
+        if prefix in names:
+            return names.index(prefix), tuple(parts[i:])
+
+    raise errors.InvalidOptionErr(f'Unknown column \'{path}\'; '
+                                  f'available columns are: {", ".join(names)}')
+
+
+def value_getter(idx: int, keys: Tuple[str, ...]) -> Callable[[Any], Any]:
+    if len(keys) == 0:
+        return operator.itemgetter(idx)
+
+    def get(row: Any) -> Any:
+        v = row[idx]
+        for k in keys:
+            if type(v) is not dict:
+                return None
+            v = v.get(k)
+        return v
+
+    return get
+
+
+class Projection(object):
+    """
+    Keeps only the given columns (in the given order). Columns are extracted from the rows by
+    index, so wide results with few selected columns are cheap to format.
+    """
+
+    def __init__(self, paths: List[str]) -> None:
+        self.paths = paths
+        self._columns: Optional[List[Column]] = None  # columns of the page the plan was built for
+        self._plan: Any = None
+
+    def _build_plan(self, columns: List[Column]) -> Tuple[List[Column], Callable[[List[Any]], List[Any]]]:
+        resolved = [resolve_path(p, columns) for p in self.paths]
+        projected = [
+            Column(path, columns[idx].type if len(keys) == 0 else None)
+            for path, (idx, keys) in zip(self.paths, resolved)
+        ]
+
+        extract: Callable[[List[Any]], List[Any]]
+        if all(len(keys) == 0 for _, keys in resolved):
+            indices = [idx for idx, _ in resolved]
+            if len(indices) == 1:
+                i = indices[0]
+                extract = lambda data: [[row[i]] for row in data]  # noqa: E731
+            else:
+                getter = operator.itemgetter(*indices)
+                extract = lambda data: list(map(getter, data))  # noqa: E731
+        else:
+            getters = [value_getter(idx, keys) for idx, keys in resolved]
+            extract = lambda data: [[g(row) for g in getters] for row in data]  # noqa: E731
+
+        return projected, extract
+
+    def __call__(self, pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+        for page in pages:
+            if not page.is_grid():
+                yield page
+                continue
+
+            if self._plan is None or page.columns != self._columns:
+                self._columns = page.columns
+                self._plan = self._build_plan(page.columns or [])
+
+            projected, extract = self._plan
+            yield page._replace(columns=projected, data=extract(page.data))
+
+
+class Comparison(NamedTuple):
+    path: str
+    op: str  # one of Predicate.OPS
+    value: Any
+
+
+_comparison_re = re.compile(
+    r"""\s*(?P<path>[^\s=!<>]+)\s*(?:
+        (?P<op>==|=|!=|<>|<=|>=|<|>)\s*(?P<value>'(?:[^']|'')*'|[^\s']+)
+        |(?P<is_null>is\s+(?P<not>not\s+)?null)
+    )\s*""",
+    re.IGNORECASE | re.VERBOSE
+)
+_and_re = re.compile(r'and\s+', re.IGNORECASE)
+
+
+def _parse_literal(s: str) -> Any:
+    if s.startswith("'"):
+        return s[1:-1].replace("''", "'")
+    lowered = s.lower()
+    if lowered == 'null':
+        return None
+    elif lowered in ('true', 'false'):
+        return lowered == 'true'
+    for convert in (int, float):
+        try:
+            return convert(s)
+        except ValueError:
+            pass
+    return s
+
+
+def parse_predicate(expression: str) -> List[Comparison]:
+    """
+    Parse a simple predicate: comparisons of a column (path) to a literal, joined by AND. e.g.
+
+      status = 'Running' and delay > 10 and error is not null
+
+    :return: list of Comparison
+    """
+    invalid = errors.InvalidOptionErr(f'Invalid predicate: {expression} (valid example: '
+                                      f'"col1 = \'x\' and col2 >= 10 and col3 is not null")')
+
+    comparisons = []
+    pos = 0
+    while pos < len(expression):
+        m = _comparison_re.match(expression, pos)
+        if m is None:
+            raise invalid
+        if m.group('is_null') is not None:
+            comparisons.append(Comparison(m.group('path'), '!=' if m.group('not') else '=', None))
+        else:
+            value = _parse_literal(m.group('value'))
+            if value is None and m.group('op') not in ('=', '==', '!=', '<>'):
+                raise errors.InvalidOptionErr(f'Invalid predicate: {expression} (null can only be compared '
+                                              f'with =, != or is [not] null)')
+            comparisons.append(Comparison(m.group('path'), m.group('op'), value))
+        pos = m.end()
+        if pos < len(expression):
+            and_m = _and_re.match(expression, pos)
+            if and_m is None or and_m.end() == len(expression):
+                raise invalid
+            pos = and_m.end()
+
+    if len(comparisons) == 0:
+        raise invalid
+    return comparisons
+
+
+class Predicate(object):
+    """
+    Keeps only rows for which all comparisons hold. Comparing values of incompatible types (e.g.
+    a string to a number) is false rather than an error; comparing to null with = / != checks
+    whether the value is missing.
+    """
+
+    OPS: Dict[str, Callable[[Any, Any], bool]] = {
+        '=': operator.eq, '==': operator.eq,
+        '!=': operator.ne, '<>': operator.ne,
+        '<': operator.lt, '<=': operator.le,
+        '>': operator.gt, '>=': operator.ge,
+    }
+
+    def __init__(self, comparisons: List[Comparison]) -> None:
+        self.comparisons = comparisons
+        self._columns: Optional[List[Column]] = None
+        self._matches: Any = None
+
+    def _compile(self, columns: List[Column]) -> Callable[[Any], bool]:
+        checks: List[Callable[[Any], bool]] = []
+        for c in self.comparisons:
+            get = value_getter(*resolve_path(c.path, columns))
+            if c.value is None:
+                def check_null(row: Any, get: Callable[[Any], Any] = get,
+                               is_null: bool = c.op in ('=', '==')) -> bool:
+                    return (get(row) is None) == is_null
+
+                checks.append(check_null)
+            else:
+                op = self.OPS[c.op]
+
+                def check(row: Any, get: Callable[[Any], Any] = get, op: Callable[[Any, Any], bool] = op,
+                          value: Any = c.value) -> bool:
+                    v = get(row)
+                    try:
+                        return v is not None and op(v, value)
+                    except TypeError:
+                        return False
+
+                checks.append(check)
+
+        if len(checks) == 1:
+            return checks[0]
+        return lambda row: all(check(row) for check in checks)
+
+    def __call__(self, pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+        for page in pages:
+            if not page.is_grid():
+                yield page
+                continue
+
+            if self._matches is None or page.columns != self._columns:
+                self._columns = page.columns
+                self._matches = self._compile(page.columns or [])
+
+            yield page._replace(data=list(filter(self._matches, page.data)))
+
+
+class Limit(object):
+    """
+    Stops after the given number of rows. Since pages are fetched lazily, no further pages are
+    requested from the API once the limit is reached.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+
+    def __call__(self, pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+        remaining = self.limit
+        if remaining <= 0:
+            return
+        for page in pages:
+            if not page.is_grid():
+                yield page
+                continue
+
+            if len(page.data) >= remaining:
+                yield page._replace(data=page.data[:remaining], next_path=None)
+                return
+
+            remaining -= len(page.data)
+            yield page
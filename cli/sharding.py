@@ -0,0 +1,130 @@
+import re
+from datetime import date, datetime, timezone
+from typing import Any, List, NamedTuple, Tuple
+
+from cli import errors
+
+"""
+Splitting a query into sub-queries that can run concurrently: either by ranges of a column's values
+(shards), or by substituting each of a list of values for a placeholder in the query (a sweep).
+"""
+
+
+class SubQuery(NamedTuple):
+    sql: str
+    label: str  # what distinguishes the sub-query from the others (its range, or the substituted value)
+
+
+def _parse_bound(s: str) -> Any:
+    s = s.strip()
+    for parse in (int, float, date.fromisoformat, datetime.fromisoformat):
+        try:
+            return parse(s[:-1] + '+00:00' if parse is datetime.fromisoformat and s.endswith('Z') else s)
+        except ValueError:
+            pass
+    raise errors.InvalidOptionErr(f'Invalid range bound \'{s}\' (expected a number, a date or a timestamp)')
+
+
+def parse_range(s: str) -> Tuple[Any, Any]:
+    """
+    Parse a range of the form <start>..<end>, where both bounds are numbers, dates (2022-01-31)
+    or timestamps (2022-01-31T12:00:00). The end is exclusive.
+    """
+    start, sep, end = s.partition('..')
+    if sep == '':
+        raise errors.InvalidOptionErr(f'Invalid range \'{s}\' '
+                                      f'(expected <start>..<end>, e.g. 2022-01-01..2022-02-01)')
+    lo, hi = _parse_bound(start), _parse_bound(end)
+
+    if type(lo) in (int, float) and type(hi) in (int, float):
+        if type(lo) is not type(hi):
+            lo, hi = float(lo), float(hi)
+    elif type(lo) is date and type(hi) is datetime:
+        lo = datetime(lo.year, lo.month, lo.day, tzinfo=hi.tzinfo)
+    elif type(lo) is datetime and type(hi) is date:
+        hi = datetime(hi.year, hi.month, hi.day, tzinfo=lo.tzinfo)
+    elif type(lo) is not type(hi):
+        raise errors.InvalidOptionErr(f'Both bounds of range \'{s}\' should be of the same type')
+
+    try:
+        if not lo < hi:
+            raise errors.InvalidOptionErr(f'Range \'{s}\' is empty (its start should be before its end)')
+    except TypeError:  # timestamps with and without a time zone
+        raise errors.InvalidOptionErr(f'Both bounds of range \'{s}\' should be of the same type')
+    return lo, hi
+
+
+def split_range(lo: Any, hi: Any, shards: int) -> List[Tuple[Any, Any]]:
+    """
+    :return: list of (start, end) of up to `shards` consecutive (and equally sized) sub-ranges;
+    fewer if the range can't be split any further (e.g. a range of 3 integers into 4 shards).
+    """
+    if type(lo) is int:
+        bounds = [lo + (hi - lo) * i // shards for i in range(shards + 1)]
+    elif type(lo) is float:
+        bounds = [lo + (hi - lo) * i / shards for i in range(shards)] + [hi]
+    elif type(lo) is date:
+        days = (hi - lo).days
+        bounds = [date.fromordinal(lo.toordinal() + days * i // shards) for i in range(shards + 1)]
+    else:
+        bounds = [lo + (hi - lo) * i / shards for i in range(shards)] + [hi]
+
+    bounds = [b for i, b in enumerate(bounds) if i == 0 or b != bounds[i - 1]]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def sql_literal(v: Any) -> str:
+    if type(v) is str:
+        return "'" + v.replace("'", "''") + "'"
+    elif type(v) is date:
+        return f"DATE '{v.isoformat()}'"
+    elif type(v) is datetime:
+        if v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return f"TIMESTAMP '{v.isoformat(sep=' ')}'"
+    return repr(v)
+
+
+def restrict_query(sql: str, condition: str, alias: str) -> str:
+    """
+    :return: a query selecting the rows of sql (a single statement) that match condition.
+    """
+    return f'SELECT * FROM (\n{sql.strip().rstrip(";").rstrip()}\n) AS {alias} WHERE {condition}'
+
+
+def shard_queries(sql: str, column: str, lo: Any, hi: Any, shards: int) -> List[SubQuery]:
+    """
+    :return: list of SubQuery, each selecting the rows of the query whose value of column falls
+    within one of the sub-ranges of [lo, hi).
+    """
+    return [
+        SubQuery(
+            restrict_query(sql, f'{column} >= {sql_literal(start)} AND {column} < {sql_literal(end)}',
+                           'shard_query'),
+            f'{start}..{end}'
+        )
+        for start, end in split_range(lo, hi, shards)
+    ]
+
+
+def parse_sweep(s: str) -> Tuple[str, List[str]]:
+    """
+    Parse a sweep of the form <name>=<value>,<value>,...
+
+    :return: (name, list of values)
+    """
+    name, sep, values = s.partition('=')
+    name = name.strip()
+    if sep == '' or re.fullmatch(r'\w+', name) is None:
+        raise errors.InvalidOptionErr(f'Invalid sweep \'{s}\' (expected <name>=<value>,<value>,...)')
+    return name, [v.strip() for v in values.split(',') if v.strip() != '']
+
+
+def sweep_queries(sql: str, name: str, values: List[str]) -> List[SubQuery]:
+    """
+    :return: list of SubQuery, one per value, with the value substituted for every {name} in sql.
+    """
+    placeholder = '{' + name + '}'
+    if placeholder not in sql:
+        raise errors.InvalidOptionErr(f'The query does not contain the placeholder {placeholder}')
+    return [SubQuery(sql.replace(placeholder, v), v) for v in values]
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from cli import errors
+from cli.upsolver.columns import ColumnKind, column_kind
+from cli.upsolver.entities import Column, ResultPage
+from cli.upsolver.retry import metrics
+from cli.utils import get_logger
+
+"""
+Sinks consume result pages (see ResultPage) as they are streamed from the API and store them
+somewhere other than stdout. Unlike formatters, sinks work on the raw grid of each page and
+never build a dictionary per row.
+"""
+
+
+class CountingSink(object):
+    """
+    Counts rows, pages, response bytes and requests to the API (including retries) and discards the
+    results. Create it right before starting to consume the pages, since timings (and requests) are
+    measured from its creation.
+    """
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.pages = 0
+        self.bytes = 0
+        self.start_time = time.monotonic()
+        self.first_page_time: Optional[float] = None
+        self.start_metrics = metrics.snapshot()
+
+    def write(self, page: ResultPage) -> None:
+        if self.first_page_time is None:
+            self.first_page_time = time.monotonic()
+        self.pages += 1
+        self.bytes += page.size_bytes
+        if page.is_grid():
+            self.rows += len(page.data)
+
+    def summary(self) -> Dict[str, Any]:
+        total_sec = time.monotonic() - self.start_time
+        current_metrics = metrics.snapshot()
+        first_page_sec = self.first_page_time - self.start_time \
+            if self.first_page_time is not None else None
+        return {
+            'rows': self.rows,
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'time_to_first_page_sec': round(first_page_sec, 3) if first_page_sec is not None else None,
+            'total_time_sec': round(total_sec, 3),
+            'rows_per_sec': round(self.rows / total_sec) if total_sec > 0 else None,
+            'requests': current_metrics['requests'] - self.start_metrics['requests'],
+            'retries': current_metrics['retries'] - self.start_metrics['retries'],
+            'throttled': current_metrics['throttled'] - self.start_metrics['throttled'],
+        }
+
+
+class IfExists(Enum):
+    APPEND = 'append'
+    REPLACE = 'replace'
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+_sqlite_types = {
+    ColumnKind.INTEGER: 'INTEGER',
+    ColumnKind.BOOLEAN: 'INTEGER',
+    ColumnKind.FLOAT: 'REAL',
+}
+
+
+def _sqlite_type(column: Column) -> str:
+    """
+    Map the type reported in grid metadata to an SQLite type affinity. Unknown (or missing) types
+    fall back to TEXT, which SQLite will happily store anything in.
+    """
+    return _sqlite_types.get(column_kind(column), 'TEXT')
+
+
+class SqliteSink(object):
+    """
+    Loads result pages into an SQLite table. The table is created from the column metadata of
+    the first page it sees; every page is then inserted with a single executemany call inside
+    its own transaction.
+    """
+
+    # applied to the connection before loading; WAL journal together with synchronous=NORMAL
+    # means that committing a page doesn't wait for an fsync
+    PRAGMAS = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-65536',  # negative value means KiB, i.e. 64MiB
+    ]
+
+    def __init__(self, db_path: Path, table: str, if_exists: IfExists = IfExists.APPEND) -> None:
+        self.db_path = db_path
+        self.table = table
+        self.if_exists = if_exists
+        self.rows_written = 0
+        self.log = get_logger('SqliteSink')
+
+        try:
+            # autocommit mode; transactions are managed explicitly in write
+            self.conn = sqlite3.connect(str(db_path), isolation_level=None)
+            for pragma in self.PRAGMAS:
+                self.conn.execute(pragma)
+        except sqlite3.Error as ex:
+            raise errors.OutputErr(f'Failed to open SQLite database at {db_path}: {ex}')
+
+        self._insert_stmt: Optional[str] = None
+
+    def _create_table(self, columns: List[Column]) -> str:
+        if self.if_exists == IfExists.REPLACE:
+            self.conn.execute(f'DROP TABLE IF EXISTS {_quote_ident(self.table)}')
+
+        cols_ddl = ', '.join(f'{_quote_ident(c.name)} {_sqlite_type(c)}' for c in columns)
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {_quote_ident(self.table)} ({cols_ddl})')
+
+        placeholders = ', '.join('?' for _ in columns)
+        col_names = ', '.join(_quote_ident(c.name) for c in columns)
+        return f'INSERT INTO {_quote_ident(self.table)} ({col_names}) VALUES ({placeholders})'
+
+    @staticmethod
+    def _rows(data: List[Any]) -> Iterator[List[Any]]:
+        """
+        Nested values (e.g. arrays) can't be stored as-is, so they are kept as json text.
+        """
+        for row in data:
+            if any(type(v) in (list, dict) for v in row):
+                row = [json.dumps(v) if type(v) in (list, dict) else v for v in row]
+            yield row
+
+    def write(self, page: ResultPage) -> int:
+        """
+        :return: number of rows written from the given page
+        """
+        if not page.is_grid():
+            raise errors.InvalidOptionErr('Statement did not return a table; '
+                                          'nothing to write to SQLite')
+
+        try:
+            self.conn.execute('BEGIN')
+            if self._insert_stmt is None:
+                self._insert_stmt = self._create_table(page.columns or [])
+            self.conn.executemany(self._insert_stmt, self._rows(page.data))
+            self.conn.execute('COMMIT')
+        except sqlite3.Error as ex:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            raise errors.OutputErr(f'Failed to write to table {self.table} in {self.db_path}: {ex}')
+
+        self.rows_written += len(page.data)
+        self.log.debug(f'wrote {len(page.data)} rows to {self.table} (total={self.rows_written})')
+        return len(page.data)
+
+    def close(self) -> None:
+        self.conn.close()
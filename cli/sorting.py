@@ -0,0 +1,280 @@
+import heapq
+import itertools
+import pickle
+import tempfile
+from typing import IO, Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cli import errors
+from cli.buffer import DEFAULT_MEMORY_BUDGET, estimate_page_size
+from cli.pipeline import resolve_path, value_getter
+from cli.upsolver.entities import Column, ResultPage
+from cli.utils import get_logger
+
+"""
+Sorting and grouping of query results on the client side, in bounded memory.
+
+ExternalSort buffers rows until their (estimated) size reaches the memory budget, then sorts the
+buffer and spills it as a sorted run to a temporary file. Once all pages were consumed the runs
+are k-way merged, reading each run back lazily. GroupBy sorts by the group keys the same way and
+then aggregates consecutive rows of the same group.
+"""
+
+OUTPUT_PAGE_SIZE = 10000  # rows per page emitted by the stages in this module
+
+
+class SortKey(NamedTuple):
+    path: str
+    descending: bool = False
+
+
+def parse_sort_keys(s: str) -> List[SortKey]:
+    """
+    Parse a comma separated list of columns, each optionally followed by ':asc' or ':desc',
+    e.g. 'a,b.c:desc'.
+    """
+    keys = []
+    for part in [p.strip() for p in s.split(',') if p.strip() != '']:
+        path, _, direction = part.partition(':')
+        if direction.lower() not in ('', 'asc', 'desc'):
+            raise errors.InvalidOptionErr(f'Invalid sort direction \'{direction}\' for {path} '
+                                          f'(expected asc or desc)')
+        keys.append(SortKey(path, direction.lower() == 'desc'))
+    if len(keys) == 0:
+        raise errors.InvalidOptionErr(f'Invalid sort keys: \'{s}\'')
+    return keys
+
+
+def _orderable(v: Any) -> Tuple[Any, ...]:
+    """
+    Results may contain missing values and values of different types within one column; order
+    them by kind first (nulls, numbers, strings, everything else) so they're always comparable.
+    """
+    if v is None:
+        return 0, 0
+    tpe = type(v)
+    if tpe is int or tpe is float or tpe is bool:
+        return 1, v
+    elif tpe is str:
+        return 2, v
+    return 3, repr(v)
+
+
+class _Descending(object):
+    __slots__ = ['v']
+
+    def __init__(self, v: Any) -> None:
+        self.v = v
+
+    def __lt__(self, other: '_Descending') -> bool:
+        return other.v < self.v
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.v == other.v
+
+
+def _key_func(keys: List[SortKey], columns: List[Column]) -> Callable[[Any], Any]:
+    getters = [value_getter(*resolve_path(k.path, columns)) for k in keys]
+    if not any(k.descending for k in keys):
+        if len(getters) == 1:
+            get = getters[0]
+            return lambda row: _orderable(get(row))
+        return lambda row: tuple(_orderable(g(row)) for g in getters)
+
+    wrappers = [_Descending if k.descending else (lambda x: x) for k in keys]
+    return lambda row: tuple(w(_orderable(g(row))) for w, g in zip(wrappers, getters))
+
+
+class _Run(object):
+    """
+    A sorted run of rows spilled to a temporary file (deleted once closed).
+    """
+    BATCH_SIZE = 1000  # rows are pickled in batches; much faster than pickling one by one
+
+    def __init__(self, rows: List[Any]) -> None:
+        self.f: IO[bytes] = tempfile.TemporaryFile(prefix='upsolver-sort-')
+        for i in range(0, len(rows), self.BATCH_SIZE):
+            pickle.dump(rows[i:i + self.BATCH_SIZE], self.f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.f.flush()
+
+    def __iter__(self) -> Iterator[Any]:
+        self.f.seek(0)
+        while True:
+            try:
+                batch = pickle.load(self.f)
+            except EOFError:
+                return
+            yield from batch
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def _pages_of(columns: List[Column], rows: Iterator[Any], template: ResultPage) -> Iterator[ResultPage]:
+    while True:
+        batch = list(itertools.islice(rows, OUTPUT_PAGE_SIZE))
+        if len(batch) == 0:
+            return
+        yield template._replace(columns=columns, data=batch, next_path=None)
+
+
+# (columns, first grid page or None, iterator over the sorted rows)
+SortedRows = Tuple[List[Column], Optional[ResultPage], Iterator[Any]]
+
+
+class ExternalSort(object):
+    def __init__(self, keys: List[SortKey], memory_budget: int = DEFAULT_MEMORY_BUDGET) -> None:
+        self.keys = keys
+        self.memory_budget = memory_budget
+        self.log = get_logger('ExternalSort')
+        self.spilled_runs = 0
+
+    def sorted_rows(self, pages: Iterator[ResultPage], on_other: Callable[[ResultPage], None]) -> SortedRows:
+        """
+        Consume all pages and sort the rows of the grid pages; other pages are handed to on_other
+        as soon as they're seen.
+
+        :return: (columns, first grid page or None, iterator over sorted rows)
+        """
+        columns: Optional[List[Column]] = None
+        first: Optional[ResultPage] = None
+        key: Any = None
+        buffer: List[Any] = []
+        buffered_bytes = 0
+        runs: List[_Run] = []
+
+        for page in pages:
+            if not page.is_grid():
+                on_other(page)
+                continue
+            if columns is None:
+                columns, first = page.columns or [], page
+                key = _key_func(self.keys, columns)
+
+            buffer.extend(page.data)
+            buffered_bytes += estimate_page_size(page)
+            if buffered_bytes >= self.memory_budget:
+                buffer.sort(key=key)
+                runs.append(_Run(buffer))
+                self.log.debug(f'spilled sorted run #{len(runs)} of {len(buffer)} rows')
+                buffer, buffered_bytes = [], 0
+
+        self.spilled_runs = len(runs)
+        if columns is None:
+            return [], None, iter([])
+
+        buffer.sort(key=key)
+        if len(runs) == 0:
+            return columns, first, iter(buffer)
+
+        def merged() -> Iterator[Any]:
+            try:
+                yield from heapq.merge(*runs, buffer, key=key)
+            finally:
+                for r in runs:
+                    r.close()
+
+        return columns, first, merged()
+
+    def __call__(self, pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+        others: List[ResultPage] = []
+        columns, first, rows = self.sorted_rows(pages, others.append)
+        yield from others
+        if first is not None:
+            yield from _pages_of(columns, rows, first)
+
+
+AGGREGATE_FUNCS = ['count', 'sum', 'avg', 'min', 'max']
+
+
+class Aggregate(NamedTuple):
+    func: str  # one of AGGREGATE_FUNCS
+    path: Optional[str] = None  # None only for count (i.e. count of rows)
+
+    def name(self) -> str:
+        return self.func if self.path is None else f'{self.func}({self.path})'
+
+
+def parse_aggregates(s: str) -> List[Aggregate]:
+    """
+    Parse a comma separated list of aggregates of the form func or func:column, e.g.
+    'count,sum:price,max:ts'. count without a column counts rows.
+    """
+    aggs = []
+    for part in [p.strip() for p in s.split(',') if p.strip() != '']:
+        func, _, path = part.partition(':')
+        func = func.lower()
+        if func not in AGGREGATE_FUNCS or (path == '' and func != 'count'):
+            raise errors.InvalidOptionErr(
+                f'Invalid aggregate \'{part}\'; expected count or one of '
+                f'{", ".join(f + ":<column>" for f in AGGREGATE_FUNCS)}'
+            )
+        aggs.append(Aggregate(func, path or None))
+    return aggs
+
+
+def _aggregator(agg: Aggregate, columns: List[Column]) -> Callable[[List[Any]], Any]:
+    if agg.path is None:
+        return len
+
+    get = value_getter(*resolve_path(agg.path, columns))
+
+    def values(rows: List[Any]) -> List[Any]:
+        return [v for v in map(get, rows) if v is not None]
+
+    def numbers(rows: List[Any]) -> List[Any]:
+        return [v for v in values(rows) if type(v) is int or type(v) is float]
+
+    def safe(f: Callable[[List[Any]], Any]) -> Callable[[List[Any]], Any]:
+        def apply(vs: List[Any]) -> Any:
+            try:
+                return f(vs) if len(vs) > 0 else None
+            except TypeError:  # values that can't be compared
+                return None
+        return apply
+
+    if agg.func == 'count':
+        return lambda rows: len(values(rows))
+    elif agg.func == 'sum':
+        return lambda rows: safe(sum)(numbers(rows))
+    elif agg.func == 'avg':
+        return lambda rows: safe(lambda ns: sum(ns) / len(ns))(numbers(rows))
+    elif agg.func == 'min':
+        return lambda rows: safe(min)(values(rows))
+    else:
+        return lambda rows: safe(max)(values(rows))
+
+
+class GroupBy(object):
+    """
+    Emits a single row per group: the group key columns followed by the aggregates.
+
+    Rows are sorted by the group keys (see ExternalSort) so only the rows of one group are held
+    in memory at a time during aggregation.
+    """
+
+    def __init__(self, keys: List[str], aggregates: List[Aggregate],
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET) -> None:
+        self.keys = keys
+        self.aggregates = aggregates
+        self.sort = ExternalSort([SortKey(k) for k in keys], memory_budget)
+
+    def __call__(self, pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+        others: List[ResultPage] = []
+        columns, first, rows = self.sort.sorted_rows(pages, others.append)
+        yield from others
+        if first is None:
+            return
+
+        getters = [value_getter(*resolve_path(k, columns)) for k in self.keys]
+        aggregators = [_aggregator(a, columns) for a in self.aggregates]
+
+        def group_key(row: Any) -> Tuple[Any, ...]:
+            return tuple(g(row) for g in getters)
+
+        def grouped() -> Iterator[List[Any]]:
+            for key, group in itertools.groupby(rows, key=group_key):
+                group_rows = list(group)
+                yield list(key) + [agg(group_rows) for agg in aggregators]
+
+        output_columns = [Column(k) for k in self.keys] + [Column(a.name()) for a in self.aggregates]
+        yield from _pages_of(output_columns, grouped(), first)
@@ -0,0 +1,216 @@
+import math
+import random
+from typing import Any, Dict, Iterable, List, Optional
+
+from cli.upsolver.columns import ColumnKind, TypedColumn
+
+"""
+Streaming per-column statistics. Every page of results is folded into the statistics a whole
+column at a time and then discarded, so memory use depends on the number of columns only (and
+not on the number of rows):
+
+- count, nulls, min, max, mean are exact.
+- number of distinct values is estimated using HyperLogLog.
+- quantiles are estimated using a KLL sketch.
+"""
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(v: Any) -> int:
+    try:
+        x = hash(v) & _MASK64
+    except TypeError:  # unhashable, e.g. nested values
+        x = hash(repr(v)) & _MASK64
+
+    # python's hash is the identity function for small ints, so mix the bits (splitmix64)
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+
+class DistinctCounter(object):
+    """
+    HyperLogLog with 2^precision single byte registers (4KiB for the default precision, which
+    gives a standard error of about 1.6%).
+    """
+
+    def __init__(self, precision: int = 12) -> None:
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def update(self, values: Iterable[Any]) -> None:
+        p, registers = self.p, self.registers
+        suffix_bits = 64 - p
+        suffix_mask = (1 << suffix_bits) - 1
+        try:
+            values = set(values)  # hash every distinct value of the page only once
+        except TypeError:
+            pass
+
+        for v in values:
+            h = _hash64(v)
+            idx = h >> suffix_bits
+            rank = suffix_bits - (h & suffix_mask).bit_length() + 1
+            if rank > registers[idx]:
+                registers[idx] = rank
+
+    def estimate(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class QuantileSketch(object):
+    """
+    KLL sketch: a hierarchy of compactors where items at level h stand for 2^h original items.
+    When the sketch is full a level is sorted and every other item (starting at a random
+    offset) is promoted to the next level.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3) -> None:
+        self.k = k
+        self.c = c
+        self.compactors: List[List[float]] = []
+        self.size = 0
+        self.max_size = 0
+        self._grow()
+
+    def _capacity(self, h: int) -> int:
+        return int(math.ceil(self.c ** (len(self.compactors) - h - 1) * self.k)) + 1
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        for h in range(len(self.compactors)):
+            level = self.compactors[h]
+            if len(level) >= self._capacity(h):
+                if h + 1 >= len(self.compactors):
+                    self._grow()
+                level.sort()
+                # with an odd number of items the last one stays at the current level
+                leftover = [level[-1]] if len(level) % 2 == 1 else []
+                end = len(level) - len(leftover)
+                self.compactors[h + 1].extend(level[random.getrandbits(1):end:2])
+                self.compactors[h] = leftover
+                self.size = sum(len(c) for c in self.compactors)
+                if self.size < self.max_size:
+                    break
+
+    def update(self, values: Iterable[float]) -> None:
+        self.compactors[0].extend(values)
+        self.size = sum(len(c) for c in self.compactors)
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        weighted = sorted(
+            (v, 1 << h) for h, level in enumerate(self.compactors) for v in level
+        )
+        total = sum(w for _, w in weighted)
+        if total == 0:
+            return [None for _ in qs]
+
+        result: List[Optional[float]] = []
+        i, cumulative = 0, 0
+        for q in sorted(qs):
+            target = q * total
+            while i < len(weighted) - 1 and cumulative + weighted[i][1] <= target:
+                cumulative += weighted[i][1]
+                i += 1
+            result.append(weighted[i][0])
+        return result
+
+
+def _non_null(col: TypedColumn) -> List[Any]:
+    if col.nulls is not None:
+        return [v for v, n in zip(col.values, col.nulls) if not n]
+    elif col.kind == ColumnKind.INTEGER or col.kind == ColumnKind.FLOAT:
+        return col.values  # type: ignore
+    return [v for v in col.values if v is not None]
+
+
+class ColumnStats(object):
+    QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.min: Any = None
+        self.max: Any = None
+        self.comparable = True  # False once values that can't be compared were seen
+        self.numeric = True  # False once a non numeric value was seen
+        self.sum = 0.0
+        self.distinct = DistinctCounter()
+        self.quantiles = QuantileSketch()
+
+    def update(self, col: TypedColumn) -> None:
+        values = _non_null(col)
+        self.count += len(col.values)
+        self.nulls += len(col.values) - len(values)
+        if len(values) == 0:
+            return
+
+        self.distinct.update(values)
+
+        if self.comparable:
+            try:
+                page_min, page_max = min(values), max(values)
+                self.min = page_min if self.min is None else min(self.min, page_min)
+                self.max = page_max if self.max is None else max(self.max, page_max)
+            except TypeError:
+                self.comparable = False
+                self.min = self.max = None
+
+        if self.numeric:
+            is_numeric = col.kind == ColumnKind.INTEGER or col.kind == ColumnKind.FLOAT or \
+                all(type(v) is int or type(v) is float for v in values)
+            if is_numeric:
+                self.sum += math.fsum(values)
+                self.quantiles.update(values)
+            else:
+                self.numeric = False
+
+    def summary(self) -> Dict[str, Any]:
+        non_null = self.count - self.nulls
+        numeric = self.numeric and non_null > 0
+        quantiles = self.quantiles.quantiles(self.QUANTILES) if numeric \
+            else [None for _ in self.QUANTILES]
+
+        return {
+            'column': self.name,
+            'count': self.count,
+            'nulls': self.nulls,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / non_null if numeric else None,
+            'approx_distinct': self.distinct.estimate() if non_null > 0 else 0,
+            **{f'p{int(q * 100)}': v for q, v in zip(self.QUANTILES, quantiles)},
+        }
+
+
+class ResultStats(object):
+    """
+    Statistics of all columns of a query result. Feed it with decoded pages (see
+    cli.upsolver.columns.decode_page).
+    """
+
+    def __init__(self) -> None:
+        self.columns: Optional[List[ColumnStats]] = None
+
+    def update(self, typed_columns: List[TypedColumn]) -> None:
+        if self.columns is None:
+            self.columns = [ColumnStats(c.column.name) for c in typed_columns]
+        for stats, col in zip(self.columns, typed_columns):
+            stats.update(col)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [c.summary() for c in self.columns] if self.columns is not None else []
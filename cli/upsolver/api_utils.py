@@ -1,7 +1,13 @@
+from typing import Optional
+
 from yarl import URL
 
+from cli.config import ConfigurationManager
 from cli.errors import ApiUnavailable
+from cli.upsolver.async_query import AsyncRequester, AsyncResponsePoller, AsyncRestQueryApi
 from cli.upsolver.auth_filler import TokenAuthFiller
+from cli.upsolver.poller import SimpleResponsePoller
+from cli.upsolver.query import RestQueryApi
 from cli.upsolver.requester import Requester
 from cli.utils import parse_url
 
@@ -18,3 +24,45 @@ def get_base_url(base_url: URL, token: str) -> URL:
         raise ApiUnavailable(requester.base_url)
 
     return parse_url(dns_name)
+
+
+def build_query_api(token: str,
+                    api_url: Optional[URL] = None,
+                    auth_api_url: URL = ConfigurationManager.CLI_DEFAULT_BASE_URL,
+                    pool_size: Optional[int] = None,
+                    max_rps: Optional[float] = None) -> RestQueryApi:
+    """
+    Build a RestQueryApi that issues requests using the provided token. This is the entry point
+    for using this package as a library:
+
+      build_query_api(token).query('SELECT ...').to_pandas()
+
+    :param api_url: if not provided, it is retrieved from the authentication API.
+    :param pool_size: see Requester; required when executing queries from multiple threads.
+    :param max_rps: see Requester.
+    """
+    base_url = api_url or get_base_url(auth_api_url, token)
+    return RestQueryApi(
+        requester=Requester(
+            base_url=base_url,
+            auth_filler=TokenAuthFiller(token),
+            pool_size=pool_size,
+            max_rps=max_rps
+        ),
+        poller_builder=lambda to_sec: SimpleResponsePoller(max_time_sec=to_sec)
+    )
+
+
+def build_async_query_api(token: str, api_url: URL, pool_size: int = 100) -> AsyncRestQueryApi:
+    """
+    Same as build_query_api, for use within an asyncio event loop (requires aiohttp). The api
+    should be closed once done, e.g. by using it as an async context manager.
+    """
+    return AsyncRestQueryApi(
+        requester=AsyncRequester(
+            base_url=api_url,
+            auth_filler=TokenAuthFiller(token),
+            pool_size=pool_size
+        ),
+        poller_builder=lambda to_sec: AsyncResponsePoller(max_time_sec=to_sec)
+    )
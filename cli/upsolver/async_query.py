@@ -0,0 +1,166 @@
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from requests import Request, Response
+from requests.structures import CaseInsensitiveDict
+from yarl import URL
+
+from cli import errors
+from cli.upsolver.auth_filler import AuthFiller
+from cli.upsolver.entities import ExecutionResult, ResultPage
+from cli.upsolver.poller import read_response
+from cli.upsolver.requester import ResponseVaidator, default_resp_validator
+from cli.upsolver.response import UpsolverResponse
+from cli.utils import get_logger, import_optional
+
+"""
+asyncio counterparts of Requester, SimpleResponsePoller and RestQueryApi, for applications that
+embed this package in an event loop: waiting on pending results doesn't block (or occupy a thread),
+so any number of queries can be driven concurrently from a single event loop, e.g.
+
+  async with build_async_query_api(token, api_url) as api:
+      async for page in api.execute_pages('SELECT ...', timeout_sec=60):
+          ...
+
+Requests are issued using aiohttp, which is an optional dependency. Responses are converted to
+requests.Response objects so that validation, UpsolverResponse and the errors raised are the same
+as those of the synchronous implementation.
+"""
+
+
+class AsyncRequester(object):
+    """
+    Same as Requester, but issues requests using aiohttp. The underlying aiohttp session is created
+    on first use (it must be created from within the event loop) and must be closed using close.
+    """
+
+    def __init__(self,
+                 base_url: URL,
+                 auth_filler: Optional[AuthFiller] = None,
+                 resp_validator: Optional[ResponseVaidator] = default_resp_validator,
+                 pool_size: int = 100):
+        """
+        :param pool_size: max number of connections open concurrently; further requests wait for a
+        connection to be released.
+        """
+        self.aiohttp = import_optional('aiohttp', 'async')
+        self.base_url = base_url
+        self.auth_filler = auth_filler if auth_filler is not None else lambda x: x
+        self.resp_validator = resp_validator if resp_validator is not None else lambda x: x
+        self.pool_size = pool_size
+
+        self.sess: Any = None  # aiohttp.ClientSession
+        self.log = get_logger('AsyncRequester')
+
+    def _session(self) -> Any:
+        if self.sess is None:
+            self.sess = self.aiohttp.ClientSession(
+                connector=self.aiohttp.TCPConnector(limit=self.pool_size)
+            )
+        return self.sess
+
+    def _build_url(self, path: str) -> str:
+        return f'{str(self.base_url)}{path if path.startswith("/") else "/" + path}'
+
+    async def _send(self, path: str, req: Request, json: Optional[Dict[str, Any]] = None) -> UpsolverResponse:
+        # used to correlate request and response in the logs, at least for now
+        req_id = str(uuid.uuid4())
+
+        req.url = self._build_url(path)
+        if json is not None:
+            req.json = json
+        prepared_req = self.auth_filler(req).prepare()
+        self.log.debug(f'REQUEST (req_id={req_id}): {prepared_req.method} {prepared_req.url}')
+
+        try:
+            async with self._session().request(
+                    prepared_req.method,
+                    prepared_req.url,
+                    headers=dict(prepared_req.headers),
+                    data=prepared_req.body) as aresp:
+                resp = Response()
+                resp.status_code = aresp.status
+                resp.headers = CaseInsensitiveDict(aresp.headers)
+                resp._content = await aresp.read()
+                resp.encoding = aresp.charset
+                resp.url = str(aresp.url)
+                resp.request = prepared_req
+        except Exception as ex:
+            self.log.debug(f'REQUEST FAILED (req_id={req_id}): {ex}')
+            raise ex
+
+        self.log.debug(f'RESPONSE (req_id={req_id}): STATUS_CODE={resp.status_code}')
+        return UpsolverResponse(self.resp_validator(resp))
+
+    async def get(self, path: str) -> UpsolverResponse:
+        return await self._send(path, Request(method='GET'))
+
+    async def post(self, path: str, json: Optional[Dict[str, Any]] = None) -> UpsolverResponse:
+        return await self._send(path, Request(method='POST'), json if json is not None else {})
+
+    async def close(self) -> None:
+        if self.sess is not None:
+            await self.sess.close()
+            self.sess = None
+
+
+class AsyncResponsePoller(object):
+    """
+    Same as SimpleResponsePoller, waiting between polls using asyncio.sleep.
+    """
+
+    def __init__(self,
+                 wait_interval_sec: float = 0.1,
+                 max_time_sec: Optional[float] = 30.0):
+        self.wait_interval_sec = wait_interval_sec
+        self.max_time_sec = max_time_sec
+
+    async def __call__(self, requester: AsyncRequester, resp: UpsolverResponse) -> ResultPage:
+        start_time = time.time()
+        while True:
+            page, pending_path = read_response(resp)
+            if page is not None:
+                return page
+            assert pending_path is not None
+
+            time_spent_sec = int(time.time() - start_time)
+            if (self.max_time_sec is not None) and (time_spent_sec >= self.max_time_sec):
+                raise errors.PendingResultTimeout(resp)
+
+            await asyncio.sleep(self.wait_interval_sec)
+            resp = await requester.get(path=pending_path)
+
+
+AsyncResponsePollerBuilder = Callable[[float], AsyncResponsePoller]
+
+
+class AsyncRestQueryApi(object):
+    def __init__(self, requester: AsyncRequester, poller_builder: AsyncResponsePollerBuilder):
+        self.requester = requester
+        self.poller_builder = poller_builder
+
+    async def __aenter__(self) -> 'AsyncRestQueryApi':
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def execute(self, query: str, timeout_sec: float) -> AsyncIterator[ExecutionResult]:
+        async for page in self.execute_pages(query, timeout_sec):
+            yield page.to_execution_result()
+
+    async def execute_pages(self, query: str, timeout_sec: float) -> AsyncIterator[ResultPage]:
+        assert len(query) > 0
+        poller = self.poller_builder(timeout_sec)
+
+        page = await poller(self.requester, await self.requester.post('query', json={'sql': query}))
+        yield page
+
+        while page.next_path is not None:
+            page = await poller(self.requester, await self.requester.get(page.next_path))
+            yield page
+
+    async def close(self) -> None:
+        await self.requester.close()
@@ -0,0 +1,212 @@
+import re
+from array import array
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from cli.upsolver.entities import Column, ResultPage
+
+"""
+Decoding of result columns into typed storage, based on the column types reported in grid
+metadata. Decoding is done a whole column at a time (per page): numeric columns are packed into
+arrays (8 bytes per value, no per-value python objects), timestamps and dates are parsed into
+datetime / date objects, and everything else is kept as returned by the API.
+"""
+
+
+class ColumnKind(Enum):
+    INTEGER = 'integer'
+    FLOAT = 'float'
+    BOOLEAN = 'boolean'
+    TIMESTAMP = 'timestamp'
+    DATE = 'date'
+    OTHER = 'other'  # strings, nested values, unknown types
+
+
+_kinds_by_type_name = {
+    **{n: ColumnKind.INTEGER for n in ['bigint', 'long', 'int', 'integer', 'smallint', 'tinyint']},
+    **{n: ColumnKind.FLOAT for n in ['double', 'float', 'real', 'decimal', 'number', 'numeric']},
+    **{n: ColumnKind.BOOLEAN for n in ['boolean', 'bool']},
+    **{n: ColumnKind.TIMESTAMP for n in ['timestamp', 'datetime', 'instant']},
+    'date': ColumnKind.DATE,
+}
+
+
+def column_kind(column: Column) -> ColumnKind:
+    """
+    Type names are matched loosely: 'DOUBLE', 'DoubleColumnType' and 'decimal(10,2)' are all
+    recognized as FLOAT.
+    """
+    if column.type is None:
+        return ColumnKind.OTHER
+    name = re.sub(r'(column)?type$', '', column.type.lower().split('(')[0].strip())
+    return _kinds_by_type_name.get(name, ColumnKind.OTHER)
+
+
+class TypedColumn(NamedTuple):
+    """
+    A decoded column of a single page.
+
+    For INTEGER and FLOAT columns values is an array ('q' and 'd' respectively); missing values
+    are stored as 0 and marked in nulls. For all other kinds values is a list (with None for
+    missing values) and nulls is always None.
+    """
+    column: Column
+    kind: ColumnKind
+    values: Sequence[Any]
+    nulls: Optional[bytearray] = None  # 1 for missing values; None if no value is missing
+
+    def to_list(self) -> List[Any]:
+        return _restore_nulls(self.values, self.nulls)
+
+
+def parse_timestamp(v: Any) -> Any:
+    """
+    Timestamps are either ISO-8601 strings or epoch milliseconds. Values that can't be parsed
+    are returned as-is.
+    """
+    if v is None:
+        return None
+    try:
+        if type(v) is int or type(v) is float:
+            return datetime.fromtimestamp(v / 1000, tz=timezone.utc)
+        return datetime.fromisoformat(v[:-1] + '+00:00' if v.endswith('Z') else v)
+    except (ValueError, TypeError, AttributeError, OverflowError):
+        return v
+
+
+def parse_date(v: Any) -> Any:
+    if v is None:
+        return None
+    try:
+        return date.fromisoformat(v)
+    except (ValueError, TypeError):
+        return v
+
+
+def _to_integer(v: Any) -> Any:
+    if type(v) is str:  # numbers that were serialized as strings (e.g. large longs)
+        return int(v)
+    if type(v) is float and v.is_integer():
+        return int(v)
+    return v  # values that aren't integers (e.g. 2.5) make packing them into an array fail
+
+
+def _to_float(v: Any) -> Any:
+    return float(v) if type(v) is str else v
+
+
+def _decode_numeric(column: Column, kind: ColumnKind, values: Sequence[Any]) -> TypedColumn:
+    typecode, convert = ('q', _to_integer) if kind == ColumnKind.INTEGER else ('d', _to_float)
+
+    nulls: Optional[bytearray] = None
+    if None in values:
+        nulls = bytearray(v is None for v in values)
+        values = [0 if v is None else v for v in values]
+
+    try:
+        arr = array(typecode, values)
+    except TypeError:
+        try:
+            arr = array(typecode, map(convert, values))
+        except (TypeError, ValueError, OverflowError):
+            return TypedColumn(column, ColumnKind.OTHER, _restore_nulls(values, nulls))
+    except OverflowError:  # doesn't fit in 64 bits
+        return TypedColumn(column, ColumnKind.OTHER, _restore_nulls(values, nulls))
+
+    return TypedColumn(column, kind, arr, nulls)
+
+
+def _restore_nulls(values: Sequence[Any], nulls: Optional[bytearray]) -> List[Any]:
+    if nulls is None:
+        return list(values)
+    return [None if n else v for v, n in zip(values, nulls)]
+
+
+_parsers: Dict[ColumnKind, Callable[[Any], Any]] = {
+    ColumnKind.TIMESTAMP: parse_timestamp,
+    ColumnKind.DATE: parse_date,
+}
+
+
+def decode_column(column: Column, values: Sequence[Any]) -> TypedColumn:
+    kind = column_kind(column)
+    if kind == ColumnKind.INTEGER or kind == ColumnKind.FLOAT:
+        return _decode_numeric(column, kind, values)
+
+    parser: Optional[Callable[[Any], Any]] = _parsers.get(kind)
+    return TypedColumn(column, kind, list(map(parser, values)) if parser else list(values))
+
+
+def decode_page(page: ResultPage) -> List[TypedColumn]:
+    """
+    :return: list of TypedColumn, one per column of the page (empty for non-grid pages).
+    """
+    if not page.is_grid():
+        return []
+    columns = page.columns or []
+    transposed = list(zip(*page.data)) if len(page.data) > 0 else [() for _ in columns]
+    return [decode_column(c, values) for c, values in zip(columns, transposed)]
+
+
+class ColumnStore(object):
+    """
+    Rows of grid pages held column by column, for results that are kept around to be re-read.
+    Numeric columns are packed into arrays (with a mask of missing values) as in decode_column;
+    all other columns keep the values as returned by the API, so rows read back are the same as
+    the rows that were appended (except for numbers, which are converted to their column's type).
+    """
+
+    def __init__(self) -> None:
+        self.columns: Optional[List[Column]] = None
+        self.values: List[Any] = []  # per column: array (numeric columns) or list
+        self.nulls: List[Optional[bytearray]] = []  # per column: bytearray (numeric columns) or None
+        self.rows = 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def append(self, page: ResultPage) -> None:
+        if not page.is_grid():
+            return
+        if self.columns is None:
+            self.columns = page.columns or []
+            for c in self.columns:
+                kind = column_kind(c)
+                numeric = kind == ColumnKind.INTEGER or kind == ColumnKind.FLOAT
+                self.values.append(array('q' if kind == ColumnKind.INTEGER else 'd') if numeric else [])
+                self.nulls.append(bytearray() if numeric else None)
+        if len(page.data) == 0:
+            return
+
+        for i, (column, values) in enumerate(zip(self.columns, zip(*page.data))):
+            nulls = self.nulls[i]
+            if nulls is None:
+                self.values[i].extend(values)
+                continue
+
+            typed = _decode_numeric(column, column_kind(column), values)
+            if typed.kind == ColumnKind.OTHER:
+                # values that don't fit the column's type: keep the column as a list from now on
+                self.values[i] = _restore_nulls(self.values[i], nulls) + typed.to_list()
+                self.nulls[i] = None
+            else:
+                self.values[i].extend(typed.values)
+                nulls.extend(typed.nulls or bytes(len(values)))
+        self.rows += len(page.data)
+
+    def pages(self, page_size: int = 10000) -> Iterator[ResultPage]:
+        """
+        :return: the rows appended so far, as pages of up to page_size rows.
+        """
+        if self.columns is None:
+            return
+        for start in range(0, self.rows, page_size):
+            end = min(start + page_size, self.rows)
+            columns = [
+                _restore_nulls(values[start:end], nulls[start:end] if nulls is not None else None)
+                for values, nulls in zip(self.values, self.nulls)
+            ]
+            yield ResultPage(columns=self.columns, data=[list(row) for row in zip(*columns)])
+        if self.rows == 0:
+            yield ResultPage(columns=self.columns, data=[])
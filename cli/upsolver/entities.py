@@ -1,3 +1,46 @@
-ExecutionResult = list
+from typing import Any, Dict, List, NamedTuple, Optional
+
+ExecutionResult = List[Any]
 ExecutionErr = Exception
 NextResultPath = str  # results are paged, with "next pointer" being a path of url
+
+
+class Column(NamedTuple):
+    """
+    Describes a single entry of grid['columns'] in a query result.
+    """
+    name: str
+    type: Optional[str] = None  # type name as reported by the API, if any
+
+    @staticmethod
+    def from_dict(d: Dict[str, Any]) -> 'Column':
+        tpe = d.get('columnType', d.get('type'))
+        if type(tpe) is dict:
+            tpe = tpe.get('clazz', tpe.get('name'))
+        return Column(name=d['name'], type=str(tpe) if tpe is not None else None)
+
+
+class ResultPage(NamedTuple):
+    """
+    A single page of results, as returned by the API.
+
+    Statements that return a table (e.g. SELECT) have columns, and data holds the rows of
+    grid['data'] as-is (i.e. lists of values ordered like columns). Other statements (e.g. CREATE
+    TABLE) have no columns, and data holds the response objects themselves.
+    """
+    columns: Optional[List[Column]]
+    data: List[Any]
+    next_path: Optional[NextResultPath] = None
+    size_bytes: int = 0  # size of the response body the page was read from
+
+    def is_grid(self) -> bool:
+        return self.columns is not None
+
+    def column_names(self) -> List[str]:
+        return [c.name for c in self.columns] if self.columns is not None else []
+
+    def to_execution_result(self) -> ExecutionResult:
+        if self.columns is None:
+            return self.data
+        names = self.column_names()
+        return [dict(zip(names, row)) for row in self.data]
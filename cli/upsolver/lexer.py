@@ -0,0 +1,150 @@
+import re
+from typing import List, NamedTuple, Set
+
+"""
+Minimal SQL lexing: just enough to split a script into statements, and to tell which statements
+of a script may run concurrently. Semicolons only end a statement when they're not within a
+string literal, a quoted identifier or a comment.
+"""
+
+BARRIER_MARKER = '@barrier'  # within a comment, makes the following statement wait for all previous ones
+
+
+class Statement(NamedTuple):
+    sql: str
+    number: int  # position of the statement within the script, starting at 1
+    line: int  # line (within the script) at which the statement starts, starting at 1
+    barrier: bool = False  # preceded by a comment holding BARRIER_MARKER
+
+
+# tokens that may contain a semicolon (or hide the beginning of one of the others), and the
+# semicolon itself. Unterminated strings / comments extend to the end of the script.
+_tokens_re = re.compile(
+    r"""'(?:[^']|'')*(?:'|$)"""
+    r'''|"(?:[^"]|"")*(?:"|$)'''
+    r'|`[^`]*(?:`|$)'
+    r'|--[^\n]*'
+    r'|/\*.*?(?:\*/|$)'
+    r'|;',
+    re.DOTALL
+)
+_comments_re = re.compile(r'--[^\n]*|/\*.*?(?:\*/|$)', re.DOTALL)
+
+
+def _is_blank(sql: str) -> bool:
+    """
+    True for statements that hold nothing but whitespace and comments.
+    """
+    if sql.strip() == '':
+        return True
+    if '--' not in sql and '/*' not in sql:
+        return False
+    return _comments_re.sub('', sql).strip() == ''
+
+
+def split_statements(script: str) -> List[Statement]:
+    """
+    :return: list of Statement (without the terminating semicolons); empty statements and
+    statements holding only comments are skipped.
+    """
+    statements: List[Statement] = []
+    start = 0
+    barrier = False  # a barrier marker was seen since the last statement
+
+    def add(end: int) -> None:
+        nonlocal barrier
+        sql = script[start:end]
+        if not _is_blank(sql):
+            stripped = sql.lstrip()
+            line = script.count('\n', 0, start + len(sql) - len(stripped)) + 1
+            statements.append(Statement(stripped.rstrip(), len(statements) + 1, line, barrier))
+            barrier = False
+
+    for m in _tokens_re.finditer(script):
+        token = m.group()
+        if token == ';':
+            add(m.start())
+            start = m.end()
+        elif BARRIER_MARKER in token and (token.startswith('--') or token.startswith('/*')):
+            barrier = True
+    add(len(script))
+
+    return statements
+
+
+def is_complete(script: str) -> bool:
+    """
+    True if the script's last statement is terminated, i.e. nothing but whitespace and comments
+    follows its last semicolon (that isn't within a string literal or a comment).
+    """
+    end = None
+    for m in _tokens_re.finditer(script):
+        if m.group() == ';':
+            end = m.end()
+    return end is not None and _is_blank(script[end:])
+
+
+_identifier = r'(?:"(?:[^"]|"")*"|`[^`]*`|[A-Za-z_][\w$]*)'
+_names_re = re.compile(rf'{_identifier}(?:\s*\.\s*{_identifier})*')
+_literals_re = re.compile(r"""'(?:[^']|'')*(?:'|$)|--[^\n]*|/\*.*?(?:\*/|$)""", re.DOTALL)
+# kinds of objects whose name follows CREATE / ALTER / DROP [...] <kind> [IF [NOT] EXISTS]
+_object_kinds = {'table', 'job', 'view', 'connection', 'catalog', 'schema', 'database'}
+_write_keywords = {'into', 'update'}  # INSERT / MERGE INTO <name>, UPDATE <name>, DELETE FROM <name>
+
+
+def _object_name(name: str) -> str:
+    """
+    Names are compared by their last part only (e.g. catalog.schema.table -> table), since
+    statements may refer to the same object using differently qualified names. That may find
+    dependencies between statements that are in fact unrelated, which is the safe mistake.
+    """
+    last = re.split(r'\s*\.\s*', name)[-1]
+    return last[1:-1].lower() if last[:1] in ('"', '`') else last.lower()
+
+
+class StatementObjects(NamedTuple):
+    writes: Set[str]  # names of objects created, altered, dropped or inserted into by the statement
+    mentions: Set[str]  # names of all objects the statement might refer to (including writes)
+
+
+def statement_objects(sql: str) -> StatementObjects:
+    names = [m.group() for m in _names_re.finditer(_literals_re.sub(' ', sql))]
+    words = [n.lower() for n in names]
+    writes: Set[str] = set()
+
+    if len(words) > 0 and words[0] in ('create', 'alter', 'drop'):
+        kind = next((i for i, w in enumerate(words) if w in _object_kinds), None)
+        if kind is not None:
+            i = kind + 1
+            while i < len(words) and words[i] in ('if', 'not', 'exists'):
+                i += 1
+            if i < len(words):
+                writes.add(_object_name(names[i]))
+
+    for i, w in enumerate(words[:-1]):
+        if w in _write_keywords or (w == 'from' and i > 0 and words[i - 1] == 'delete'):
+            writes.add(_object_name(names[i + 1]))
+
+    return StatementObjects(writes, writes | {_object_name(n) for n in names})
+
+
+def dependencies(statements: List[Statement]) -> List[Set[int]]:
+    """
+    :param statements: list of Statement
+    :return: for every statement, the set of indexes (within statements) of earlier statements
+    it has to wait for: those writing an object it mentions, and those mentioning an object it
+    writes. A barrier waits for all earlier statements, and all later statements wait for it.
+    """
+    objects = [statement_objects(s.sql) for s in statements]
+    deps: List[Set[int]] = []
+    last_barrier = None
+    for i, statement in enumerate(statements):
+        if statement.barrier:
+            deps.append(set(range(i)))
+            last_barrier = i
+            continue
+        deps.append({
+            j for j in range(i)
+            if objects[j].writes & objects[i].mentions or objects[i].writes & objects[j].mentions
+        } | ({last_barrier} if last_barrier is not None else set()))
+    return deps
@@ -1,9 +1,9 @@
 import time
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from cli import errors
 from cli.errors import PayloadErr
-from cli.upsolver.entities import ExecutionResult
+from cli.upsolver.entities import Column, ResultPage
 from cli.upsolver.requester import Requester
 from cli.upsolver.response import UpsolverResponse
 
@@ -16,13 +16,13 @@ inputs:
 - UpsolverResponse object is the initial response the poller will try to get the results of.
 
 outputs:
-- ExecutionResult is the result for the initial response given in the inputs
-- an optional NextResultPath that can be queried for further results (e.g. when performing a
+- ResultPage holding the result for the initial response given in the inputs, along with an
+  optional NextResultPath that can be queried for further results (e.g. when performing a
   SELECT the response maybe have multiple parts).
 """
 ResponsePoller = Callable[
     [Requester, UpsolverResponse],
-    tuple
+    ResultPage
 ]
 
 
@@ -33,6 +33,62 @@ TimeoutSec = float
 ResponsePollerBuilder = Callable[[TimeoutSec], ResponsePoller]
 
 
+def read_response(resp: UpsolverResponse) -> Tuple[Optional[ResultPage], Optional[str]]:
+    """
+    Validate a response to a query (or to polling for its results).
+
+    :return: (ResultPage, None) if the results are ready, or (None, path to poll) if they're pending.
+    """
+    def raise_err() -> None:
+        raise errors.ApiErr(resp)
+
+    sc = resp.status_code
+    if int(sc / 100) != 2:
+        raise_err()
+
+    def verify_json(j: Dict[str, Any]) -> Dict[str, Any]:
+        if 'status' not in j:
+            raise PayloadErr(resp, 'expected "status" field in response object')
+        return j
+
+    def extract_json() -> Dict[str, Any]:
+        resp_json = resp.json()
+        if type(resp_json) is dict:
+            return resp_json
+        elif type(resp_json[0]) is dict:
+            if len(resp_json) > 1:
+                raise PayloadErr(resp, 'got list with multiple objects')
+            return resp_json[0]
+        else:
+            raise PayloadErr(resp, 'failed to find result object')
+
+    rjson = verify_json(extract_json())
+    status = rjson['status']
+    is_success = sc == 200 and status == 'Success'
+
+    # 201 is CREATED; returned on initial creation of "pending" response
+    # 202 is ACCEPTED; returned if existing pending query is still not ready
+    is_pending = (sc == 201 or sc == 202) and status == 'Pending'
+
+    if not (is_success or is_pending):
+        raise_err()
+
+    if is_pending:
+        return None, rjson['current']
+
+    if 'result' in rjson:
+        result = rjson['result']
+        grid = result['grid']  # columns, data, ...
+        return ResultPage(
+            columns=[Column.from_dict(c) for c in grid['columns']],
+            data=grid['data'],
+            next_path=result.get('next'),
+            size_bytes=len(resp.content)
+        ), None
+    else:
+        return ResultPage(columns=None, data=[rjson], size_bytes=len(resp.content)), None
+
+
 class SimpleResponsePoller(object):
     def __init__(self,
                  wait_interval_sec: float = 0.1,
@@ -43,75 +99,33 @@ class SimpleResponsePoller(object):
     def _get_result_helper(self,
                            requester: Requester,
                            resp: UpsolverResponse,
-                           start_time: float = 0) -> \
-            tuple:
+                           start_time: float = 0) -> ResultPage:
         """
         :param start_time: time (in seconds since the Epoch) at which polling has started.
         """
-        def raise_err() -> None:
-            raise errors.ApiErr(resp)
-
-        sc = resp.status_code
-        if int(sc / 100) != 2:
-            raise_err()
-
-        def verify_json(j: dict) -> dict:
-            if 'status' not in j:
-                raise PayloadErr(resp, 'expected "status" field in response object')
-            return j
-
-        def extract_json() -> dict:
-            resp_json = resp.json()
-            if type(resp_json) is dict:
-                return resp_json
-            elif type(resp_json[0]) is dict:
-                if len(resp_json) > 1:
-                    raise PayloadErr(resp, 'got list with multiple objects')
-                return resp_json[0]
-            else:
-                raise PayloadErr(resp, 'failed to find result object')
-
-        rjson = verify_json(extract_json())
-        status = rjson['status']
-        is_success = sc == 200 and status == 'Success'
-
-        # 201 is CREATED; returned on initial creation of "pending" response
-        # 202 is ACCEPTED; returned if existing pending query is still not ready
-        is_pending = (sc == 201 or sc == 202) and status == 'Pending'
-
-        if not (is_success or is_pending):
-            raise_err()
-
-        if is_pending:
-            time_spent_sec = int(time.time() - start_time)
-            if (self.max_time_sec is not None) and (time_spent_sec >= self.max_time_sec):
-                raise errors.PendingResultTimeout(resp)
-
-            time.sleep(self.wait_interval_sec)
-            return self._get_result_helper(
-                requester=requester,
-                resp=requester.get(path=rjson['current']),
-                start_time=start_time,
-            )
-
-        if 'result' in rjson:
-            result = rjson['result']
-            grid = result['grid']  # columns, data, ...
-            column_names = [c['name'] for c in grid['columns']]
-            data_w_columns: ExecutionResult = [dict(zip(column_names, row)) for row in grid['data']]
-
-            return data_w_columns, result.get('next')
-        else:
-            return [rjson], None
-
-    def __call__(self, requester: Requester, resp: UpsolverResponse) -> \
-            tuple:
+        page, pending_path = read_response(resp)
+        if page is not None:
+            return page
+        assert pending_path is not None
+
+        time_spent_sec = int(time.time() - start_time)
+        if (self.max_time_sec is not None) and (time_spent_sec >= self.max_time_sec):
+            raise errors.PendingResultTimeout(resp)
+
+        time.sleep(self.wait_interval_sec)
+        return self._get_result_helper(
+            requester=requester,
+            resp=requester.get(path=pending_path),
+            start_time=start_time,
+        )
+
+    def __call__(self, requester: Requester, resp: UpsolverResponse) -> ResultPage:
         """
         Waits until result data is ready and returns it (a response may contain actual data, or
         alternatively be a pending response which means we should ask for the results at some
         later, inderteminate, time).
 
-        If the second returned value is not None, it means there is more result data that can
-        be delivered, and can be retrieved using the returned path.
+        If the returned page has a next_path, it means there is more result data that can be
+        delivered, and can be retrieved using that path.
         """
         return self._get_result_helper(requester, resp, start_time=time.time())
@@ -1,9 +1,14 @@
+import threading
 from abc import ABCMeta, abstractmethod
-from typing import Iterator
+from typing import Iterator, Optional
 
-from cli.upsolver.entities import ExecutionResult
-from cli.upsolver.poller import ResponsePollerBuilder
+from cli import errors
+from cli.upsolver.entities import ExecutionResult, ResultPage
+from cli.upsolver.poller import ResponsePollerBuilder, read_response
 from cli.upsolver.requester import Requester
+from cli.upsolver.response import UpsolverResponse
+from cli.upsolver.results import QueryResults
+from cli.utils import get_logger
 
 
 class QueryApi(metaclass=ABCMeta):
@@ -15,31 +20,123 @@ class QueryApi(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def execute_pages(self, query: str, timeout_sec: float) -> Iterator[ResultPage]:
+        """
+        Same as execute, but returns the pages as received from the API (i.e. without turning
+        every row into a dictionary), which is the cheaper option for bulk consumers.
+        """
+        pass
+
+    def query(self, query: str, timeout_sec: float = 30.0) -> QueryResults:
+        """
+        Same as execute_pages, but returns the pages wrapped in QueryResults, which is able to
+        convert them to numpy arrays / pandas DataFrames.
+        """
+        return QueryResults(self.execute_pages(query, timeout_sec))
+
     @abstractmethod
     def check_syntax(self, expression: str) -> list:
         pass
 
 
 class RestQueryApi(QueryApi):
-    def __init__(self, requester: Requester, poller_builder: ResponsePollerBuilder):
+    def __init__(self, requester: Requester, poller_builder: ResponsePollerBuilder,
+                 cancel_grace_sec: float = 5.0):
+        """
+        :param cancel_grace_sec: how long to wait for the API to accept cancelling a query (see cancel).
+        """
         self.requester = requester
         self.poller_builder = poller_builder
+        self.cancel_grace_sec = cancel_grace_sec
+        self.log = get_logger('RestQueryApi')
 
     def check_syntax(self, expression: str) -> list:
         raise NotImplementedError()
 
-    _NextResultPath = str  # results are paged, with "next pointer" being a path of url
-
     def execute(self, query: str, timeout_sec: float) -> Iterator[ExecutionResult]:
+        for page in self.execute_pages(query, timeout_sec):
+            yield page.to_execution_result()
+
+    def execute_pages(self, query: str, timeout_sec: float,
+                      cancelled: Optional[threading.Event] = None) -> Iterator[ResultPage]:
+        """
+        :param cancelled: see results.
+        """
+        yield from self.results(self.submit(query, cancelled), timeout_sec, cancelled)
+
+    def _requester(self, cancelled: Optional[threading.Event]) -> Requester:
+        return self.requester if cancelled is None else self.requester.with_cancellation(cancelled)
+
+    def submit(self, query: str, cancelled: Optional[threading.Event] = None) -> UpsolverResponse:
+        """
+        Submit a query without waiting for its results (see results).
+        """
         assert len(query) > 0
+        return self._requester(cancelled).post('query', json={'sql': query})
+
+    def cancel(self, resp: UpsolverResponse) -> None:
+        """
+        Ask the API to stop executing a query whose results are pending, waiting up to cancel_grace_sec.
+        Failing to cancel is logged, and otherwise ignored.
+
+        :param resp: a pending response to the query (or to polling for its results).
+        """
+        try:
+            _, pending_path = read_response(resp)
+        except errors.CliErr:
+            return
+        if pending_path is None:
+            return
+
+        request_id = resp.request_id()
+        try:
+            self.requester.delete(pending_path, timeout_sec=self.cancel_grace_sec)
+            self.log.warning(f'cancelled pending query (request_id={request_id}, path={pending_path})')
+        except Exception as ex:
+            self.log.warning(f'failed to cancel pending query (request_id={request_id}, '
+                             f'path={pending_path}): {ex}')
+
+    def resume(self, next_path: str, timeout_sec: float, cancelled: Optional[threading.Event] = None,
+               cancel_on_abort: bool = True) -> Iterator[ResultPage]:
+        """
+        :param next_path: next_path of a page of results that was received earlier.
+        :param cancelled: see results.
+        :param cancel_on_abort: see results.
+        :return: the pages of the query's results that follow that page (as long as the results are
+        still available).
+        """
+        yield from self.results(self._requester(cancelled).get(next_path), timeout_sec, cancelled,
+                                cancel_on_abort)
+
+    def results(self, resp: UpsolverResponse, timeout_sec: float, cancelled: Optional[threading.Event] = None,
+                cancel_on_abort: bool = True) -> Iterator[ResultPage]:
+        """
+        :param resp: the response to submitting a query
+        :param cancelled: set by another thread to stop the query (e.g. executed on a worker thread, which
+        interrupting the process doesn't reach): further requests fail with QueryCancelled, and the query is
+        cancelled on the server if its results are pending.
+        :param cancel_on_abort: whether to cancel a query still pending when waiting for it times out or is
+        interrupted or cancelled; False for queries that should keep running (e.g. detached ones).
+        :return: the pages of the query's results, polling for pending results as needed.
+        """
         poller = self.poller_builder(timeout_sec)
+        requester = self._requester(cancelled)
 
-        (data, next_path) = poller(
-            self.requester,
-            self.requester.post('query', json={'sql': query})
-        )
-        yield data
+        # a query still pending when waiting for it times out or is interrupted (e.g. using Ctrl-C) is
+        # cancelled, so that it doesn't keep running (and using resources) on the cluster
+        try:
+            page = poller(requester, resp)
+        except errors.PendingResultTimeout as ex:
+            if cancel_on_abort:
+                self.cancel(ex.resp)
+            raise
+        except (KeyboardInterrupt, errors.QueryCancelled):
+            if cancel_on_abort:
+                self.cancel(resp)
+            raise
+        yield page
 
-        while next_path is not None:
-            (data, next_path) = poller(self.requester, self.requester.get(next_path))
-            yield data
+        while page.next_path is not None:
+            page = poller(requester, requester.get(page.next_path))
+            yield page
@@ -1,12 +1,31 @@
+import copy
+import threading
+import time
 import uuid
 from typing import Callable, Optional
 
-from requests import Request, Response, Session
+from requests import PreparedRequest, Request, Response, Session
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
 from yarl import URL
 
 from cli import errors
 from cli.upsolver.auth_filler import AuthFiller
 from cli.upsolver.response import UpsolverResponse
+from cli.upsolver.retry import (
+    RETRY_STATUS_CODES,
+    UNAVAILABLE_STATUS_CODES,
+    RetryBudget,
+    RetryPolicy,
+    circuit_breaker,
+    metrics,
+)
+from cli.upsolver.throttle import (
+    THROTTLED_STATUS_CODE,
+    ConcurrencyLimiter,
+    RateLimiter,
+    retry_after_sec,
+)
 from cli.utils import get_logger
 
 """
@@ -40,22 +59,62 @@ class Requester(object):
     def _normalize_path(path: str) -> str:
         return path if path.startswith('/') else f'/{path}'
 
+    @staticmethod
+    def _endpoint(prepared_req: PreparedRequest) -> str:
+        """
+        :return: the class of the request for tracking latencies, e.g. 'GET /query/*/next' (segments of
+        the path holding ids are left out, so that all requests to the same endpoint share a class).
+        """
+        segments = URL(str(prepared_req.url)).path.split('/')
+        path = '/'.join('*' if any(c.isdigit() for c in s) else s for s in segments)
+        return f'{prepared_req.method} {path}'
+
     def __init__(self,
                  base_url: URL,
                  auth_filler: Optional[AuthFiller] = None,
-                 resp_validator: Optional[ResponseVaidator] = default_resp_validator):
+                 resp_validator: Optional[ResponseVaidator] = default_resp_validator,
+                 pool_size: Optional[int] = None,
+                 retry_policy: Optional[RetryPolicy] = RetryPolicy(),
+                 max_rps: Optional[float] = None):
         """
         :param base_url: all requests will be issued to this host
         :param auth_filler: will be used to modify Request objects prior to sending them in order to
         fill in authentication-related data (e.g. Authorization header).
+        :param pool_size: max number of connections kept open to the host; should be at least the
+        number of threads issuing requests concurrently through this Requester.
+        :param retry_policy: how to retry GET requests (e.g. polls and next pages of results) that
+        failed due to network errors or 5XX responses (and of any request that was throttled), within
+        a retry budget; None disables retries.
+        :param max_rps: max number of requests per second to issue; unlimited if None. Regardless, the
+        number of requests in flight is adapted to throttling and latency of the API (up to pool_size).
         """
         self.base_url = base_url
         self.auth_filler = auth_filler if auth_filler is not None else lambda x: x
         self.resp_validator = resp_validator if resp_validator is not None else lambda x: x
+        self.retry_policy = retry_policy
+        self.retry_budget = RetryBudget()
+        self.breaker = circuit_breaker(str(base_url.host))
+        self.rate_limiter = RateLimiter(max_rps)
+        self.concurrency_limiter = ConcurrencyLimiter(pool_size or DEFAULT_POOLSIZE)
+        self.cancelled: Optional[threading.Event] = None  # see with_cancellation
 
         self.sess = Session()  # all requests will be issued using this Session object
+        if pool_size is not None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.sess.mount('http://', adapter)
+            self.sess.mount('https://', adapter)
         self.log = get_logger('Requester')
 
+    def with_cancellation(self, cancelled: threading.Event) -> 'Requester':
+        """
+        :return: a Requester that shares this one's session (and retry and pacing state), whose requests
+        fail with QueryCancelled once cancelled is set (except for DELETE requests, which are used to
+        cancel queries).
+        """
+        requester = copy.copy(self)
+        requester.cancelled = cancelled
+        return requester
+
     def _build_url(self, path: str) -> str:
         return f'{str(self.base_url)}{self._normalize_path(path)}'
 
@@ -65,7 +124,11 @@ class Requester(object):
     def _send(self,
               path: str,
               req: Request,
-              json: Optional[dict] = None) -> UpsolverResponse:
+              json: Optional[dict] = None,
+              timeout_sec: Optional[float] = None) -> UpsolverResponse:
+        if self.cancelled is not None and self.cancelled.is_set() and req.method != 'DELETE':
+            raise errors.QueryCancelled()
+
         # used to correlate request and response in the logs, at least for now
         req_id = str(uuid.uuid4())
 
@@ -82,11 +145,7 @@ class Requester(object):
             f'\tBODY={str(prepared_req.body)}\n'
         )
 
-        try:
-            resp = self.sess.send(prepared_req)
-        except Exception as ex:
-            self.log.debug(f'REQUEST FAILED (req_id={req_id}): {ex}')
-            raise ex
+        resp = self._send_with_retries(req_id, prepared_req, timeout_sec)
 
         self.log.debug(
             f'\nRESPONSE (req_id={req_id}):\n'
@@ -97,6 +156,84 @@ class Requester(object):
 
         return UpsolverResponse(self.resp_validator(resp))
 
+    def _send_with_retries(self, req_id: str, prepared_req: PreparedRequest,
+                           timeout_sec: Optional[float]) -> Response:
+        """
+        Requests fail right away while the host's circuit breaker is open. GET requests (which are
+        idempotent) that fail due to network errors or 5XX responses are retried with backoff, and so
+        are requests of any method that were throttled (since the API didn't process them).
+        """
+        self.retry_budget.on_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_in_sec = self.breaker.before_request()
+            if retry_in_sec is not None:
+                metrics.count('rejected')
+                raise errors.CircuitOpenErr(str(self.base_url.host), retry_in_sec)
+
+            resp: Optional[Response] = None
+            failure: Optional[Exception] = None
+            try:
+                resp = self._send_once(prepared_req, timeout_sec)
+            except (ConnectionError, Timeout, ChunkedEncodingError) as ex:
+                self.breaker.on_failure()
+                failure, reason = ex, str(ex)
+            except BaseException as ex:  # e.g. interrupted; let another request probe the host instead
+                self.breaker.on_abort()
+                self.log.debug(f'REQUEST FAILED (req_id={req_id}): {ex}')
+                raise ex
+            else:
+                reason = f'status code {resp.status_code}'
+                if resp.status_code in UNAVAILABLE_STATUS_CODES:
+                    self.breaker.on_failure()
+                else:
+                    self.breaker.on_success()
+                if resp.status_code == THROTTLED_STATUS_CODE:
+                    self._on_throttled(req_id, resp)
+                elif resp.status_code not in RETRY_STATUS_CODES:
+                    return resp
+
+            throttled = resp is not None and resp.status_code == THROTTLED_STATUS_CODE
+            if (prepared_req.method != 'GET' and not throttled) or self.retry_policy is None or \
+                    attempt >= self.retry_policy.max_attempts or not self.retry_budget.try_retry():
+                if failure is not None:
+                    self.log.debug(f'REQUEST FAILED (req_id={req_id}): {failure}')
+                    raise failure
+                assert resp is not None
+                return resp
+
+            delay_sec = self.retry_policy.delay_sec(attempt)
+            metrics.count('retries')
+            self.log.warning(f'retrying request (req_id={req_id}, retry #{attempt}) in {delay_sec:.2f}s: '
+                             f'{reason}')
+            time.sleep(delay_sec)
+
+    def _send_once(self, prepared_req: PreparedRequest, timeout_sec: Optional[float]) -> Response:
+        self.rate_limiter.acquire()
+        started_at = self.concurrency_limiter.acquire()
+        metrics.count('requests')
+        resp: Optional[Response] = None
+        try:
+            resp = self.sess.send(prepared_req, timeout=timeout_sec)
+            return resp
+        finally:
+            self.concurrency_limiter.release(
+                started_at,
+                throttled=resp is not None and resp.status_code == THROTTLED_STATUS_CODE,
+                failed=resp is None,
+                endpoint=self._endpoint(prepared_req)
+            )
+
+    def _on_throttled(self, req_id: str, resp: Response) -> None:
+        metrics.count('throttled')
+        wait_sec = retry_after_sec(resp)
+        if wait_sec is not None:
+            self.rate_limiter.pause(wait_sec)
+        self.log.warning(f'request was throttled (req_id={req_id}); '
+                         f'max requests in flight: {int(self.concurrency_limiter.limit)}' +
+                         (f', holding off requests for {wait_sec:.2f}s' if wait_sec is not None else ''))
+
     def get(self, path: str) -> UpsolverResponse:
         return self._send(path, Request(method='GET'))
 
@@ -111,6 +248,9 @@ class Requester(object):
         payload = json if json is not None else {}
         return self._send(path, Request(method='PATCH'), payload)
 
+    def delete(self, path: str, timeout_sec: Optional[float] = None) -> UpsolverResponse:
+        return self._send(path, Request(method='DELETE'), timeout_sec=timeout_sec)
+
     def get_list(self, path: str, list_field_name: Optional[str] = None) -> list:
         resp = self.get(path)
 
@@ -0,0 +1,132 @@
+from datetime import timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cli.upsolver.columns import ColumnKind, TypedColumn, decode_page
+from cli.upsolver.entities import Column, ResultPage
+from cli.utils import import_optional
+
+"""
+Columnar access to query results for Python users of this package, e.g.:
+
+  api = build_query_api(token)
+  df = api.query('SELECT * FROM my_table').to_pandas()
+
+numpy and pandas are optional dependencies, they're only imported when a conversion that needs
+them is requested.
+"""
+
+
+def _to_array(np: Any, values: Tuple[Any, ...]) -> Any:
+    """
+    Let numpy infer a dtype for a column of values; strings, nested values and columns with
+    missing (None) values end up as object arrays.
+    """
+    try:
+        arr = np.array(values)
+        if arr.ndim == 1 and arr.dtype.kind not in 'USO':
+            return arr
+    except ValueError:  # ragged nested values
+        pass
+
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def _typed_to_array(np: Any, col: TypedColumn) -> Any:
+    """
+    Numeric columns are already packed, so their arrays are views over the same buffer; missing
+    values turn integer columns into floats (NaN marks the missing values).
+    """
+    if col.kind == ColumnKind.INTEGER or col.kind == ColumnKind.FLOAT:
+        arr = np.frombuffer(col.values, dtype=np.int64 if col.kind == ColumnKind.INTEGER else np.float64)
+        if col.nulls is not None:
+            arr = arr.astype(np.float64)
+            arr[np.frombuffer(col.nulls, dtype=np.bool_)] = np.nan
+        return arr
+    elif col.kind == ColumnKind.TIMESTAMP:
+        # numpy has no timezone support, timestamps are stored as UTC
+        try:
+            return np.array(
+                [v.astimezone(timezone.utc).replace(tzinfo=None) if v is not None and v.tzinfo else v
+                 for v in col.values],
+                dtype='datetime64[us]'
+            )
+        except (ValueError, TypeError, AttributeError):  # some values failed to parse
+            pass
+    return _to_array(np, tuple(col.values))
+
+
+def _common_dtype(np: Any, chunks: List[Any]) -> Any:
+    try:
+        return np.result_type(*chunks)
+    except TypeError:  # no common type (e.g. numbers and strings)
+        return np.dtype(object)
+
+
+class QueryResults(object):
+    """
+    Iterator over the pages (see ResultPage) of a single query's results. Pages are fetched
+    lazily, as the iterator is consumed; it can be consumed only once.
+
+    to_numpy / to_pandas consume the remaining pages and build one array per column directly
+    from each page's grid, without creating a dictionary per row. Columns are decoded according
+    to their type in the grid metadata (see cli.upsolver.columns).
+    """
+
+    def __init__(self, pages: Iterator[ResultPage]) -> None:
+        self.pages = pages
+        self.columns: Optional[List[Column]] = None  # set once the first page with a grid is seen
+
+    def __iter__(self) -> Iterator[ResultPage]:
+        for page in self.pages:
+            if page.is_grid() and self.columns is None:
+                self.columns = page.columns
+            yield page
+
+    def typed_pages(self) -> Iterator[List[TypedColumn]]:
+        """
+        :return: iterator over the (remaining) grid pages, each decoded into a list of
+        TypedColumn.
+        """
+        for page in self:
+            if page.is_grid():
+                yield decode_page(page)
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        :return: dictionary of column name to a numpy array holding all values of that column.
+        Pages of statements that don't return a table are skipped.
+        """
+        np = import_optional('numpy', 'numpy')
+
+        # arrays are built for every page as it arrives (so rows of the page can be released)
+        # and concatenated once all pages are in
+        chunks: Optional[List[List[Any]]] = None
+        for typed_columns in self.typed_pages():
+            if chunks is None:
+                chunks = [[] for _ in typed_columns]
+            for i, col in enumerate(typed_columns):
+                if len(col.values) > 0:
+                    chunks[i].append(_typed_to_array(np, col))
+
+        if chunks is None or self.columns is None:
+            return {}
+
+        result = {}
+        for column, column_chunks in zip(self.columns, chunks):
+            total = sum(len(c) for c in column_chunks)
+            arr = np.empty(total, dtype=_common_dtype(np, column_chunks) if total > 0 else object)
+            offset = 0
+            for c in column_chunks:
+                arr[offset:offset + len(c)] = c
+                offset += len(c)
+            result[column.name] = arr
+        return result
+
+    def to_pandas(self) -> Any:
+        """
+        :return: pandas.DataFrame holding all (remaining) results.
+        """
+        pd = import_optional('pandas', 'pandas')
+        return pd.DataFrame(self.to_numpy(), copy=False)
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+"""
+Resilience of requests to the API: retrying idempotent requests that failed for transient reasons
+(see RetryPolicy and RetryBudget), and failing fast while a host is clearly down (see CircuitBreaker).
+"""
+
+# responses to GET requests with these status codes are retried (unlike 500, which may be returned for a
+# query that failed, and so would fail again)
+RETRY_STATUS_CODES = frozenset([502, 503, 504])
+
+# responses with these status codes count as failures to reach the host
+UNAVAILABLE_STATUS_CODES = frozenset([502, 503, 504])
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int = 4  # including the first one
+    base_delay_sec: float = 0.5
+    max_delay_sec: float = 10.0
+
+    def delay_sec(self, retry: int) -> float:
+        """
+        Exponential backoff with full jitter: a random delay of up to base_delay_sec * 2^(retry - 1),
+        so that clients that failed at the same time don't retry at the same time.
+
+        :param retry: 1 for the first retry of a request.
+        """
+        return random.uniform(0, min(self.max_delay_sec, self.base_delay_sec * 2 ** (retry - 1)))
+
+
+class RetryBudget(object):
+    """
+    Allows retries of up to a fraction of the requests (plus a few to begin with), so that retries
+    don't multiply the load on an API that fails most of the requests.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10) -> None:
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self.lock:
+            self.requests += 1
+
+    def try_retry(self) -> bool:
+        with self.lock:
+            if self.retries >= self.min_retries + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class CircuitBreaker(object):
+    """
+    After failure_threshold consecutive failures to reach a host, requests to it fail right away (the
+    circuit is open) for reset_timeout_sec. A single request is then let through, and the circuit is
+    closed again if it succeeds (or opened again if it doesn't).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_sec: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False  # whether a request was let through after reset_timeout_sec
+        self.lock = threading.Lock()
+
+    def before_request(self) -> Optional[float]:
+        """
+        :return: None if the request may be sent, otherwise the number of seconds until requests
+        will be let through again.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return None
+            remaining_sec = self.opened_at + self.reset_timeout_sec - time.monotonic()
+            if remaining_sec > 0 or self.probing:
+                return max(remaining_sec, 0.0)
+            self.probing = True
+            return None
+
+    def on_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def on_abort(self) -> None:
+        """
+        Called when a request that was let through didn't reach the host (e.g. it failed to be sent for
+        a local reason), so it tells nothing about the host.
+        """
+        with self.lock:
+            self.probing = False
+
+    def on_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = dict()  # by host, shared by all Requesters of the process
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(host: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+class RequestMetrics(object):
+    """
+    Counters of the requests issued by all Requesters of the process.
+    """
+
+    def __init__(self) -> None:
+        self.counters = {'requests': 0, 'retries': 0, 'rejected': 0, 'throttled': 0}
+        self.lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+
+metrics = RequestMetrics()
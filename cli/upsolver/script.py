@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from cli.buffer import DEFAULT_MEMORY_BUDGET, MemoryBudget, PageBuffer
+from cli.upsolver.entities import ResultPage
+from cli.upsolver.lexer import Statement, dependencies
+from cli.upsolver.query import RestQueryApi
+from cli.upsolver.response import UpsolverResponse
+from cli.utils import get_logger
+
+"""
+Execution of scripts, i.e. sequences of statements (see cli.upsolver.lexer.split_statements).
+
+Statements are executed one after the other through the same RestQueryApi, so they share its
+requester (and with it the session's open connections). If statements are independent of each
+other, the next statement can be submitted while the results of the current one are consumed.
+
+run_parallel executes statements concurrently instead, as far as allowed by the dependencies
+between them (see cli.upsolver.lexer.dependencies). The results of every statement are buffered
+until all previous statements were reported, so outcomes are reported in the script's order.
+Statements still running when the outcomes stop being consumed (e.g. since the process was
+interrupted) are cancelled.
+"""
+
+
+def run_statements(api: RestQueryApi, statements: List[Statement], timeout_sec: float,
+                   independent: bool = False) -> Iterator[Tuple[Statement, Iterator[ResultPage]]]:
+    """
+    :param statements: list of Statement
+    :param independent: if set, every statement is submitted as soon as the results of the
+    previous one start being consumed (instead of once they were all consumed). A statement that
+    was submitted ahead is cancelled if the statements stop being consumed (e.g. since the previous
+    one failed).
+    :return: iterator over (Statement, iterator over its pages); the pages of each statement
+    should be consumed before advancing to the next statement.
+    """
+    log = get_logger('Script')
+    executor: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=1) if independent else None
+    # submission of the next statement, if already started
+    submitted: Optional['Future[UpsolverResponse]'] = None
+
+    def pages(i: int) -> Iterator[ResultPage]:
+        # submitting lazily means failed submissions surface while consuming the statement's pages
+        nonlocal submitted
+        statement = statements[i]
+        log.debug(f'executing statement #{statement.number} (line {statement.line})')
+        resp = submitted.result() if submitted is not None else api.submit(statement.sql)
+        submitted = None
+        if executor is not None and i + 1 < len(statements):
+            submitted = executor.submit(api.submit, statements[i + 1].sql)
+        yield from api.results(resp, timeout_sec)
+
+    try:
+        for i, statement in enumerate(statements):
+            yield statement, pages(i)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+            if submitted is not None:
+                resp: Optional[UpsolverResponse] = None
+                try:
+                    resp = submitted.result()
+                except Exception:
+                    pass  # failed to submit; there is nothing to cancel
+                if resp is not None:
+                    api.cancel(resp)
+
+
+class StatementOutcome(NamedTuple):
+    statement: Statement
+    pages: Optional[PageBuffer] = None  # results of a successful statement (to be closed by the consumer)
+    error: Optional[Exception] = None  # set if the statement failed
+    duration_sec: float = 0.0
+
+    def skipped(self) -> bool:
+        """
+        Statements are skipped (i.e. not executed) once another statement failed.
+        """
+        return self.pages is None and self.error is None
+
+
+def run_parallel(api: RestQueryApi, statements: List[Statement], timeout_sec: float, workers: int,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET) -> Iterator[StatementOutcome]:
+    """
+    Execute statements on up to `workers` threads, starting every statement once the statements
+    it depends on succeeded. Once a statement fails no further statements are started.
+
+    :param memory_budget: for buffering the results of all statements (see PageBuffer), shared by
+    statements that are running and statements whose outcome wasn't reported yet.
+    :return: outcomes of all statements, in order.
+    """
+    log = get_logger('Script')
+    budget = MemoryBudget(memory_budget)
+    cancelled = threading.Event()
+    deps = dependencies(statements)
+    waiting_for = [len(d) for d in deps]
+    dependents: List[List[int]] = [[] for _ in statements]
+    for i, d in enumerate(deps):
+        for j in d:
+            dependents[j].append(i)
+
+    def run(i: int) -> StatementOutcome:
+        statement = statements[i]
+        log.debug(f'executing statement #{statement.number} (line {statement.line})')
+        start = time.time()
+        buffer = PageBuffer(budget)
+        try:
+            for page in api.execute_pages(statement.sql, timeout_sec, cancelled):
+                buffer.append(page)
+        except Exception as ex:
+            buffer.close()
+            return StatementOutcome(statement, error=ex, duration_sec=time.time() - start)
+        log.debug(f'statement #{statement.number} done in {time.time() - start:.3f}s')
+        return StatementOutcome(statement, pages=buffer, duration_sec=time.time() - start)
+
+    # index -> outcome, for finished statements that were not reported yet
+    outcomes: Dict[int, StatementOutcome] = {}
+    reported = 0
+    failed = False
+    pool = ThreadPoolExecutor(max_workers=workers)
+    running: Dict['Future[StatementOutcome]', int] = {}  # future -> index
+
+    def start(i: int) -> None:
+        running[pool.submit(run, i)] = i
+
+    try:
+        for i in range(len(statements)):
+            if waiting_for[i] == 0:
+                start(i)
+
+        while len(running) > 0:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for f in done:
+                i = running.pop(f)
+                outcomes[i] = f.result()
+                if outcomes[i].error is not None:
+                    failed = True
+                elif not failed:
+                    for j in dependents[i]:
+                        waiting_for[j] -= 1
+                        if waiting_for[j] == 0:
+                            start(j)
+
+            while reported in outcomes:
+                yield outcomes.pop(reported)
+                reported += 1
+    finally:
+        interrupted = len(running) > 0  # e.g. using Ctrl-C, or the outcomes stopped being consumed
+        if interrupted:
+            log.debug(f'cancelling {len(running)} statements')
+            cancelled.set()
+            for f in running:
+                f.cancel()
+        pool.shutdown(wait=True)  # running statements stop soon after being cancelled
+        if interrupted:
+            finished = [f.result() for f in running if not f.cancelled()]
+            for outcome in finished + list(outcomes.values()):
+                if outcome.pages is not None:
+                    outcome.pages.close()
+
+    for i in range(reported, len(statements)):
+        yield outcomes.pop(i) if i in outcomes else StatementOutcome(statements[i])
@@ -0,0 +1,176 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from requests import Response
+
+"""
+Pacing of requests to the API: capping their rate (see RateLimiter) and adapting the number of
+requests in flight to how the API copes with them (see ConcurrencyLimiter).
+"""
+
+THROTTLED_STATUS_CODE = 429
+
+
+def retry_after_sec(resp: Response) -> Optional[float]:
+    """
+    :return: the number of seconds the Retry-After header of the response asks to wait (it may be
+    given as a number of seconds or as a date), or None if there is no valid header.
+    """
+    value = resp.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter(object):
+    """
+    A token bucket that lets through up to max_rps requests per second on average (and bursts of up
+    to burst requests); unlimited if max_rps is None. Requests can also be held off altogether for
+    a while, e.g. as asked by the Retry-After header of a throttled response.
+    """
+
+    def __init__(self, max_rps: Optional[float] = None, burst: Optional[float] = None) -> None:
+        self.max_rps = max_rps
+        self.burst = burst if burst is not None else max(1.0, max_rps or 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, sec: float) -> None:
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + sec)
+
+    def _reserve(self) -> float:
+        """
+        :return: 0 if a token was taken, otherwise the number of seconds to wait before trying again.
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.max_rps is None:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.max_rps)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.max_rps
+
+    def acquire(self) -> float:
+        """
+        Wait until a request may be sent.
+
+        :return: the number of seconds waited.
+        """
+        waited_sec = 0.0
+        while True:
+            with self.lock:
+                wait_sec = self._reserve()
+            if wait_sec <= 0:
+                return waited_sec
+            time.sleep(wait_sec)
+            waited_sec += wait_sec
+
+
+class Latency(object):
+    """
+    The (smoothed) latency of a class of requests, and its baseline (the lowest latency seen).
+    """
+
+    def __init__(self) -> None:
+        self.latency_sec: Optional[float] = None  # exponentially weighted moving average
+        self.baseline_sec: Optional[float] = None  # lowest average latency seen (recently)
+
+    def observe(self, latency_sec: float) -> float:
+        """
+        :return: the ratio of the latency to its baseline.
+        """
+        self.latency_sec = latency_sec if self.latency_sec is None \
+            else 0.8 * self.latency_sec + 0.2 * latency_sec
+        if self.baseline_sec is None or self.latency_sec < self.baseline_sec:
+            self.baseline_sec = self.latency_sec
+        else:
+            # slowly follow latencies that stay higher (e.g. as the workload changes)
+            self.baseline_sec += 0.01 * (self.latency_sec - self.baseline_sec)
+        return self.latency_sec / self.baseline_sec if self.baseline_sec > 0 else 1.0
+
+
+class ConcurrencyLimiter(object):
+    """
+    Limits the number of requests in flight, adapting the limit AIMD-style (additive increase,
+    multiplicative decrease): the limit grows by about one for every limit's worth of responses,
+    and is cut by backoff_ratio when a request is throttled, or by latency_backoff_ratio when the
+    (smoothed) latency rises above latency_factor times its baseline (the lowest latency seen).
+
+    Latencies are tracked per class of requests (see release), since different endpoints take
+    different times to respond (e.g. submitting a query vs fetching a page of its results), and a
+    shift in the mix of requests shouldn't read as the API slowing down.
+
+    Responses to requests sent before the limit was last decreased don't decrease it again, so that
+    a burst of throttled responses counts as a single signal.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, backoff_ratio: float = 0.5,
+                 latency_factor: float = 3.0, latency_backoff_ratio: float = 0.9) -> None:
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_factor = latency_factor
+        self.latency_backoff_ratio = latency_backoff_ratio
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.latencies: Dict[str, Latency] = dict()  # by class of requests
+        self.decreased_at = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Wait until there is room for another request in flight.
+
+        :return: the time the request was let through (to be passed to release).
+        """
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def _decrease(self, started_at: float, ratio: float) -> None:
+        if started_at < self.decreased_at:
+            return
+        self.limit = max(float(self.min_limit), self.limit * ratio)
+        self.decreased_at = time.monotonic()
+
+    def release(self, started_at: float, throttled: bool = False, failed: bool = False,
+                endpoint: str = '') -> None:
+        """
+        :param started_at: as returned by acquire.
+        :param throttled: whether the API throttled the request.
+        :param failed: whether no response was received (such requests don't affect the limit).
+        :param endpoint: class of the request, whose latency is compared to the baseline of that class.
+        """
+        with self.cond:
+            self.in_flight -= 1
+            if throttled:
+                self._decrease(started_at, self.backoff_ratio)
+            elif not failed:
+                latency = self.latencies.setdefault(endpoint, Latency())
+                if latency.observe(time.monotonic() - started_at) > self.latency_factor:
+                    self._decrease(started_at, self.latency_backoff_ratio)
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.cond.notify_all()
@@ -1,7 +1,10 @@
 import logging
+import signal
+import threading
+from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
-from typing import Any, Dict, Optional, Protocol, Type, TypeVar
+from typing import Any, Dict, Iterator, Optional, Protocol, Type, TypeVar
 
 import click
 from yarl import URL
@@ -16,6 +19,8 @@ def convert_to_seconds(s: str) -> float:
 
 
 def convert_time_str(ctx: click.Context, param, value: Any) -> Any:
+    if value is None:
+        return None
     try:
         return convert_to_seconds(value)
     except Exception:
@@ -23,6 +28,61 @@ def convert_time_str(ctx: click.Context, param, value: Any) -> Any:
                                       '(valid examples: 0.25s, 1.5m)')
 
 
+bytes_per_unit = {'KB': 2 ** 10, 'MB': 2 ** 20, 'GB': 2 ** 30, 'B': 1}
+
+
+def convert_to_bytes(s: str) -> int:
+    upper = s.strip().upper()
+    for unit, multiplier in bytes_per_unit.items():
+        if upper.endswith(unit):
+            return int(float(upper[:-len(unit)]) * multiplier)
+    raise ValueError(f'unknown size unit: {s}')
+
+
+def convert_size_str(ctx: click.Context, param: click.Parameter, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        return convert_to_bytes(value)
+    except Exception:
+        raise errors.InvalidOptionErr(f'Cannot convert \'{value}\' to a size in bytes '
+                                      '(valid examples: 512KB, 256MB, 1.5GB)')
+
+
+def import_optional(module: str, extra: str) -> Any:
+    """
+    Import a dependency that is only needed by some operations (e.g. numpy), failing with a
+    helpful error if it's missing.
+
+    :param extra: the extra of the package (see pyproject.toml) that installs the dependency.
+    """
+    try:
+        return __import__(module)
+    except ImportError:
+        raise errors.ConfigErr(f'{module} is required for this operation, please install it '
+                               f'(e.g. pip install \'upsolver-cli[{extra}]\')')
+
+
+@contextmanager
+def sigterm_as_interrupt() -> Iterator[None]:
+    """
+    Handle SIGTERM like SIGINT (by raising KeyboardInterrupt) within the context, so that whatever is done
+    when interrupted (e.g. cancelling pending queries) is also done when terminated.
+    """
+    if threading.current_thread() is not threading.main_thread():  # signal handlers can't be set
+        yield
+        return
+
+    def interrupt(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt()
+
+    previous = signal.signal(signal.SIGTERM, interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
 def get_logger(path: Optional[str] = None) -> Logger:
     """
     Use this method to get logger instances. It uses the "CLI" logger as the "root" logger, thus
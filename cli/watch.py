@@ -0,0 +1,134 @@
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from cli import errors
+from cli.pipeline import resolve_path
+from cli.upsolver.entities import Column, ResultPage
+from cli.utils import get_logger
+
+"""
+Re-executing a query on a schedule and reporting only the rows that changed between executions.
+"""
+
+CHANGE_COLUMN = 'change'
+INSERTED = 'inserted'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+RowDigest = Tuple[int, Tuple[Any, ...]]  # digest of a row, and the values of its key columns
+
+
+def _hashable(v: Any) -> Any:
+    if type(v) is dict:
+        return tuple(sorted((k, _hashable(x)) for k, x in v.items()))
+    if type(v) is list:
+        return tuple(_hashable(x) for x in v)
+    return v
+
+
+class ChangeTracker(object):
+    """
+    Keeps a hash index of the previous result of a query: the values of its key columns mapped to a
+    digest of the rest of the row (rows themselves aren't kept, so deleted rows are reported with
+    their key values only). Rows of a result are compared against the index as they arrive, and
+    reported with a change column (inserted / updated / deleted) added as the first column.
+
+    Rows of the first result are all reported as inserted. If several rows of a result have the same
+    key, the last one wins.
+    """
+
+    def __init__(self, keys: List[str]) -> None:
+        self.keys = keys
+        self.columns: Optional[List[Column]] = None
+        self.index: Dict[Any, RowDigest] = dict()  # key -> (digest of the row, key values)
+        self.log = get_logger('ChangeTracker')
+
+    def _key_indices(self, columns: List[Column]) -> List[int]:
+        indices = []
+        for k in self.keys:
+            idx, nested = resolve_path(k, columns)
+            if len(nested) > 0:
+                raise errors.InvalidOptionErr(f'Key \'{k}\' should be a column '
+                                              f'(not a field of a nested value)')
+            indices.append(idx)
+        return indices
+
+    def changes(self, pages: Iterator[ResultPage]) -> Iterator[ResultPage]:
+        """
+        :param pages: the pages of the latest result.
+        :return: pages with the changed rows; pages that aren't grids are passed through as-is.
+        """
+        index: Dict[Any, RowDigest] = dict()  # index of this result; replaces self.index once it's complete
+        columns: Optional[List[Column]] = None
+        key_indices: List[int] = []
+        counts = {INSERTED: 0, UPDATED: 0, DELETED: 0}
+
+        def changed_page(page: ResultPage, rows: List[List[Any]]) -> ResultPage:
+            return page._replace(columns=[Column(CHANGE_COLUMN)] + (columns or []), data=rows, next_path=None)
+
+        for page in pages:
+            if not page.is_grid():
+                yield page
+                continue
+
+            if columns is None:
+                columns = page.columns or []
+                key_indices = self._key_indices(columns)
+                if self.columns is not None and columns != self.columns:
+                    self.log.debug('columns of the result changed; reporting all of its rows as inserted')
+                    self.index = dict()
+                self.columns = columns
+
+            rows = []
+            for row in page.data:
+                key_values = tuple(row[i] for i in key_indices)
+                key = _hashable(key_values)
+                digest = hash(repr(row))
+                previous = index.get(key) or self.index.get(key)
+                index[key] = (digest, key_values)
+
+                if previous is None:
+                    change = INSERTED
+                elif previous[0] != digest:
+                    change = UPDATED
+                else:
+                    continue
+                counts[change] += 1
+                rows.append([change] + list(row))
+
+            if len(rows) > 0:
+                yield changed_page(page, rows)
+
+        if columns is not None:
+            deleted = []
+            for key, (_, key_values) in self.index.items():
+                if key in index:
+                    continue
+                deleted_row: List[Any] = [None] * len(columns)
+                for i, v in zip(key_indices, key_values):
+                    deleted_row[i] = v
+                deleted.append([DELETED] + deleted_row)
+            counts[DELETED] = len(deleted)
+            if len(deleted) > 0:
+                yield ResultPage(columns=[Column(CHANGE_COLUMN)] + columns, data=deleted)
+            self.index = index
+        self.log.debug(f'changes: {counts}')
+
+
+def watch(execute: Callable[[], Iterator[ResultPage]], tracker: ChangeTracker, interval_sec: float,
+          cycles: Optional[int] = None) -> Iterator[Iterator[ResultPage]]:
+    """
+    Execute the query every interval_sec (measured from the start of one execution to the start of
+    the next; executions that take longer are followed by the next one right away).
+
+    :param execute: executes the query, returning its pages.
+    :param cycles: number of executions; unlimited if None.
+    :return: for every execution, the pages with its changes (to be consumed before the next one).
+    """
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        start = time.monotonic()
+        yield tracker.changes(execute())
+        cycle += 1
+        if cycles is None or cycle < cycles:
+            time.sleep(max(0.0, interval_sec - (time.monotonic() - start)))
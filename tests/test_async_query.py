@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import pytest
+from yarl import URL
+
+from cli import errors
+from cli.upsolver.api_utils import build_async_query_api
+from cli.upsolver.async_query import AsyncRequester, AsyncResponsePoller, AsyncRestQueryApi
+from cli.upsolver.entities import Column
+
+web = pytest.importorskip('aiohttp.web')
+
+
+def grid_response(rows: list, next_path: str = None) -> dict:
+    columns = [{'name': 'a', 'columnType': {'clazz': 'LongColumnType'}}]
+    result: dict = {'grid': {'columns': columns, 'data': rows}}
+    if next_path is not None:
+        result['next'] = next_path
+    return {'status': 'Success', 'result': result}
+
+
+async def query(request: Any) -> Any:
+    sql = (await request.json())['sql']
+    if sql == 'bad':
+        return web.json_response({'status': 'Failed', 'message': 'bad query'}, status=400)
+    n = int(sql.split()[-1])
+    return web.json_response({'status': 'Pending', 'current': f'/pending/{n}'}, status=201)
+
+
+async def pending(request: Any) -> Any:
+    n = int(request.match_info['n'])
+    return web.json_response(grid_response([[n]], next_path=f'/next/{n}'))
+
+
+async def next_page(request: Any) -> Any:
+    return web.json_response(grid_response([[int(request.match_info['n']) * 10]]))
+
+
+def with_server(test: Callable[[URL], Awaitable[None]]) -> None:
+    async def run() -> None:
+        app = web.Application()
+        app.router.add_post('/query', query)
+        app.router.add_get('/pending/{n}', pending)
+        app.router.add_get('/next/{n}', next_page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            await test(URL(f'http://127.0.0.1:{port}'))
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def query_api(url: URL) -> AsyncRestQueryApi:
+    return AsyncRestQueryApi(
+        requester=AsyncRequester(url),
+        poller_builder=lambda to_sec: AsyncResponsePoller(wait_interval_sec=0, max_time_sec=to_sec)
+    )
+
+
+def test_execute_pages():
+    async def test(url: URL) -> None:
+        async with query_api(url) as api:
+            pages = [p async for p in api.execute_pages('SELECT 7', 10)]
+
+        assert [p.data for p in pages] == [[[7]], [[70]]]
+        assert pages[0].columns == [Column('a', 'LongColumnType')]
+
+    with_server(test)
+
+
+def test_execute_concurrently():
+    async def test(url: URL) -> None:
+        async with build_async_query_api('token', url, pool_size=10) as api:
+            async def rows(n: int) -> list:
+                return [r async for result in api.execute(f'SELECT {n}', 10) for r in result]
+
+            results = await asyncio.gather(*[rows(n) for n in range(200)])
+
+        assert results == [[{'a': n}, {'a': n * 10}] for n in range(200)]
+
+    with_server(test)
+
+
+def test_failed_query():
+    async def test(url: URL) -> None:
+        async with query_api(url) as api:
+            with pytest.raises(errors.ApiErr):
+                [p async for p in api.execute_pages('bad', 10)]
+
+    with_server(test)
@@ -0,0 +1,63 @@
+import threading
+from typing import Iterator, Optional
+
+from cli.commands.batch import BatchQuery, read_queries, run_batch
+from cli.upsolver.entities import Column, ResultPage
+
+
+def test_read_queries():
+    lines = [
+        '{"id": "a", "sql": " SELECT 1 ", "timeout": "1.5m"}',
+        '',
+        '{"sql": "SELECT 2", "timeout": 5}',
+        'not json',
+        '{"id": "d"}',
+        '{"id": "e", "sql": "SELECT 3", "timeout": "soon"}',
+    ]
+    queries = list(read_queries(iter(lines), 30.0))
+
+    assert queries[:2] == [BatchQuery('a', 'SELECT 1', 90.0), BatchQuery(3, 'SELECT 2', 5.0)]
+    assert [(q.id, q.sql) for q in queries[2:]] == [(4, None), ('d', None), ('e', None)]
+    assert all(q.error is not None for q in queries[2:])
+
+
+class FakeQueryApi(object):
+    def __init__(self) -> None:
+        self.executed: list = []
+
+    def execute_pages(self, query: str, timeout_sec: float,
+                      cancelled: Optional[threading.Event] = None) -> Iterator[ResultPage]:
+        self.executed.append(query)
+        if query == 'FAIL':
+            raise ValueError('failed')
+        yield ResultPage(columns=[Column('q')], data=[[query]])
+
+
+def test_run_batch():
+    queries = [BatchQuery(i, f'SELECT {i}', 10.0) for i in range(20)] + \
+        [BatchQuery('bad', 'FAIL', 10.0), BatchQuery('invalid', None, 10.0, 'missing sql')]
+
+    outcomes = {o['id']: o for o in run_batch(FakeQueryApi(), iter(queries), concurrency=4)}  # type: ignore
+
+    assert len(outcomes) == 22
+    assert outcomes[7]['status'] == 'success' and outcomes[7]['result'] == [{'q': 'SELECT 7'}]
+    assert outcomes[7]['rows'] == 1 and outcomes[7]['total_time_sec'] >= 0
+    assert outcomes['bad'] == {'id': 'bad', 'status': 'failed', 'error': 'failed',
+                               'total_time_sec': outcomes['bad']['total_time_sec']}
+    assert outcomes['invalid']['error'] == 'missing sql'
+
+
+def test_run_batch_reads_lazily():
+    api = FakeQueryApi()
+    read = 0
+
+    def queries() -> Iterator[BatchQuery]:
+        nonlocal read
+        for i in range(100):
+            read += 1
+            yield BatchQuery(i, f'SELECT {i}', 10.0)
+
+    outcomes = run_batch(api, queries(), concurrency=2)  # type: ignore
+    next(outcomes)
+    assert read <= 3
+    outcomes.close()
@@ -0,0 +1,95 @@
+import threading
+from array import array
+
+import pytest
+
+from cli.buffer import MemoryBudget, PageBuffer, PageStream, estimate_page_size
+from cli.upsolver.entities import Column, ResultPage
+
+columns = [Column('a', 'bigint'), Column('b')]
+
+
+def pages(n: int) -> list:
+    return [ResultPage(columns, [[i * 100 + j, {'x': [j]}] for j in range(100)], f'next/{i}', 10)
+            for i in range(n)]
+
+
+def test_in_memory():
+    buffer = PageBuffer(memory_budget=2 ** 30)
+    for p in pages(3):
+        buffer.append(p)
+
+    assert buffer.spill_file is None
+    assert list(buffer) == pages(3)
+
+
+def test_spills_and_reads_back_repeatedly():
+    buffer = PageBuffer(memory_budget=10000)
+    for p in pages(20):
+        buffer.append(p)
+
+    assert buffer.spilled_pages > 0
+    assert len(buffer) == 20
+    assert len(buffer.pages) < 20
+    for _ in range(2):
+        assert list(buffer) == pages(20)
+    buffer.close()
+
+
+def test_spills_values_marshal_cant_handle():
+    page = ResultPage(columns, [[1, array('q', [1, 2])]])
+    buffer = PageBuffer(memory_budget=1)
+    buffer.append(page)
+    buffer.append(ResultPage(None, [{'status': 'Success'}]))
+
+    assert buffer.spilled_pages == 2
+    assert list(buffer) == [page, ResultPage(None, [{'status': 'Success'}])]
+
+
+def test_shared_budget():
+    budget = MemoryBudget(estimate_page_size(pages(1)[0]) * 3)
+    buffers = [PageBuffer(budget) for _ in range(4)]
+    for b in buffers:
+        for p in pages(2):
+            b.append(p)
+
+    assert sum(len(b.pages) for b in buffers) <= 3
+    assert all(list(b) == pages(2) for b in buffers)
+    for b in buffers:
+        b.close()
+    assert budget.used_bytes == 0
+
+
+def test_stream_while_producing():
+    stream = PageStream(MemoryBudget(10000))
+    consumed = threading.Event()
+
+    def produce() -> None:
+        stream.append(pages(1)[0])
+        consumed.wait(5)
+        for p in pages(20)[1:]:
+            stream.append(p)
+        stream.finish(ValueError('failed'))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    received = []
+    with pytest.raises(ValueError):
+        for page in stream:
+            received.append(page)
+            consumed.set()  # the first page arrives before the producer goes on
+    producer.join()
+
+    assert received == pages(20)
+    assert stream.budget.used_bytes == 0
+
+
+def test_stream_spills_beyond_budget():
+    stream = PageStream(MemoryBudget(10000))
+    for p in pages(20):
+        stream.append(p)
+    stream.finish()
+
+    assert any(isinstance(item, PageBuffer) for item in stream.pending)
+    assert list(stream) == pages(20)
+    assert stream.budget.used_bytes == 0
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from cli import errors
+from cli.checkpoint import Checkpoint, CheckpointFile, query_digest
+
+
+def test_save_and_load(tmp_path: Path):
+    checkpoints = CheckpointFile(tmp_path / 'export.checkpoint')
+    assert checkpoints.load() is None
+
+    checkpoint = Checkpoint(query_digest('SELECT 1'), '/query/1/next', 120, 2)
+    checkpoints.save(checkpoint)
+    assert checkpoints.load() == checkpoint
+    assert list(tmp_path.iterdir()) == [tmp_path / 'export.checkpoint']
+
+
+def test_resume_point(tmp_path: Path):
+    checkpoints = CheckpointFile(tmp_path / 'export.checkpoint')
+    output = tmp_path / 'out.csv'
+
+    with pytest.raises(errors.ConfigErr, match='No checkpoint'):
+        checkpoints.resume_point('SELECT 1', output)
+
+    checkpoints.save(Checkpoint(query_digest('SELECT 1'), '/query/1/next', 10, 1))
+    with pytest.raises(errors.ConfigErr, match='different query'):
+        checkpoints.resume_point('SELECT 2', output)
+    with pytest.raises(errors.ConfigErr, match='different query'):
+        checkpoints.resume_point('SELECT 1', output, settings='format=csv')
+    with pytest.raises(errors.ConfigErr, match='missing results'):
+        checkpoints.resume_point('SELECT 1', output)
+
+    output.write_text('0123456789partial')
+    assert checkpoints.resume_point('SELECT 1', output).offset == 10
+
+
+def test_invalid_checkpoint(tmp_path: Path):
+    (tmp_path / 'export.checkpoint').write_text('{"next_path": null}')
+    with pytest.raises(errors.ConfigErr):
+        CheckpointFile(tmp_path / 'export.checkpoint').load()
@@ -0,0 +1,101 @@
+from array import array
+from datetime import date, datetime, timezone
+
+import pytest
+
+from cli.upsolver.columns import (
+    ColumnKind,
+    ColumnStore,
+    column_kind,
+    decode_column,
+    decode_page,
+)
+from cli.upsolver.entities import Column, ResultPage
+
+
+@pytest.mark.parametrize('type_name,kind', [
+    ('bigint', ColumnKind.INTEGER),
+    ('LongColumnType', ColumnKind.INTEGER),
+    ('DOUBLE', ColumnKind.FLOAT),
+    ('decimal(10,2)', ColumnKind.FLOAT),
+    ('Boolean', ColumnKind.BOOLEAN),
+    ('TimestampColumnType', ColumnKind.TIMESTAMP),
+    ('date', ColumnKind.DATE),
+    ('interval', ColumnKind.OTHER),
+    ('string', ColumnKind.OTHER),
+    (None, ColumnKind.OTHER),
+])
+def test_column_kind(type_name, kind):
+    assert column_kind(Column('c', type_name)) == kind
+
+
+def test_column_from_dict():
+    assert Column.from_dict({'name': 'a', 'columnType': {'clazz': 'LongColumnType'}}) == \
+        Column('a', 'LongColumnType')
+    assert Column.from_dict({'name': 'a', 'type': 'bigint'}) == Column('a', 'bigint')
+    assert Column.from_dict({'name': 'a'}) == Column('a')
+
+
+def test_decode_numeric():
+    col = decode_column(Column('c', 'bigint'), (1, 2, 3))
+    assert col.values == array('q', [1, 2, 3])
+    assert col.nulls is None
+
+    col = decode_column(Column('c', 'double'), (1.5, None, 3))
+    assert col.values == array('d', [1.5, 0, 3])
+    assert col.to_list() == [1.5, None, 3.0]
+
+
+def test_decode_numeric_from_strings():
+    assert decode_column(Column('c', 'bigint'), ('1', '2')).values == array('q', [1, 2])
+
+
+def test_decode_numeric_falls_back_to_values():
+    col = decode_column(Column('c', 'bigint'), (2 ** 70, None))
+    assert col.kind == ColumnKind.OTHER
+    assert col.to_list() == [2 ** 70, None]
+
+
+def test_decode_integers_with_fractions():
+    col = decode_column(Column('c', 'bigint'), (1, 2.5, None))
+    assert col.kind == ColumnKind.OTHER
+    assert col.to_list() == [1, 2.5, None]
+
+    assert decode_column(Column('c', 'bigint'), (1, 2.0)).values == array('q', [1, 2])
+
+
+def test_decode_timestamps_and_dates():
+    col = decode_column(Column('c', 'timestamp'), ('2022-03-23T15:05:02Z', 0, None, 'garbage'))
+    assert col.to_list() == [
+        datetime(2022, 3, 23, 15, 5, 2, tzinfo=timezone.utc),
+        datetime(1970, 1, 1, tzinfo=timezone.utc),
+        None,
+        'garbage',
+    ]
+    assert decode_column(Column('c', 'date'), ('2022-03-23',)).to_list() == [date(2022, 3, 23)]
+
+
+def test_decode_page():
+    page = ResultPage(columns=[Column('a', 'bigint'), Column('b')], data=[[1, 'x'], [2, 'y']])
+    assert [c.to_list() for c in decode_page(page)] == [[1, 2], ['x', 'y']]
+
+    empty = ResultPage(columns=[Column('a', 'bigint')], data=[])
+    assert [c.to_list() for c in decode_page(empty)] == [[]]
+
+
+def test_column_store():
+    columns = [Column('a', 'bigint'), Column('b', 'double'), Column('c')]
+    store = ColumnStore()
+    store.append(ResultPage(columns=columns, data=[[1, 1.5, 'x'], [None, None, {'k': 1}]]))
+    store.append(ResultPage(columns=columns, data=[['not a number', 2.5, None]]))
+
+    assert len(store) == 3
+    assert type(store.values[1]) is array
+    assert type(store.values[0]) is list  # fell back to values
+    pages = list(store.pages(page_size=2))
+    assert [p.data for p in pages] == [[[1, 1.5, 'x'], [None, None, {'k': 1}]], [['not a number', 2.5, None]]]
+    assert all(p.columns == columns for p in pages)
+
+    empty = ColumnStore()
+    empty.append(ResultPage(columns=columns, data=[]))
+    assert [(p.columns, p.data) for p in empty.pages()] == [(columns, [])]
@@ -154,3 +154,33 @@ def test_option_log_file_path():
 
 def test_verbose_flag():
     pass
+
+
+def test_get_profile(tmp_path: Path):
+    conf_path = tmp_path / 'stam.conf'
+    with open(conf_path, 'w') as conf_f:
+        conf_f.write(basic_config + '[profile.other]\ntoken = othertoken\n')
+
+    confm = ConfigurationManager(conf_path)
+    assert confm.get_profile('default') == default_profile
+    assert confm.get_profile('other') == Profile(name='other', token='othertoken')
+    with pytest.raises(ConfigErr):
+        confm.get_profile('missing')
+
+
+def test_max_rps(tmp_path: Path):
+    conf_path = tmp_path / 'stam.conf'
+    with open(conf_path, 'w') as conf_f:
+        conf_f.write(basic_config + '[profile.other]\ntoken = othertoken\nmax_rps = 2.5\n')
+
+    confm = ConfigurationManager(conf_path)
+    assert confm.get_profile('default').max_rps is None
+    assert confm.get_profile('other').max_rps == 2.5
+
+    confm.update_profile(Profile(name='third', token='t', max_rps=4), force=True)
+    assert ConfigurationManager(conf_path).get_profile('third').max_rps == 4
+
+    with open(conf_path, 'w') as conf_f:
+        conf_f.write(basic_config + 'max_rps = 0\n')
+    with pytest.raises(ConfigErr):
+        ConfigurationManager(conf_path)
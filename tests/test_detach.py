@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pytest
+from requests_mock import Mocker as RequestsMocker
+from yarl import URL
+
+from cli import errors
+from cli.detach import collect, collect_all, submit_detached
+from cli.upsolver.poller import SimpleResponsePoller
+from cli.upsolver.query import RestQueryApi
+from cli.upsolver.requester import Requester
+
+
+def grid_response(rows: list, next_path: str = None) -> dict:
+    result: dict = {'grid': {'columns': [{'name': 'a'}], 'data': rows}}
+    if next_path is not None:
+        result['next'] = next_path
+    return {'status': 'Success', 'result': result}
+
+
+def query_api() -> RestQueryApi:
+    return RestQueryApi(
+        requester=Requester(URL('http://localhost'), retry_policy=None),
+        poller_builder=lambda to_sec: SimpleResponsePoller(wait_interval_sec=0, max_time_sec=to_sec)
+    )
+
+
+def test_detach_pending(requests_mock: RequestsMocker, tmp_path: Path):
+    requests_mock.post('/query', status_code=201, json={'status': 'Pending', 'current': '/query/1'})
+    handle = submit_detached(query_api(), 'SELECT 1', tmp_path)
+    assert handle == '/query/1'
+
+    requests_mock.get('/query/1', [
+        {'status_code': 202, 'json': {'status': 'Pending', 'current': '/query/1'}},
+        {'json': grid_response([[1]], next_path='/query/1/next')},
+    ])
+    requests_mock.get('/query/1/next', json=grid_response([[2]]))
+    assert [p.data for p in collect(query_api(), handle, 10, tmp_path)] == [[[1]], [[2]]]
+
+
+def test_collect_timeout_keeps_query(requests_mock: RequestsMocker, tmp_path: Path):
+    requests_mock.get('/query/1', status_code=202, json={'status': 'Pending', 'current': '/query/1'})
+    requests_mock.delete('/query/1', status_code=200)
+
+    with pytest.raises(errors.PendingResultTimeout):
+        list(collect(query_api(), '/query/1', 0, tmp_path))
+    assert [r.method for r in requests_mock.request_history if r.method != 'GET'] == []
+
+
+def test_detach_ready_right_away(requests_mock: RequestsMocker, tmp_path: Path):
+    requests_mock.post('/query', json=grid_response([[1]]))
+    handle = submit_detached(query_api(), 'SELECT 1', tmp_path)
+    assert handle.startswith('local:')
+
+    assert [p.data for p in collect(query_api(), handle, 10, tmp_path)] == [[[1]]]
+    assert list(tmp_path.iterdir()) == []  # collected results are removed
+    with pytest.raises(errors.ConfigErr):
+        list(collect(query_api(), handle, 10, tmp_path))
+    with pytest.raises(errors.InvalidOptionErr):
+        list(collect(query_api(), 'local:../config', 10, tmp_path))
+
+
+def test_collect_all(requests_mock: RequestsMocker, tmp_path: Path):
+    requests_mock.get('/query/1', json=grid_response([[1]]))
+    requests_mock.get('/query/2', status_code=500, json={'status': 'Failed'})
+    requests_mock.get('/query/3', json=grid_response([[3]]))
+
+    outcomes = list(collect_all(query_api(), ['/query/1', '/query/2', '/query/3'], 10, tmp_path, 2))
+    assert [o.handle for o in outcomes] == ['/query/1', '/query/2', '/query/3']
+    assert [[p.data for p in o.pages] if o.pages is not None else None for o in outcomes] == \
+        [[[[1]]], None, [[[3]]]]
+    assert isinstance(outcomes[1].error, errors.ApiErr)
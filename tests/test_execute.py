@@ -0,0 +1,104 @@
+from pathlib import Path
+from typing import List
+
+from click.testing import CliRunner, Result
+from requests_mock import Mocker as RequestsMocker
+
+from cli import errors
+from cli.checkpoint import CheckpointFile
+from cli.main import cli
+
+
+def grid_response(rows: list, next_path: str = None) -> dict:
+    result: dict = {'grid': {'columns': [{'name': 'a'}, {'name': 'b'}], 'data': rows}}
+    if next_path is not None:
+        result['next'] = next_path
+    return {'status': 'Success', 'result': result}
+
+
+def export(tmp_path: Path, output: Path, *args: str) -> Result:
+    conf_path = tmp_path / 'config'
+    conf_path.write_text('[profile]\ntoken = t\n')
+    return CliRunner().invoke(cli, ['-c', str(conf_path), 'execute', '-u', 'localhost:8080', '-o', 'csv',
+                                    '--output-file', str(output), '--checkpoint',
+                                    str(tmp_path / 'checkpoint'), *args, '-c', 'SELECT * FROM t'])
+
+
+def request_paths(requests_mock: RequestsMocker) -> List[str]:
+    return [f'{r.method} {r.path}' for r in requests_mock.request_history]
+
+
+def test_api_url_option(tmp_path: Path, requests_mock: RequestsMocker):
+    conf_path = tmp_path / 'config'
+    conf_path.write_text('[profile]\ntoken = t\n')
+    requests_mock.post('http://localhost:8080/query', json={'status': 'Success', 'kind': 'query_response'})
+
+    result = CliRunner().invoke(cli, ['-c', str(conf_path), 'execute', '-u', 'localhost:8080',
+                                      '-c', 'SELECT 1'])
+
+    assert result.exit_code == 0, result.output
+    assert [r.url for r in requests_mock.request_history] == ['http://localhost:8080/query']
+
+
+def test_format_workers_with_plain_output(tmp_path: Path, requests_mock: RequestsMocker):
+    conf_path = tmp_path / 'config'
+    conf_path.write_text('[profile]\ntoken = t\n')
+
+    result = CliRunner().invoke(cli, ['-c', str(conf_path), 'execute', '-u', 'localhost:8080', '-o', 'plain',
+                                      '--format-workers', '2', '-c', 'SELECT 1'])
+
+    assert isinstance(result.exception, errors.ConfigErr)
+    assert len(requests_mock.request_history) == 0
+
+
+def test_follow_with_limit(tmp_path: Path, requests_mock: RequestsMocker):
+    conf_path = tmp_path / 'config'
+    conf_path.write_text('[profile]\ntoken = t\n')
+
+    result = CliRunner().invoke(cli, ['-c', str(conf_path), 'execute', '-u', 'localhost:8080', '--follow',
+                                      '--watermark', 'id', '--limit', '10', '-c', 'SELECT * FROM t'])
+
+    assert isinstance(result.exception, errors.ConfigErr)
+    assert len(requests_mock.request_history) == 0
+
+
+def test_export_resumed(tmp_path: Path, requests_mock: RequestsMocker):
+    requests_mock.post('http://localhost:8080/query', json=grid_response([[1, 'x']], next_path='/query/1/p2'))
+    requests_mock.get('http://localhost:8080/query/1/p2',
+                      json=grid_response([[2, 'y']], next_path='/query/1/p3'))
+    requests_mock.get('http://localhost:8080/query/1/p3', json=grid_response([[3, 'z']]))
+    complete = tmp_path / 'complete.csv'
+    assert export(tmp_path, complete).exit_code == 0
+
+    # interrupted while the last page was being written
+    requests_mock.get('http://localhost:8080/query/1/p3', status_code=500, json={'status': 'Failed'})
+    output = tmp_path / 'out.csv'
+    assert isinstance(export(tmp_path, output).exception, errors.ApiErr)
+    checkpoint = CheckpointFile(tmp_path / 'checkpoint').load()
+    assert checkpoint is not None and checkpoint.next_path == '/query/1/p3' and checkpoint.pages == 2
+    with open(output, 'a') as f:
+        f.write('3,"parti')
+
+    requests_mock.reset_mock()
+    requests_mock.get('http://localhost:8080/query/1/p3', json=grid_response([[3, 'z']]))
+    result = export(tmp_path, output, '--resume')
+
+    assert result.exit_code == 0, result.output
+    assert request_paths(requests_mock) == ['GET /query/1/p3']
+    # the partial page is dropped, and the header isn't written again
+    assert output.read_text() == complete.read_text()
+
+
+def test_export_already_complete(tmp_path: Path, requests_mock: RequestsMocker):
+    requests_mock.post('http://localhost:8080/query', json=grid_response([[1, 'x']]))
+    output = tmp_path / 'out.csv'
+    assert export(tmp_path, output).exit_code == 0
+    written = output.read_text()
+
+    requests_mock.reset_mock()
+    result = export(tmp_path, output, '--resume')
+
+    assert result.exit_code == 0
+    assert 'already complete' in result.output
+    assert request_paths(requests_mock) == []
+    assert output.read_text() == written
@@ -0,0 +1,38 @@
+import threading
+from typing import Iterator, Optional
+
+from cli.fanout import run_on_profiles, with_profile
+from cli.upsolver.entities import Column, ResultPage
+
+
+def test_with_profile():
+    page = ResultPage(columns=[Column('a')], data=[[1], [2]])
+    assert with_profile(page, 'prod') == ResultPage(columns=[Column('profile'), Column('a')],
+                                                    data=[['prod', 1], ['prod', 2]])
+
+    message = ResultPage(columns=None, data=[{'status': 'Success'}])
+    assert with_profile(message, 'prod').data == [{'profile': 'prod', 'status': 'Success'}]
+
+
+class FakeQueryApi(object):
+    def __init__(self, profile: str) -> None:
+        self.profile = profile
+
+    def execute_pages(self, query: str, timeout_sec: float,
+                      cancelled: Optional[threading.Event] = None) -> Iterator[ResultPage]:
+        if self.profile == 'broken':
+            raise ValueError('unreachable')
+        yield ResultPage(columns=[Column('q')], data=[[query]])
+
+
+def test_run_on_profiles():
+    profiles = ['a', 'broken', 'b']
+    outcomes = list(run_on_profiles(profiles, FakeQueryApi, 'SELECT 1', 10, concurrency=2))  # type: ignore
+
+    assert [o.profile for o in outcomes] == ['a', 'broken', 'b']
+    assert [list(o.pages) if o.pages is not None else None for o in outcomes] == [
+        [ResultPage(columns=[Column('profile'), Column('q')], data=[['a', 'SELECT 1']])],
+        None,
+        [ResultPage(columns=[Column('profile'), Column('q')], data=[['b', 'SELECT 1']])],
+    ]
+    assert str(outcomes[1].error) == 'unreachable'
@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from cli import errors
+from cli.follow import Follower, WatermarkStore
+from cli.upsolver.entities import Column, ResultPage
+
+query = 'SELECT id, ts FROM events;'
+
+
+class FakeQueryApi(object):
+    def __init__(self, results: list) -> None:
+        self.results = iter(results)
+        self.executed: list = []
+
+    def execute_pages(self, sql: str) -> Iterator[ResultPage]:
+        self.executed.append(sql)
+        columns = [Column('id', 'long'), Column('ts', 'timestamp')]
+        yield ResultPage(columns=columns, data=next(self.results))
+
+
+def rows(cycles: Iterator[Iterator[ResultPage]]) -> list:
+    return [[row for page in pages for row in page.data] for pages in cycles]
+
+
+def test_follow(tmp_path: Path):
+    api = FakeQueryApi([
+        [[1, '2022-01-01T10:00:00'], [2, '2022-01-01T11:30:00']],
+        [],
+        [[3, '2022-01-01T12:00:00']],
+    ])
+    follower = Follower(api.execute_pages, query, 'ts', WatermarkStore(tmp_path, query, 'ts'), 0, 0)
+
+    assert rows(follower.follow(cycles=3)) == [
+        [[1, '2022-01-01T10:00:00'], [2, '2022-01-01T11:30:00']],
+        [],
+        [[3, '2022-01-01T12:00:00']],
+    ]
+    assert api.executed[0] == query
+    assert api.executed[1] == api.executed[2] == (
+        "SELECT * FROM (\nSELECT id, ts FROM events\n) AS follow_query "
+        "WHERE ts > TIMESTAMP '2022-01-01 11:30:00'"
+    )
+
+    # following the same query again resumes from the saved watermark
+    api = FakeQueryApi([[]])
+    follower = Follower(api.execute_pages, query, 'ts', WatermarkStore(tmp_path, query, 'ts'), 0, 0)
+    rows(follower.follow(cycles=1))
+    assert api.executed[0].endswith("WHERE ts > TIMESTAMP '2022-01-01 12:00:00'")
+
+
+def test_watermark_not_saved_for_interrupted_execution(tmp_path: Path):
+    store = WatermarkStore(tmp_path, query, 'id')
+    pages = Follower(FakeQueryApi([[[5, None]]]).execute_pages, query, 'id', store, 0, 0).poll()
+    next(pages)
+    pages.close()
+    assert store.load() is None
+
+
+def test_invalid_watermark_file(tmp_path: Path):
+    store = WatermarkStore(tmp_path, query, 'id')
+    store.path.write_text('{}')
+    with pytest.raises(errors.ConfigErr):
+        store.load()
+
+
+def test_adaptive_polling(tmp_path: Path, monkeypatch):
+    sleeps: list = []
+    monkeypatch.setattr('cli.follow.time.sleep', sleeps.append)
+    api = FakeQueryApi([[[1, None]], [], [], [], [], [[2, None]], []])
+    follower = Follower(api.execute_pages, query, 'id', WatermarkStore(tmp_path, query, 'id'), 1, 5)
+
+    rows(follower.follow(cycles=7))
+    assert sleeps == [1, 2, 4, 5, 5, 1]
+
+
+def test_unusable_watermark_values(tmp_path: Path):
+    api = FakeQueryApi([[[1, True], [2, False]]])
+    follower = Follower(api.execute_pages, query, 'ts', WatermarkStore(tmp_path, query, 'ts'), 0, 0)
+
+    with pytest.raises(errors.InvalidOptionErr):
+        rows(follower.follow(cycles=1))
@@ -0,0 +1,34 @@
+import pytest
+
+from cli import format_pool
+from cli.format_pool import FormatPool, format_results
+from cli.formatters import OutputFmt
+from cli.upsolver.entities import Column, ResultPage
+
+columns = [Column('id'), Column('name')]
+
+
+def sequential(pages: list, output_fmt: OutputFmt) -> str:
+    fmt = output_fmt.get_formatter()
+    return ''.join(s + '\n' for page in pages for s in format_results(page, fmt))
+
+
+@pytest.mark.parametrize('output_fmt', [OutputFmt.JSON, OutputFmt.CSV, OutputFmt.TSV])
+def test_same_output_as_sequential(monkeypatch: pytest.MonkeyPatch, output_fmt: OutputFmt):
+    monkeypatch.setattr(format_pool, 'SLICE_ROWS', 3)
+    pages = [
+        ResultPage(columns=None, data=[{'kind': 'upsolver_query_response', 'message': 'Done'}]),
+        ResultPage(columns=columns, data=[]),
+        ResultPage(columns=columns, data=[[i, f'n{i}'] for i in range(10)]),
+        ResultPage(columns=columns, data=[[i, None] for i in range(10, 12)]),
+    ]
+
+    pool = FormatPool(output_fmt, workers=2, max_pages_in_flight=1)
+    try:
+        output = ''.join(pool.format_pages(iter(pages)))
+    finally:
+        pool.close()
+
+    assert output == sequential(pages, output_fmt)
+    if output_fmt != OutputFmt.JSON:
+        assert output.count('id') == 1  # a single header
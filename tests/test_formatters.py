@@ -1,4 +1,7 @@
-from cli.formatters import OutputFmt
+from array import array
+from datetime import datetime, timezone
+
+from cli.formatters import OutputFmt, PlainTable
 
 
 def csv_fmt(value):
@@ -29,3 +32,22 @@ def test_csv_flatten_non_uniform():
 0,"<null>",1\r
 2,4,3\r
 """
+
+
+def test_json_typed_values():
+    value = {'t': datetime(2022, 1, 1, tzinfo=timezone.utc), 'a': array('q', [1])}
+    assert OutputFmt.JSON.get_formatter()(value) == \
+        '{\n  "t": "2022-01-01T00:00:00+00:00",\n  "a": [\n    1\n  ]\n}'
+
+
+def test_plain_table_measures_all_rows():
+    table = PlainTable(['id', 'name', 'price'])
+    first, second = [[1, 'a', 1.5]], [[100, 'longer name', None]]
+    table.measure(first)
+    table.measure(second)
+
+    assert table.header() + '\n' + table.format_rows(first) + '\n' + table.format_rows(second) == \
+        ' id  name         price\n' \
+        '---  -----------  -----\n' \
+        '  1  a              1.5\n' \
+        '100  longer name'
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from cli import errors
+from cli.journal import RunJournal
+from cli.upsolver.lexer import split_statements
+
+script = 'CREATE TABLE t; INSERT INTO t SELECT 1; SELECT * FROM t;'
+api_url = 'https://api.upsolver.com'
+
+
+def test_resume(tmp_path: Path):
+    statements = split_statements(script)
+    journal = RunJournal(tmp_path, script, api_url)
+    assert journal.start(resume=True) == set()
+    journal.complete(statements[0])
+    journal.complete(statements[1])
+
+    assert RunJournal(tmp_path, script, api_url).start(resume=True) == {1, 2}
+    assert RunJournal(tmp_path, script + ' SELECT 2;', api_url).start(resume=True) == set()  # edited script
+    assert RunJournal(tmp_path, script, 'https://other.upsolver.com').start(resume=True) == set()
+
+    journal = RunJournal(tmp_path, script, api_url)
+    assert journal.start(resume=False) == set()
+    assert RunJournal(tmp_path, script, api_url).load() == set()
+
+
+def test_finish_removes_journal(tmp_path: Path):
+    journal = RunJournal(tmp_path, script, api_url)
+    journal.start(resume=False)
+    journal.complete(split_statements(script)[0])
+    journal.finish()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_invalid_journal(tmp_path: Path):
+    journal = RunJournal(tmp_path, script, api_url)
+    journal.path.write_text('[]')
+    with pytest.raises(errors.ConfigErr):
+        journal.load()
@@ -0,0 +1,108 @@
+import pytest
+
+from cli import errors
+from cli.pipeline import (
+    Comparison,
+    Limit,
+    Predicate,
+    Projection,
+    apply_stages,
+    parse_predicate,
+)
+from cli.upsolver.entities import Column, ResultPage
+
+columns = [Column('id', 'bigint'), Column('status'), Column('info')]
+rows = [
+    [1, 'Running', {'delay': 5, 'host': 'a'}],
+    [2, 'Stopped', {'delay': 50}],
+    [3, 'Running', None],
+]
+
+
+def run(stages: list, pages: list = None) -> list:
+    pages = pages or [ResultPage(columns, rows)]
+    return [p.to_execution_result() for p in apply_stages(iter(pages), stages)]
+
+
+def test_projection():
+    assert run([Projection(['status', 'id'])]) == \
+        [[{'status': 'Running', 'id': 1}, {'status': 'Stopped', 'id': 2}, {'status': 'Running', 'id': 3}]]
+    assert run([Projection(['id'])]) == [[{'id': 1}, {'id': 2}, {'id': 3}]]
+
+
+def test_projection_nested():
+    assert run([Projection(['id', 'info.delay'])]) == \
+        [[{'id': 1, 'info.delay': 5}, {'id': 2, 'info.delay': 50}, {'id': 3, 'info.delay': None}]]
+
+
+def test_projection_keeps_types_of_plain_columns():
+    page = next(Projection(['info.host', 'id'])(iter([ResultPage(columns, rows)])))
+    assert page.columns == [Column('info.host'), Column('id', 'bigint')]
+
+
+def test_projection_unknown_column():
+    with pytest.raises(errors.InvalidOptionErr) as err:
+        run([Projection(['nope'])])
+    assert 'id, status, info' in str(err.value)
+
+
+def test_non_grid_pages_pass_through():
+    page = ResultPage(columns=None, data=[{'status': 'Success'}])
+    stages = [Predicate(parse_predicate('id = 1')), Projection(['id'])]
+    assert run(stages, [page]) == [[{'status': 'Success'}]]
+
+
+@pytest.mark.parametrize('expression,expected', [
+    ("status = 'Running'", [Comparison('status', '=', 'Running')]),
+    ("a>=1.5 AND b <> 'it''s' and c is not null and d is NULL",
+     [Comparison('a', '>=', 1.5), Comparison('b', '<>', "it's"),
+      Comparison('c', '!=', None), Comparison('d', '=', None)]),
+    ('flag = true', [Comparison('flag', '=', True)]),
+])
+def test_parse_predicate(expression, expected):
+    assert parse_predicate(expression) == expected
+
+
+@pytest.mark.parametrize('expression', ['', 'a', 'a = 1 and', 'a = 1 or b = 2', "a = 'x", 'a < null'])
+def test_parse_invalid_predicate(expression):
+    with pytest.raises(errors.InvalidOptionErr):
+        parse_predicate(expression)
+
+
+@pytest.mark.parametrize('expression,ids', [
+    ("status = 'Running'", [1, 3]),
+    ("status = 'Running' and info.delay < 10", [1]),
+    ('info.delay >= 10', [2]),
+    ('info is null', [3]),
+    ("id > 'x'", []),  # incomparable types
+])
+def test_predicate(expression, ids):
+    result = run([Predicate(parse_predicate(expression)), Projection(['id'])])
+    assert [r['id'] for r in result[0]] == ids
+
+
+def test_limit_stops_fetching_pages():
+    fetched = []
+
+    def pages():
+        for i in range(10):
+            fetched.append(i)
+            yield ResultPage(columns, rows, next_path='next')
+
+    limited = list(Limit(4)(pages()))
+
+    assert [len(p.data) for p in limited] == [3, 1]
+    assert limited[-1].next_path is None
+    assert fetched == [0, 1]
+
+
+def test_limit_exact_page_boundary():
+    fetched = []
+
+    def pages():
+        for i in range(10):
+            fetched.append(i)
+            yield ResultPage(columns, rows)
+
+    assert sum(len(p.data) for p in Limit(3)(pages())) == 3
+    assert fetched == [0]
@@ -0,0 +1,239 @@
+import threading
+import time
+from typing import Iterator, Optional
+
+import pytest
+from requests_mock import Mocker as RequestsMocker
+from yarl import URL
+
+from cli import errors
+from cli.upsolver.entities import Column, ResultPage
+from cli.upsolver.lexer import split_statements
+from cli.upsolver.poller import SimpleResponsePoller
+from cli.upsolver.query import RestQueryApi
+from cli.upsolver.requester import Requester
+from cli.upsolver.script import run_parallel, run_statements
+
+
+def grid_response(rows: list, next_path: str = None) -> dict:
+    result: dict = {
+        'grid': {
+            'columns': [{'name': 'a', 'columnType': {'clazz': 'LongColumnType'}}, {'name': 'b'}],
+            'data': rows,
+        }
+    }
+    if next_path is not None:
+        result['next'] = next_path
+    return {'status': 'Success', 'result': result}
+
+
+def query_api() -> RestQueryApi:
+    return RestQueryApi(
+        requester=Requester(URL('http://localhost'), retry_policy=None),
+        poller_builder=lambda to_sec: SimpleResponsePoller(wait_interval_sec=0, max_time_sec=to_sec)
+    )
+
+
+def test_execute_pages(requests_mock: RequestsMocker):
+    requests_mock.post('/query', status_code=201, json={'status': 'Pending', 'current': '/query/1'})
+    requests_mock.get('/query/1', json=grid_response([[1, 'x']], next_path='/query/1/next'))
+    requests_mock.get('/query/1/next', json=grid_response([[2, 'y'], [3, 'z']]))
+
+    pages = list(query_api().execute_pages('SELECT 1', 10))
+
+    assert [p.data for p in pages] == [[[1, 'x']], [[2, 'y'], [3, 'z']]]
+    assert pages[0].columns == [Column('a', 'LongColumnType'), Column('b')]
+    assert pages[0].next_path == '/query/1/next' and pages[1].next_path is None
+    assert all(p.size_bytes > 0 for p in pages)
+
+
+def test_cancel_on_timeout(requests_mock: RequestsMocker):
+    pending = {'status': 'Pending', 'current': '/query/1'}
+    requests_mock.post('/query', status_code=201, json=pending)
+    requests_mock.get('/query/1', status_code=202, json=pending, headers={'x-api-requestid': 'r1'})
+    requests_mock.delete('/query/1', json={})
+
+    api = RestQueryApi(
+        requester=Requester(URL('http://localhost'), retry_policy=None),
+        poller_builder=lambda to_sec: SimpleResponsePoller(wait_interval_sec=0.01, max_time_sec=to_sec)
+    )
+    with pytest.raises(errors.PendingResultTimeout):
+        list(api.execute_pages('SELECT 1', 0))
+    assert requests_mock.request_history[-1].method == 'DELETE'
+
+
+def test_cancel_on_interrupt(requests_mock: RequestsMocker):
+    def interrupt(request, context):
+        raise KeyboardInterrupt()
+
+    requests_mock.post('/query', status_code=201, json={'status': 'Pending', 'current': '/query/1'})
+    requests_mock.get('/query/1', json=interrupt)
+    requests_mock.delete('/query/1', status_code=500, json={})  # failing to cancel is ignored
+
+    with pytest.raises(KeyboardInterrupt):
+        list(query_api().execute_pages('SELECT 1', 10))
+    assert [r.method for r in requests_mock.request_history] == ['POST', 'GET', 'DELETE']
+
+
+def test_no_cancel_once_results_are_ready(requests_mock: RequestsMocker):
+    requests_mock.post('/query', json=grid_response([[1, 'x']], next_path='/query/1/next'))
+    requests_mock.get('/query/1/next', status_code=500, json={'status': 'Failed'})
+
+    with pytest.raises(errors.ApiErr):
+        list(query_api().execute_pages('SELECT 1', 10))
+    assert [r.method for r in requests_mock.request_history] == ['POST', 'GET']
+
+
+def test_resume(requests_mock: RequestsMocker):
+    requests_mock.get('/query/1/next', json=grid_response([[2, 'y']], next_path='/query/1/last'))
+    requests_mock.get('/query/1/last', json=grid_response([[3, 'z']]))
+
+    assert [p.data for p in query_api().resume('/query/1/next', 10)] == [[[2, 'y']], [[3, 'z']]]
+
+
+def test_execute_non_grid(requests_mock: RequestsMocker):
+    requests_mock.post('/query', json={'status': 'Success', 'kind': 'upsolver_query_response'})
+
+    assert list(query_api().execute('CREATE TABLE t', 10)) == \
+        [[{'status': 'Success', 'kind': 'upsolver_query_response'}]]
+
+
+def test_execute_dicts(requests_mock: RequestsMocker):
+    requests_mock.post('/query', json=grid_response([[1, 'x'], [2, 'y']]))
+
+    assert list(query_api().execute('SELECT 1', 10)) == [[{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}]]
+
+
+@pytest.mark.parametrize('independent', [False, True])
+def test_run_statements_in_order(requests_mock: RequestsMocker, independent: bool):
+    def respond(request, context) -> dict:  # type: ignore
+        n = int(request.json()['sql'].split()[-1])
+        return grid_response([[n, 'x']])
+
+    requests_mock.post('/query', json=respond)
+
+    results = [
+        (statement.number, [p.data for p in pages])
+        for statement, pages in run_statements(query_api(), split_statements('SELECT 1; SELECT 2; SELECT 3'),
+                                               10, independent)
+    ]
+
+    assert results == [(1, [[[1, 'x']]]), (2, [[[2, 'x']]]), (3, [[[3, 'x']]])]
+    assert [r.json()['sql'] for r in requests_mock.request_history] == ['SELECT 1', 'SELECT 2', 'SELECT 3']
+
+
+def test_failed_statement_raises_while_consuming(requests_mock: RequestsMocker):
+    requests_mock.post('/query', status_code=400, json={'status': 'Failed', 'message': 'bad query'})
+
+    statement, pages = next(run_statements(query_api(), split_statements('SELECT x; SELECT 2'), 10))
+    with pytest.raises(errors.CliErr):
+        list(pages)
+
+
+class SlowQueryApi(object):
+    """
+    Stands in for RestQueryApi in run_parallel (requests_mock handles one request at a time).
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started: list = []
+
+    def execute_pages(self, query: str, timeout_sec: float,
+                      cancelled: Optional[threading.Event] = None) -> Iterator[ResultPage]:
+        with self.lock:
+            self.started.append(query)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.1 if 't1' in query else 0.01)  # the first statement finishes last
+        with self.lock:
+            self.running -= 1
+        yield ResultPage(columns=[Column('sql')], data=[[query]])
+
+
+def test_run_parallel():
+    api = SlowQueryApi()
+    script = 'SELECT * FROM t1; SELECT * FROM t2; SELECT * FROM t3; CREATE TABLE t1 (a int)'
+    outcomes = list(run_parallel(api, split_statements(script), 10, workers=3))  # type: ignore
+
+    assert [[r for p in o.pages for r in p.data] for o in outcomes] == \
+        [[[s.strip()]] for s in script.split(';')]
+    assert api.max_running == 3
+    # the last statement writes t1, so it waits for the first one
+    assert api.started[-1] == 'CREATE TABLE t1 (a int)'
+
+
+def test_run_parallel_skips_after_failure(requests_mock: RequestsMocker):
+    def respond(request, context) -> dict:  # type: ignore
+        if 'bad' in request.json()['sql']:
+            context.status_code = 400
+            return {'status': 'Failed', 'message': 'bad query'}
+        return grid_response([[1, 'x']])
+
+    requests_mock.post('/query', json=respond)
+
+    script = 'CREATE TABLE bad (a int); SELECT * FROM bad; SELECT 1'
+    outcomes = list(run_parallel(query_api(), split_statements(script), 10, workers=2))
+
+    assert isinstance(outcomes[0].error, errors.ApiErr)
+    assert outcomes[1].skipped()
+    assert outcomes[2].pages is not None
+
+
+def test_cancelled_query_is_deleted(requests_mock: RequestsMocker):
+    requests_mock.post('/query', status_code=201, json={'status': 'Pending', 'current': '/query/1'})
+    requests_mock.delete('/query/1', json={})
+    cancelled = threading.Event()
+
+    def cancel(request, context) -> dict:  # type: ignore
+        cancelled.set()  # e.g. by the thread consuming the results
+        context.status_code = 202
+        return {'status': 'Pending', 'current': '/query/1'}
+
+    requests_mock.get('/query/1', json=cancel)
+
+    with pytest.raises(errors.QueryCancelled):
+        list(query_api().execute_pages('SELECT 1', 10, cancelled))
+    assert [r.method for r in requests_mock.request_history] == ['POST', 'GET', 'DELETE']
+
+
+def test_run_statements_cancels_submitted_statement(requests_mock: RequestsMocker):
+    requests_mock.post('/query', [{'status_code': 201, 'json': {'status': 'Pending', 'current': '/query/1'}},
+                                  {'status_code': 201, 'json': {'status': 'Pending', 'current': '/query/2'}}])
+    requests_mock.get('/query/1', status_code=400, json={'status': 'Failed', 'message': 'bad query'})
+    requests_mock.delete('/query/2', json={})
+
+    statements = run_statements(query_api(), split_statements('SELECT x; SELECT 2'), 10, independent=True)
+    statement, pages = next(statements)
+    with pytest.raises(errors.CliErr):
+        list(pages)
+    statements.close()
+
+    assert requests_mock.request_history[-1].method == 'DELETE'
+    assert requests_mock.request_history[-1].path == '/query/2'
+
+
+class BlockingQueryApi(object):
+    """
+    Only the queries on t1 complete; the others run until they are cancelled.
+    """
+
+    def execute_pages(self, query: str, timeout_sec: float,
+                      cancelled: Optional[threading.Event] = None) -> Iterator[ResultPage]:
+        if 't1' not in query:
+            assert cancelled is not None and cancelled.wait(5)
+            raise errors.QueryCancelled()
+        yield ResultPage(columns=[Column('sql')], data=[[query]])
+
+
+def test_run_parallel_cancels_on_early_stop():
+    script = 'SELECT * FROM t1; SELECT * FROM t2; SELECT * FROM t3; SELECT * FROM t4'
+    outcomes = run_parallel(BlockingQueryApi(), split_statements(script), 10, workers=2)  # type: ignore
+    first = next(outcomes)
+    first.pages.close()
+
+    started_at = time.monotonic()
+    outcomes.close()
+    assert time.monotonic() - started_at < 1
@@ -0,0 +1,87 @@
+from cli.upsolver.lexer import (
+    Statement,
+    dependencies,
+    is_complete,
+    split_statements,
+    statement_objects,
+)
+
+
+def sqls(script: str) -> list:
+    return [s.sql for s in split_statements(script)]
+
+
+def test_split_simple():
+    assert sqls('SELECT 1; SELECT 2;') == ['SELECT 1', 'SELECT 2']
+    assert sqls('SELECT 1') == ['SELECT 1']
+    assert sqls('') == []
+
+
+def test_semicolons_in_strings_and_identifiers():
+    assert sqls("SELECT 'a;b', 'it''s; fine' FROM t; SELECT 2") == ["SELECT 'a;b', 'it''s; fine' FROM t", 'SELECT 2']
+    assert sqls('SELECT "weird;name" FROM `db;x`.t; SELECT 2') == ['SELECT "weird;name" FROM `db;x`.t', 'SELECT 2']
+
+
+def test_semicolons_in_comments():
+    script = '''
+    -- first; statement
+    SELECT 1 /* not; the end */ FROM t;
+    /* only a comment; */
+    -- another one
+    ;
+    SELECT 2
+    '''
+    assert sqls(script) == ['-- first; statement\n    SELECT 1 /* not; the end */ FROM t', 'SELECT 2']
+
+
+def test_quotes_within_comments_are_ignored():
+    assert sqls("SELECT 1; -- don't\nSELECT 2") == ['SELECT 1', "-- don't\nSELECT 2"]
+
+
+def test_unterminated_string_extends_to_end():
+    assert sqls("SELECT 'a; SELECT 2") == ["SELECT 'a; SELECT 2"]
+
+
+def test_statement_positions():
+    assert split_statements('SELECT 1;\n\n  SELECT 2;\nSELECT 3') == [
+        Statement('SELECT 1', 1, 1),
+        Statement('SELECT 2', 2, 3),
+        Statement('SELECT 3', 3, 4),
+    ]
+
+
+def test_barrier_marker():
+    statements = split_statements('SELECT 1;\n-- @barrier\n;SELECT 2; /* @barrier */ SELECT 3; SELECT 4')
+    assert [s.barrier for s in statements] == [False, True, True, False]
+
+
+def test_statement_objects():
+    assert statement_objects('CREATE TABLE IF NOT EXISTS catalog.db."My_Table" (a int)').writes == {'my_table'}
+    assert statement_objects('CREATE JOB j AS INSERT INTO db.target SELECT * FROM db.source').writes == {'j', 'target'}
+    assert statement_objects('DELETE FROM t WHERE a = 1').writes == {'t'}
+
+    objects = statement_objects("SELECT * FROM db.t1 JOIN t2 ON x = 'db.t3' -- t4")
+    assert objects.writes == set()
+    assert {'t1', 't2'} <= objects.mentions and not {'t3', 't4'} & objects.mentions
+
+
+def test_dependencies():
+    statements = split_statements('''
+    CREATE TABLE t1 (a int);
+    CREATE TABLE t2 (a int);
+    CREATE JOB j AS INSERT INTO t2 SELECT * FROM t1;
+    SELECT * FROM t3;
+    -- @barrier
+    SELECT 1;
+    SELECT 2;
+    ''')
+    assert dependencies(statements) == [set(), set(), {0, 1}, set(), {0, 1, 2, 3}, {4}]
+
+
+def test_is_complete():
+    assert is_complete('SELECT 1;')
+    assert is_complete('SELECT 1; -- done\n')
+    assert not is_complete('SELECT 1')
+    assert not is_complete("SELECT ';")
+    assert not is_complete('SELECT 1; SELECT 2')
+    assert not is_complete('')
@@ -38,7 +38,8 @@ def test_response_validation(
         method: str) -> None:
     r = Requester(
         base_url=URL('http://localhost'),
-        resp_validator=default_resp_validator
+        resp_validator=default_resp_validator,
+        retry_policy=None
     )
     (sc, fail) = sc_fail
 
@@ -0,0 +1,58 @@
+import pytest
+
+from cli.upsolver.entities import Column, ResultPage
+from cli.upsolver.results import QueryResults
+
+np = pytest.importorskip('numpy')
+
+columns = [Column('id'), Column('price'), Column('name')]
+
+
+def results(*pages: list) -> QueryResults:
+    return QueryResults(iter([ResultPage(columns=columns, data=rows) for rows in pages]))
+
+
+def test_to_numpy_concatenates_pages():
+    arrays = results([[1, 1.5, 'a'], [2, 2.5, 'b']], [], [[3, 3.5, 'c']]).to_numpy()
+
+    assert list(arrays) == ['id', 'price', 'name']
+    assert arrays['id'].dtype == np.int64
+    assert arrays['id'].tolist() == [1, 2, 3]
+    assert arrays['price'].dtype == np.float64
+    assert arrays['name'].dtype == object
+    assert arrays['name'].tolist() == ['a', 'b', 'c']
+
+
+def test_to_numpy_mixed_values_fall_back_to_object():
+    arrays = results([[1, [1, 2], 'a']], [[None, [3], 2]]).to_numpy()
+
+    assert arrays['id'].tolist() == [1, None]
+    assert arrays['price'].tolist() == [[1, 2], [3]]
+    assert arrays['name'].dtype == object
+
+
+def test_to_numpy_skips_non_grid_pages():
+    assert QueryResults(iter([ResultPage(columns=None, data=[{'status': 'Success'}])])).to_numpy() == {}
+
+
+def test_to_pandas():
+    pytest.importorskip('pandas')
+    df = results([[1, 1.5, 'a']], [[2, 2.5, 'b']]).to_pandas()
+
+    assert list(df.columns) == ['id', 'price', 'name']
+    assert df['price'].sum() == 4.0
+
+
+def test_to_numpy_typed_columns():
+    typed_columns = [Column('id', 'bigint'), Column('price', 'double'), Column('at', 'timestamp')]
+    arrays = QueryResults(iter([
+        ResultPage(columns=typed_columns, data=[[1, 1.5, '2022-01-01T00:00:00Z']]),
+        ResultPage(columns=typed_columns, data=[[None, None, None]]),
+    ])).to_numpy()
+
+    assert arrays['id'].dtype == np.float64  # missing values turn integers to floats
+    assert arrays['id'][0] == 1 and np.isnan(arrays['id'][1])
+    assert np.isnan(arrays['price'][1])
+    assert arrays['at'].dtype == np.dtype('datetime64[us]')
+    assert str(arrays['at'][0]) == '2022-01-01T00:00:00.000000'
+    assert np.isnat(arrays['at'][1])
@@ -0,0 +1,97 @@
+import pytest
+from requests.exceptions import ConnectionError
+from requests_mock import Mocker as RequestsMocker
+from yarl import URL
+
+from cli import errors
+from cli.upsolver.requester import Requester
+from cli.upsolver.retry import CircuitBreaker, RetryBudget, RetryPolicy, metrics
+
+
+def requester(host: str) -> Requester:
+    return Requester(URL(f'http://{host}'), retry_policy=RetryPolicy(base_delay_sec=0))
+
+
+def test_get_retried(requests_mock: RequestsMocker):
+    requests_mock.get('http://retry-get/query/1', [{'status_code': 503}, {'exc': ConnectionError},
+                                                   {'status_code': 200, 'json': {'status': 'Success'}}])
+    before = metrics.snapshot()
+
+    assert requester('retry-get').get('/query/1').json() == {'status': 'Success'}
+    assert len(requests_mock.request_history) == 3
+    assert metrics.snapshot()['retries'] - before['retries'] == 2
+
+
+def test_get_retries_exhausted(requests_mock: RequestsMocker):
+    requests_mock.get('http://retry-exhausted/query/1', status_code=503, json={'status': 'Failed'})
+
+    with pytest.raises(errors.ApiErr):
+        requester('retry-exhausted').get('/query/1')
+    assert len(requests_mock.request_history) == RetryPolicy().max_attempts
+
+
+def test_server_error_not_retried(requests_mock: RequestsMocker):
+    requests_mock.get('http://retry-500/query/1', status_code=500, json={'status': 'Failed'})
+
+    with pytest.raises(errors.ApiErr):
+        requester('retry-500').get('/query/1')
+    assert len(requests_mock.request_history) == 1
+
+
+def test_post_not_retried(requests_mock: RequestsMocker):
+    requests_mock.post('http://retry-post/query', status_code=503)
+
+    with pytest.raises(errors.ApiErr):
+        requester('retry-post').post('/query')
+    assert len(requests_mock.request_history) == 1
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    for _ in range(4):
+        budget.on_request()
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+
+
+def test_delay_is_capped():
+    policy = RetryPolicy(base_delay_sec=1, max_delay_sec=3)
+    assert all(0 <= policy.delay_sec(retry) <= 3 for retry in range(1, 10))
+
+
+def test_circuit_opens_after_failures(requests_mock: RequestsMocker):
+    requests_mock.get('http://breaker-test/query/1', status_code=503)
+    r = Requester(URL('http://breaker-test'), retry_policy=None)
+    r.breaker.failure_threshold = 2
+
+    for _ in range(2):
+        with pytest.raises(errors.ApiErr):
+            r.get('/query/1')
+    with pytest.raises(errors.CircuitOpenErr):
+        r.get('/query/1')
+    assert len(requests_mock.request_history) == 2
+
+
+def test_circuit_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_sec=0)
+    breaker.on_failure()
+
+    assert breaker.before_request() is None  # a single probe is let through
+    assert breaker.before_request() is not None
+    breaker.on_success()
+    assert breaker.before_request() is None
+    assert breaker.before_request() is None
+
+
+def test_aborted_probe(requests_mock: RequestsMocker):
+    def interrupt(request, context):
+        raise KeyboardInterrupt()
+
+    requests_mock.get('http://breaker-abort/query/1', json=interrupt)
+    r = Requester(URL('http://breaker-abort'), retry_policy=None)
+    r.breaker.failure_threshold = 1
+    r.breaker.reset_timeout_sec = 0
+    r.breaker.on_failure()
+
+    with pytest.raises(KeyboardInterrupt):
+        r.get('/query/1')
+    assert r.breaker.before_request() is None  # another request may probe the host
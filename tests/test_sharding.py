@@ -0,0 +1,47 @@
+from datetime import date, datetime
+
+import pytest
+
+from cli import errors
+from cli.sharding import parse_range, parse_sweep, shard_queries, split_range, sweep_queries
+
+
+def test_parse_range():
+    assert parse_range('0..100') == (0, 100)
+    assert parse_range('0..1.5') == (0.0, 1.5)
+    assert parse_range('2022-01-01..2022-02-01') == (date(2022, 1, 1), date(2022, 2, 1))
+    assert parse_range('2022-01-01..2022-01-01T12:00:00') == (datetime(2022, 1, 1), datetime(2022, 1, 1, 12))
+
+    for invalid in ['0-100', '10..0', '1..x', '0..2022-01-01']:
+        with pytest.raises(errors.InvalidOptionErr):
+            parse_range(invalid)
+
+
+def test_split_range():
+    assert split_range(0, 10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split_range(0, 2, 4) == [(0, 1), (1, 2)]
+    assert split_range(date(2022, 1, 1), date(2022, 1, 3), 2) == \
+        [(date(2022, 1, 1), date(2022, 1, 2)), (date(2022, 1, 2), date(2022, 1, 3))]
+    assert split_range(datetime(2022, 1, 1), datetime(2022, 1, 1, 1), 2)[1] == \
+        (datetime(2022, 1, 1, 0, 30), datetime(2022, 1, 1, 1))
+
+
+def test_shard_queries():
+    queries = shard_queries('SELECT * FROM t;', 'ts', date(2022, 1, 1), date(2022, 1, 3), 2)
+
+    assert [q.label for q in queries] == ['2022-01-01..2022-01-02', '2022-01-02..2022-01-03']
+    assert queries[0].sql == "SELECT * FROM (\nSELECT * FROM t\n) AS shard_query " \
+                             "WHERE ts >= DATE '2022-01-01' AND ts < DATE '2022-01-02'"
+    assert shard_queries('SELECT 1', 'n', 0, 10, 1)[0].sql.endswith('WHERE n >= 0 AND n < 10')
+
+
+def test_sweep_queries():
+    name, values = parse_sweep('region = us, eu')
+    assert (name, values) == ('region', ['us', 'eu'])
+    assert [q.sql for q in sweep_queries("SELECT * FROM t WHERE r = '{region}'", name, values)] == \
+        ["SELECT * FROM t WHERE r = 'us'", "SELECT * FROM t WHERE r = 'eu'"]
+
+    with pytest.raises(errors.InvalidOptionErr):
+        sweep_queries('SELECT 1', name, values)
+    with pytest.raises(errors.InvalidOptionErr):
+        parse_sweep('us,eu')
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Iterator
+
+from requests.exceptions import Timeout
+
+from cli.commands.context import CliContext
+from cli.commands.shell import Shell
+from cli.config import ConfigurationManager
+from cli.formatters import OutputFmt
+from cli.upsolver.entities import Column, ResultPage
+
+
+class FakeQueryApi(object):
+    def __init__(self) -> None:
+        self.executed: list = []
+
+    def execute_pages(self, query: str, timeout_sec: float) -> Iterator[ResultPage]:
+        self.executed.append(query)
+        if query == 'SELECT slow':
+            raise Timeout('read timed out')
+        columns = [Column('a', 'bigint'), Column('b', 'string')]
+        yield ResultPage(columns=columns, data=[[2, 'x'], [1, 'y']], next_path='next')
+        yield ResultPage(columns=columns, data=[[3, 'z']])
+
+
+def run_shell(tmp_path: Path, lines: list) -> FakeQueryApi:
+    api = FakeQueryApi()
+    ctx = CliContext(ConfigurationManager(tmp_path / 'config'))
+    remaining = iter(lines)
+
+    def read_line(prompt: str) -> str:
+        line = next(remaining, None)
+        if line is None:
+            raise EOFError()
+        return line
+
+    Shell(ctx, api, OutputFmt.CSV, 10).run(read_line)  # type: ignore
+    return api
+
+
+def output_lines(out: str) -> list:
+    return [line for line in out.splitlines() if line != '']
+
+
+def test_statements_span_lines(tmp_path: Path, capsys) -> None:
+    api = run_shell(tmp_path, ['SELECT a,', 'b FROM t;', 'SELECT 1; SELECT 2', ';'])
+
+    assert api.executed == ['SELECT a,\nb FROM t', 'SELECT 1', 'SELECT 2']
+    assert output_lines(capsys.readouterr().out)[:4] == ['"a","b"', '2,"x"', '1,"y"', '3,"z"']
+
+
+def test_redisplay_uses_last_result(tmp_path: Path, capsys) -> None:
+    api = run_shell(tmp_path, ['SELECT * FROM t;', '\\sort a:desc', '\\where a < 3', '\\columns b',
+                               '\\show json', '\\unknown', '\\quit', 'SELECT 1;'])
+
+    assert api.executed == ['SELECT * FROM t']
+    captured = capsys.readouterr()
+    assert output_lines(captured.out)[4:16] == [
+        '"a","b"', '3,"z"', '2,"x"', '1,"y"',
+        '"a","b"', '2,"x"', '1,"y"',
+        '"b"', '"x"', '"y"', '"z"',
+        '{',
+    ]
+    assert 'Unknown command' in captured.err
+
+
+def test_redisplay_without_result(tmp_path: Path, capsys) -> None:
+    run_shell(tmp_path, ['\\show'])
+    assert 'no result' in capsys.readouterr().err
+
+
+def test_request_error_reported(tmp_path: Path, capsys) -> None:
+    api = run_shell(tmp_path, ['SELECT slow;', 'SELECT 1;'])
+
+    assert api.executed == ['SELECT slow', 'SELECT 1']
+    assert 'Error: read timed out' in capsys.readouterr().err
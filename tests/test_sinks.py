@@ -0,0 +1,72 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from cli import errors
+from cli.sinks import CountingSink, IfExists, SqliteSink
+from cli.upsolver.entities import Column, ResultPage
+
+columns = [Column('id', 'LongColumnType'), Column('price', 'DoubleColumnType'), Column('name')]
+
+
+def page(*rows: list) -> ResultPage:
+    return ResultPage(columns=columns, data=list(rows))
+
+
+def read_table(db: Path, table: str = 't') -> list:
+    with sqlite3.connect(str(db)) as conn:
+        return conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+
+
+def test_creates_typed_table(tmp_path: Path):
+    db = tmp_path / 'out.db'
+    sink = SqliteSink(db, 't')
+    sink.write(page([1, 1.5, 'a'], [2, 2.5, 'b']))
+    sink.write(page([3, 3.5, None]))
+    sink.close()
+
+    assert sink.rows_written == 3
+    assert read_table(db) == [(1, 1.5, 'a'), (2, 2.5, 'b'), (3, 3.5, None)]
+    with sqlite3.connect(str(db)) as conn:
+        types = [r[2] for r in conn.execute('PRAGMA table_info(t)').fetchall()]
+    assert types == ['INTEGER', 'REAL', 'TEXT']
+
+
+def test_nested_values_stored_as_json(tmp_path: Path):
+    db = tmp_path / 'out.db'
+    sink = SqliteSink(db, 't')
+    sink.write(page([1, 0.0, [1, 2]], [2, 0.0, {'a': 1}]))
+    sink.close()
+
+    assert [r[2] for r in read_table(db)] == ['[1, 2]', '{"a": 1}']
+    assert (list, sqlite3.PrepareProtocol) not in sqlite3.adapters  # sqlite3 is left as it was
+
+
+@pytest.mark.parametrize('if_exists,expected_rows', [(IfExists.APPEND, 2), (IfExists.REPLACE, 1)])
+def test_existing_table(tmp_path: Path, if_exists: IfExists, expected_rows: int):
+    db = tmp_path / 'out.db'
+    for i in range(2):
+        sink = SqliteSink(db, 't', if_exists)
+        sink.write(page([i, 0.0, 'x']))
+        sink.close()
+
+    assert len(read_table(db)) == expected_rows
+
+
+def test_non_grid_page_rejected(tmp_path: Path):
+    sink = SqliteSink(tmp_path / 'out.db', 't')
+    with pytest.raises(errors.InvalidOptionErr):
+        sink.write(ResultPage(columns=None, data=[{'status': 'Success'}]))
+    sink.close()
+
+
+def test_counting_sink():
+    sink = CountingSink()
+    sink.write(ResultPage(columns=columns, data=[[1, 0.0, 'a'], [2, 0.0, 'b']], size_bytes=100))
+    sink.write(ResultPage(columns=columns, data=[], size_bytes=10))
+    sink.write(ResultPage(columns=None, data=[{'status': 'Success'}], size_bytes=5))
+
+    summary = sink.summary()
+    assert (summary['rows'], summary['pages'], summary['bytes']) == (2, 3, 115)
+    assert summary['time_to_first_page_sec'] <= summary['total_time_sec']
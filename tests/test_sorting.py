@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from cli import errors
+from cli.sorting import (
+    Aggregate,
+    ExternalSort,
+    GroupBy,
+    SortKey,
+    parse_aggregates,
+    parse_sort_keys,
+)
+from cli.upsolver.entities import Column, ResultPage
+
+columns = [Column('id'), Column('group'), Column('value')]
+
+
+def pages_of(rows: list, page_size: int = 100) -> list:
+    return [ResultPage(columns, rows[i:i + page_size], next_path='next')
+            for i in range(0, len(rows), page_size)]
+
+
+def collect(stage, pages: list) -> list:
+    return [row for page in stage(iter(pages)) for row in page.data]
+
+
+def test_parse_sort_keys():
+    assert parse_sort_keys('a, b.c:desc,d:ASC') == \
+        [SortKey('a'), SortKey('b.c', True), SortKey('d')]
+    with pytest.raises(errors.InvalidOptionErr):
+        parse_sort_keys('a:sideways')
+
+
+def test_parse_aggregates():
+    assert parse_aggregates('count,sum:x,MAX:y') == \
+        [Aggregate('count'), Aggregate('sum', 'x'), Aggregate('max', 'y')]
+    with pytest.raises(errors.InvalidOptionErr):
+        parse_aggregates('sum')
+    with pytest.raises(errors.InvalidOptionErr):
+        parse_aggregates('median:x')
+
+
+@pytest.mark.parametrize('memory_budget', [2 ** 30, 1000])  # in memory / many spilled runs
+def test_external_sort(memory_budget: int):
+    rows = [[i, i % 7, random.random()] for i in range(5000)]
+    random.shuffle(rows)
+
+    sort = ExternalSort([SortKey('group'), SortKey('id', descending=True)], memory_budget)
+    result = collect(sort, pages_of(rows))
+
+    assert result == sorted(rows, key=lambda r: (r[1], -r[0]))
+    assert (sort.spilled_runs > 0) == (memory_budget == 1000)
+
+
+def test_sort_mixed_values():
+    rows = [[1, 'b', None], [2, None, None], [3, 2, None], [4, 'a', None], [5, [1], None]]
+    assert [r[0] for r in collect(ExternalSort([SortKey('group')]), pages_of(rows))] == [2, 3, 4, 1, 5]
+
+
+def test_sort_passes_through_non_grid_pages():
+    status = ResultPage(columns=None, data=[{'status': 'Success'}])
+    out = list(ExternalSort([SortKey('id')])(iter([status])))
+    assert out == [status]
+
+
+@pytest.mark.parametrize('memory_budget', [2 ** 30, 1000])
+def test_group_by(memory_budget: int):
+    rows = [[i, i % 3, i if i % 5 else None] for i in range(30)]
+    random.shuffle(rows)
+
+    aggs = parse_aggregates('count,count:value,sum:value,min:id,max:id,avg:id')
+    pages = list(GroupBy(['group'], aggs, memory_budget)(iter(pages_of(rows, page_size=7))))
+
+    assert pages[0].column_names() == \
+        ['group', 'count', 'count(value)', 'sum(value)', 'min(id)', 'max(id)', 'avg(id)']
+    assert [row for p in pages for row in p.data] == [
+        [0, 10, 8, 120, 0, 27, 13.5],
+        [1, 10, 8, 110, 1, 28, 14.5],
+        [2, 10, 8, 130, 2, 29, 15.5],
+    ]
@@ -0,0 +1,53 @@
+import random
+
+from cli.stats import DistinctCounter, QuantileSketch, ResultStats
+from cli.upsolver.columns import decode_page
+from cli.upsolver.entities import Column, ResultPage
+
+
+def test_distinct_counter():
+    small = DistinctCounter()
+    small.update([1, 2, 3, 3, 3])
+    assert small.estimate() == 3
+
+    large = DistinctCounter()
+    for i in range(10):
+        large.update(range(i * 10000, (i + 1) * 10000))
+        large.update(range(0, 5000))  # repeated values shouldn't count
+    assert abs(large.estimate() - 100000) < 100000 * 0.05
+
+
+def test_quantile_sketch_memory_is_bounded():
+    sketch = QuantileSketch(k=200)
+    values = list(range(100000))
+    random.shuffle(values)
+    for i in range(0, len(values), 1000):
+        sketch.update(values[i:i + 1000])
+
+    assert sketch.size < 1000
+    p25, p50, p99 = sketch.quantiles([0.25, 0.5, 0.99])
+    assert abs(p25 - 25000) < 2000
+    assert abs(p50 - 50000) < 2000
+    assert abs(p99 - 99000) < 2000
+
+
+def test_result_stats():
+    columns = [Column('n', 'bigint'), Column('s', 'string'), Column('x')]
+    stats = ResultStats()
+    stats.update(decode_page(ResultPage(columns, [[1, 'b', 1.5], [None, 'a', None]])))
+    stats.update(decode_page(ResultPage(columns, [[3, None, [1]], [5, 'a', 2]])))
+
+    n, s, x = stats.summary()
+    assert (n['count'], n['nulls'], n['min'], n['max'], n['mean'], n['approx_distinct']) == \
+        (4, 1, 1, 5, 3, 3)
+    assert n['p50'] == 3
+
+    assert (s['nulls'], s['min'], s['max'], s['mean'], s['approx_distinct'], s['p50']) == \
+        (1, 'a', 'b', None, 2, None)
+
+    # mixed values: no min/max or numeric stats, distinct count still works
+    assert (x['nulls'], x['min'], x['mean'], x['approx_distinct']) == (1, None, None, 3)
+
+
+def test_empty_result_stats():
+    assert ResultStats().summary() == []
@@ -0,0 +1,114 @@
+import threading
+import time
+
+from requests import Response
+from requests_mock import Mocker as RequestsMocker
+from yarl import URL
+
+from cli.upsolver.requester import Requester
+from cli.upsolver.retry import RetryPolicy, metrics
+from cli.upsolver.throttle import ConcurrencyLimiter, RateLimiter, retry_after_sec
+
+
+def response_with_retry_after(value: str) -> Response:
+    resp = Response()
+    resp.headers['Retry-After'] = value
+    return resp
+
+
+def test_retry_after():
+    assert retry_after_sec(Response()) is None
+    assert retry_after_sec(response_with_retry_after('3')) == 3
+    assert retry_after_sec(response_with_retry_after('Wed, 21 Oct 2015 07:28:00 GMT')) == 0
+    assert retry_after_sec(response_with_retry_after('soon')) is None
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(max_rps=100, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.045  # the first is let through right away
+
+
+def test_rate_limiter_pause():
+    limiter = RateLimiter()
+    assert limiter.acquire() == 0
+    limiter.pause(0.05)
+    assert limiter.acquire() > 0
+
+
+def test_concurrency_limiter_aimd():
+    limiter = ConcurrencyLimiter(max_limit=8, latency_factor=float('inf'))  # latency aside
+    started = [limiter.acquire() for _ in range(4)]
+    for started_at in started:
+        limiter.release(started_at, throttled=True)
+    assert limiter.limit == 4  # a burst of throttled responses decreases the limit once
+
+    limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == 2
+    for _ in range(4):
+        limiter.release(limiter.acquire())
+    assert 2 < limiter.limit < 8
+
+
+def test_concurrency_limiter_blocks():
+    limiter = ConcurrencyLimiter(max_limit=1)
+    started_at = limiter.acquire()
+    acquired = threading.Event()
+
+    def acquire() -> None:
+        limiter.acquire()
+        acquired.set()
+
+    t = threading.Thread(target=acquire)
+    t.start()
+    assert not acquired.wait(0.05)
+    limiter.release(started_at)
+    assert acquired.wait(1)
+    t.join()
+
+
+def test_throttled_request_retried(requests_mock: RequestsMocker):
+    requests_mock.post('http://throttle-test/query', [
+        {'status_code': 429, 'headers': {'Retry-After': '0.05'}},
+        {'status_code': 200, 'json': {'status': 'Success'}}
+    ])
+    r = Requester(URL('http://throttle-test'), retry_policy=RetryPolicy(base_delay_sec=0), max_rps=1000)
+    before = metrics.snapshot()
+
+    start = time.monotonic()
+    assert r.post('/query').json() == {'status': 'Success'}
+    assert time.monotonic() - start >= 0.05
+    assert len(requests_mock.request_history) == 2
+    assert metrics.snapshot()['throttled'] - before['throttled'] == 1
+    assert r.concurrency_limiter.limit < r.concurrency_limiter.max_limit
+
+
+def test_latency_per_endpoint(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    limiter = ConcurrencyLimiter(max_limit=8, latency_backoff_ratio=0.5)
+
+    def request(latency_sec: float, endpoint: str) -> None:
+        started_at = limiter.acquire()
+        now[0] += latency_sec
+        limiter.release(started_at, endpoint=endpoint)
+
+    for _ in range(5):
+        request(0.01, 'GET /query/*/next')
+    for _ in range(5):
+        request(1.0, 'POST /query')  # slower than pages of results, but as usual for its endpoint
+    assert limiter.limit == 8
+
+    for _ in range(5):
+        request(1.0, 'GET /query/*/next')
+    assert limiter.limit < 8
+
+
+def test_endpoint_classes(requests_mock: RequestsMocker):
+    requests_mock.get('http://endpoint-test/query/12/next', json={})
+    r = Requester(URL('http://endpoint-test'), retry_policy=None)
+    r.get('/query/12/next')
+
+    assert list(r.concurrency_limiter.latencies) == ['GET /query/*/next']
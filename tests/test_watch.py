@@ -0,0 +1,62 @@
+from typing import Iterator
+
+import pytest
+
+from cli import errors
+from cli.upsolver.entities import Column, ResultPage
+from cli.watch import ChangeTracker, watch
+
+columns = [Column('id'), Column('status'), Column('delay')]
+
+
+def result(*rows: list) -> Iterator[ResultPage]:
+    yield ResultPage(columns=columns, data=[list(r) for r in rows[:2]], next_path='next')
+    yield ResultPage(columns=columns, data=[list(r) for r in rows[2:]])
+
+
+def changed_rows(pages: Iterator[ResultPage]) -> list:
+    return [row for page in pages for row in page.data]
+
+
+def test_changes():
+    tracker = ChangeTracker(['id'])
+
+    assert changed_rows(tracker.changes(result([1, 'Running', 0], [2, 'Running', 5]))) == [
+        ['inserted', 1, 'Running', 0], ['inserted', 2, 'Running', 5]
+    ]
+    assert changed_rows(tracker.changes(result([1, 'Running', 0], [2, 'Failed', 5], [3, 'Running', 0]))) == [
+        ['updated', 2, 'Failed', 5], ['inserted', 3, 'Running', 0]
+    ]
+    assert changed_rows(tracker.changes(result([2, 'Failed', 5], [3, 'Running', 0]))) == [
+        ['deleted', 1, None, None]
+    ]
+    assert changed_rows(tracker.changes(result([2, 'Failed', 5], [3, 'Running', 0]))) == []
+
+
+def test_changed_pages_have_change_column():
+    pages = list(ChangeTracker(['id', 'status']).changes(result([1, 'Running', 0])))
+    assert pages == [ResultPage(columns=[Column('change')] + columns, data=[['inserted', 1, 'Running', 0]])]
+
+
+def test_failed_result_keeps_previous_index():
+    tracker = ChangeTracker(['id'])
+    list(tracker.changes(result([1, 'Running', 0])))
+
+    def failing() -> Iterator[ResultPage]:
+        yield ResultPage(columns=columns, data=[[2, 'Running', 0]], next_path='next')
+        raise errors.CliErr('failed')
+
+    with pytest.raises(errors.CliErr):
+        list(tracker.changes(failing()))
+    assert changed_rows(tracker.changes(result([1, 'Running', 0]))) == []
+
+
+def test_unknown_key():
+    with pytest.raises(errors.InvalidOptionErr):
+        list(ChangeTracker(['nope']).changes(result([1, 'Running', 0])))
+
+
+def test_watch():
+    executions = iter([result([1, 'a', 0]), result([1, 'b', 0])])
+    cycles = watch(lambda: next(executions), ChangeTracker(['id']), interval_sec=0.01, cycles=2)
+    assert [changed_rows(c) for c in cycles] == [[['inserted', 1, 'a', 0]], [['updated', 1, 'b', 0]]]